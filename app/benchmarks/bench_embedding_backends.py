@@ -0,0 +1,118 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, Any, List
+
+import numpy as np
+
+from prompts.prompts import STATE_EXAMPLES, USER_STATES
+from config.setting import Config
+
+# Parity check and benchmark of the torch and ONNX int8 embedding backends.
+# Each backend runs in its own process so RSS is measured in isolation.
+# Run from app/: python -m benchmarks.bench_embedding_backends [--threads N]
+
+
+def sample_texts() -> List[str]:
+    texts= [text for examples in STATE_EXAMPLES.values() for text in examples]
+    # Session-shaped texts like the ones store_session embeds
+    texts += [f"{text} {state} Breathing Affirmation Journaling Gratitude" for text, state in zip(texts, USER_STATES * 4)]
+    return texts
+
+
+def rss_mb() -> float:
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def run_worker(backend: str, threads: int, out_path: str) -> Dict[str, Any]:
+    from services.embedding_backends import create_embedding_backend
+
+    texts= sample_texts()
+    baseline_rss= rss_mb()
+    start= time.perf_counter()
+    model= create_embedding_backend(backend, Config.embedding_onnx_path, threads=threads)
+    load_s= time.perf_counter() - start
+    model.encode(texts[:4])
+
+    single= []
+    for text in texts:
+        start= time.perf_counter()
+        model.encode([text])
+        single.append((time.perf_counter() - start) * 1000)
+    single.sort()
+
+    batch= texts[:32]
+    rounds= 10
+    start= time.perf_counter()
+    for _ in range(rounds):
+        model.encode(batch)
+    throughput= rounds * len(batch) / (time.perf_counter() - start)
+
+    np.save(out_path, np.asarray(model.encode(texts), dtype=np.float32))
+    return {
+        "backend": backend,
+        "load_s": round(load_s, 2),
+        "single_p50_ms": round(single[len(single) // 2], 2),
+        "single_p95_ms": round(single[int(len(single) * 0.95)], 2),
+        "batch32_texts_per_s": round(throughput, 1),
+        "rss_mb": round(rss_mb(), 1),
+        "model_rss_mb": round(rss_mb() - baseline_rss, 1)
+    }
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Compare embedding backends")
+    parser.add_argument("--threads", type=int, default=Config.embedding_threads)
+    parser.add_argument("--worker", choices=["torch", "onnx"], help=argparse.SUPPRESS)
+    parser.add_argument("--out", help=argparse.SUPPRESS)
+    args= parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.threads, args.out)))
+        return
+
+    report= {"backends": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        for backend in ["torch", "onnx"]:
+            out_path= os.path.join(tmp, f"{backend}.npy")
+            result= subprocess.run(
+                [sys.executable, "-m", "benchmarks.bench_embedding_backends", "--worker", backend,
+                 "--threads", str(args.threads), "--out", out_path],
+                capture_output=True, text=True
+            )
+            if result.returncode != 0:
+                report["backends"][backend] = {"error": result.stderr.strip().splitlines()[-1]}
+                continue
+            report["backends"][backend] = json.loads(result.stdout.strip().splitlines()[-1])
+
+        torch_path, onnx_path= os.path.join(tmp, "torch.npy"), os.path.join(tmp, "onnx.npy")
+        if os.path.exists(torch_path) and os.path.exists(onnx_path):
+            reference, candidate= np.load(torch_path), np.load(onnx_path)
+            reference /= np.linalg.norm(reference, axis=1, keepdims=True)
+            candidate /= np.linalg.norm(candidate, axis=1, keepdims=True)
+            cosine= (reference * candidate).sum(axis=1)
+            # Top-1 agreement: does each text's nearest neighbour stay the same?
+            ref_sim, cand_sim= reference @ reference.T, candidate @ candidate.T
+            np.fill_diagonal(ref_sim, -1)
+            np.fill_diagonal(cand_sim, -1)
+            report["parity"] = {
+                "texts": len(cosine),
+                "cosine_mean": round(float(cosine.mean()), 5),
+                "cosine_min": round(float(cosine.min()), 5),
+                "cosine_p5": round(float(np.percentile(cosine, 5)), 5),
+                "nearest_neighbour_agreement": round(float((ref_sim.argmax(1) == cand_sim.argmax(1)).mean()), 4)
+            }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
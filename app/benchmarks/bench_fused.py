@@ -0,0 +1,80 @@
+import asyncio
+import json
+import time
+from typing import Dict, Any, List
+
+from benchmarks.fakes import FakeProvider
+
+# End-to-end latency and token usage of the two-call and fused analysis + generation paths.
+# Uses the real prompts and RitualArchitect with a fake provider, so token counts are estimates
+# (4 characters per token) and latency follows the fake's time-to-first-token + per-token model.
+# Run from app/: python -m benchmarks.bench_fused [--rituals N] [--invalid-rate R]
+
+
+async def run_mode(fused: bool, rituals: int, concurrency: int, args) -> Dict[str, Any]:
+    from prompts.prompts import STATE_EXAMPLES
+    from models.schemas import UserInput
+    from services.ai_service import ai_service, AIMemoryService
+    from usecases.ritual_architect import RitualArchitect
+    from config.setting import Config
+
+    Config.ritual_fused_mode= fused
+    Config.ritual_cache_enabled= False
+    provider= FakeProvider("fake", latency_ms=args.ttft_ms, sigma=args.sigma, ms_per_token=args.ms_per_token,
+                           invalid_rate=args.invalid_rate, seed=args.seed)
+    ai_service.override(AIMemoryService(providers=[provider]))
+    architect= RitualArchitect()
+
+    texts= [text for examples in STATE_EXAMPLES.values() for text in examples]
+    latencies: List[float] = []
+    failures= 0
+    semaphore= asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            start= time.perf_counter()
+            try:
+                await architect.process_input(UserInput(text=texts[i % len(texts)], session_id=f"bench-{i}"))
+                latencies.append((time.perf_counter() - start) * 1000)
+            except ValueError:
+                failures += 1
+
+    await asyncio.gather(*[one(i) for i in range(rituals)])
+    latencies.sort()
+
+    def pct(fraction: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1) if latencies else None
+
+    return {
+        "p50_ms": pct(0.50),
+        "p95_ms": pct(0.95),
+        "failures": failures,
+        "llm_calls_per_ritual": round(provider.calls / rituals, 3),
+        "prompt_tokens_per_ritual": round(provider.prompt_tokens / rituals, 1),
+        "completion_tokens_per_ritual": round(provider.completion_tokens / rituals, 1)
+    }
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Compare two-call and fused ritual generation")
+    parser.add_argument("--rituals", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--ttft-ms", type=float, default=300.0, help="Fake time to first token per call")
+    parser.add_argument("--ms-per-token", type=float, default=2.0, help="Fake decode time per output token")
+    parser.add_argument("--sigma", type=float, default=0.3)
+    parser.add_argument("--invalid-rate", type=float, default=0.0, help="Fraction of fake answers that are not JSON")
+    parser.add_argument("--seed", type=int, default=0)
+    args= parser.parse_args()
+
+    report= {
+        "two_call": asyncio.run(run_mode(False, args.rituals, args.concurrency, args)),
+        "fused": asyncio.run(run_mode(True, args.rituals, args.concurrency, args))
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
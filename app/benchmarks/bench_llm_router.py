@@ -0,0 +1,79 @@
+import asyncio
+import json
+import time
+from typing import Dict, Any, List
+
+from benchmarks.fakes import FakeProvider
+
+# Compares a single provider, router failover and hedged routing on fake providers.
+# Run from app/: python -m benchmarks.bench_llm_router [--calls N] [--concurrency C]
+
+
+def build_providers(scale: float, seed: int) -> List[FakeProvider]:
+    # A usually-fast provider with a heavy tail and some failures, and a steadier, slower one
+    return [
+        FakeProvider("primary", latency_ms=400 * scale, sigma=0.9, error_rate=0.02, invalid_rate=0.02, seed=seed),
+        FakeProvider("secondary", latency_ms=900 * scale, sigma=0.25, seed=seed + 1)
+    ]
+
+
+async def run_mode(mode: str, calls: int, concurrency: int, scale: float, seed: int) -> Dict[str, Any]:
+    from services.ai_service import AIMemoryService
+
+    providers= build_providers(scale, seed)
+    service= AIMemoryService(providers=providers[:1] if mode == "single" else providers)
+    service.router.hedge= mode == "hedged"
+    service.router.hedge_delay= 900 * scale / 1000
+    service.router.explore_rate= 0.0
+
+    latencies: List[float] = []
+    failures= 0
+    semaphore= asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal failures
+        async with semaphore:
+            start= time.perf_counter()
+            try:
+                await service.generate_ritual_step(f"state {i}")
+                latencies.append((time.perf_counter() - start) * 1000)
+            except ValueError:
+                failures += 1
+
+    await asyncio.gather(*[one(i) for i in range(calls)])
+    latencies.sort()
+
+    def pct(fraction: float) -> float:
+        return round(latencies[min(len(latencies) - 1, int(len(latencies) * fraction))], 1) if latencies else None
+
+    router= service.router.get_stats()
+    return {
+        "p50_ms": pct(0.50),
+        "p90_ms": pct(0.90),
+        "p99_ms": pct(0.99),
+        "failures": failures,
+        "provider_calls": {provider.name: provider.calls for provider in providers[:len(service.router.providers)]},
+        "extra_call_rate": round(sum(provider.calls for provider in service.router.providers) / calls - 1, 3),
+        "hedges": router["hedges"],
+        "hedge_wins": router["hedge_wins"],
+        "failovers": router["failovers"]
+    }
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Benchmark LLM routing modes with fake providers")
+    parser.add_argument("--calls", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--scale", type=float, default=0.1, help="Multiply fake latencies (1.0 = realistic seconds)")
+    parser.add_argument("--seed", type=int, default=0)
+    args= parser.parse_args()
+
+    report= {mode: asyncio.run(run_mode(mode, args.calls, args.concurrency, args.scale, args.seed))
+             for mode in ["single", "failover", "hedged"]}
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import json
+import os
+import resource
+import shutil
+import tempfile
+import time
+from typing import Dict, Any, List, Tuple
+
+import numpy as np
+
+from benchmarks.bench_session_mirror import percentiles
+
+# Write and query costs of the self-hosted vector store at increasing sizes. Synthetic sessions cluster
+# around one centroid per user state and are upserted in batches; 5% are then overwritten (leaving dead
+# rows) and 5% re-rated. Queries use the retrieval filter (rating >= 3 on one user state) and no filter,
+# first on float32 and then with the int8 copy (recall@k is measured against the exact float32 results).
+# Run from app/: python -m benchmarks.bench_local_vector_store [--sessions 100000,1000000] [--quantize]
+
+
+def timed(samples: List[float], call, *args, **kwargs):
+    start= time.perf_counter()
+    result= call(*args, **kwargs)
+    samples.append((time.perf_counter() - start) * 1e6)
+    return result
+
+
+def run_size(args, sessions: int, path: str) -> Dict[str, Any]:
+    from prompts.prompts import USER_STATES
+    from repository.local_vector_store import LocalVectorStore
+
+    rng= np.random.default_rng(args.seed)
+    states= USER_STATES[:-1]
+    centroids= rng.normal(size=(len(states), args.dim)).astype(np.float32)
+    ritual= json.dumps([{"title": "Deep Calm Breathing", "content": "Inhale for 5 seconds, exhale for 7.", "step_type": "Breathing"}])
+
+    def batch(start: int, count: int) -> List[Dict[str, Any]]:
+        labels= rng.integers(len(states), size=count)
+        values= centroids[labels] + rng.normal(scale=1.5, size=(count, args.dim)).astype(np.float32)
+        return [{
+            "id": f"s{start + i}",
+            "values": values[i],
+            "metadata": {"user_state": states[label], "ritual_steps": ["Breathing"], "ritual": ritual, "rating": int(rating)}
+        } for i, (label, rating) in enumerate(zip(labels, rng.integers(1, 6, size=count)))]
+
+    store= LocalVectorStore(path, args.dim, compact_min_rows=sessions)
+    start= time.perf_counter()
+    for offset in range(0, sessions, args.batch_size):
+        store.upsert(batch(offset, min(args.batch_size, sessions - offset)))
+    upsert_s= time.perf_counter() - start
+
+    # Overwrite a sample in place (new rows, old ones dead) and re-rate another
+    overwrite= rng.choice(sessions, size=sessions // 20, replace=False)
+    for offset in range(0, len(overwrite), args.batch_size):
+        records= batch(0, len(overwrite[offset:offset + args.batch_size]))
+        store.upsert([{**record, "id": f"s{i}"} for record, i in zip(records, overwrite[offset:offset + args.batch_size])])
+    update_us= []
+    for i in rng.choice(sessions, size=min(sessions // 20, 2000), replace=False):
+        timed(update_us, store.update, id=f"s{i}", set_metadata={"rating": int(rng.integers(1, 6))})
+    fetch_us= []
+    for i in rng.choice(sessions, size=200, replace=False):
+        timed(fetch_us, store.fetch, ids=[f"s{i}"])
+
+    queries= []
+    for _ in range(args.queries):
+        state= int(rng.integers(len(states)))
+        queries.append(((centroids[state] + rng.normal(scale=1.5, size=args.dim)).astype(np.float32).tolist(), states[state]))
+
+    def run_queries(store, filtered: bool) -> Tuple[Dict[str, float], List[List[str]]]:
+        samples, results= [], []
+        for vector, state in queries:
+            filter= {"rating": {"$gte": 3}, "user_state": state} if filtered else None
+            found= timed(samples, store.query, vector=vector, top_k=args.top_k, include_metadata=True, filter=filter)
+            results.append([match["id"] for match in found["matches"]])
+        return percentiles(samples), results
+
+    report: Dict[str, Any] = {
+        "sessions": sessions,
+        "upsert_vectors_per_s": round(sessions / upsert_s),
+        "update_metadata": percentiles(update_us),
+        "fetch": percentiles(fetch_us),
+        "stats_before_compaction": store.describe_index_stats()
+    }
+    exact= {}
+    for filtered in (True, False):
+        name= "filtered" if filtered else "unfiltered"
+        # Warm the metadata columns and page cache before timing
+        store.query(vector=queries[0][0], top_k=args.top_k, filter={"rating": {"$gte": 3}, "user_state": queries[0][1]} if filtered else None)
+        report[f"query_{name}"], exact[name]= run_queries(store, filtered)
+
+    start= time.perf_counter()
+    store.compact()
+    report["compact_s"] = round(time.perf_counter() - start, 2)
+    store.close()
+
+    start= time.perf_counter()
+    store= LocalVectorStore(path, args.dim, compact_min_rows=sessions)
+    report["reopen_s"] = round(time.perf_counter() - start, 2)
+    store.close()
+
+    if args.quantize:
+        start= time.perf_counter()
+        store= LocalVectorStore(path, args.dim, quantize=True, compact_min_rows=sessions)
+        report["quantize_s"] = round(time.perf_counter() - start, 2)
+        for filtered in (True, False):
+            name= "filtered" if filtered else "unfiltered"
+            store.query(vector=queries[0][0], top_k=args.top_k, filter={"rating": {"$gte": 3}, "user_state": queries[0][1]} if filtered else None)
+            latency, results= run_queries(store, filtered)
+            recall= [len(set(found) & set(expected)) / len(expected) for found, expected in zip(results, exact[name]) if expected]
+            report[f"query_{name}_int8"] = {**latency, f"recall_at_{args.top_k}": round(sum(recall) / len(recall), 4)}
+        store.close()
+
+    report["disk_bytes"] = sum(os.path.getsize(os.path.join(path, file)) for file in os.listdir(path))
+    report["max_rss_mb"] = round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+    return report
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Benchmark the local memory-mapped vector store")
+    parser.add_argument("--sessions", default="100000,1000000", help="Comma-separated store sizes")
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--quantize", action="store_true", help="Also measure queries on the int8 copy")
+    parser.add_argument("--path", default=None, help="Scratch directory (default: a temporary directory)")
+    parser.add_argument("--seed", type=int, default=0)
+    args= parser.parse_args()
+
+    root= args.path or tempfile.mkdtemp(prefix="local-vector-store-")
+    reports= []
+    try:
+        for sessions in (int(size) for size in args.sessions.split(",")):
+            path= os.path.join(root, str(sessions))
+            shutil.rmtree(path, ignore_errors=True)
+            reports.append(run_size(args, sessions, path))
+            shutil.rmtree(path, ignore_errors=True)
+    finally:
+        if args.path is None:
+            shutil.rmtree(root, ignore_errors=True)
+    print(json.dumps(reports, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import json
+import logging
+import os
+import queue
+import tempfile
+import time
+from logging.handlers import QueueListener, RotatingFileHandler
+from typing import Dict, Any
+
+from config.logging import JSONFormatter, ContextFilter, SamplingFilter, DeferredQueueHandler, HOT, session_id_var
+
+# Caller-side cost of logging one request, old synchronous handler vs the queued JSON pipeline.
+# Run from app/: python -m benchmarks.bench_logging [--requests N]
+
+RAW_RESPONSE= json.dumps([
+    {"step_number": i + 1, "title": f"Step {i + 1}", "step_type": f"Type{i}",
+     "content": "Sit comfortably and inhale deeply through your nose for 5 seconds. Hold for 3 seconds, then exhale slowly."}
+    for i in range(7)
+])
+
+
+class SlowDiskMixin:
+    # Adds a fixed per-write stall to model a busy or network-backed disk
+    write_latency_s= 0.0
+
+    def emit(self, record: logging.LogRecord):
+        if self.write_latency_s:
+            time.sleep(self.write_latency_s)
+        super().emit(record)
+
+
+class SlowFileHandler(SlowDiskMixin, logging.FileHandler):
+    pass
+
+
+class SlowRotatingFileHandler(SlowDiskMixin, RotatingFileHandler):
+    pass
+
+
+def legacy_logger(path: str) -> logging.Logger:
+    # Previous setup: DEBUG level, synchronous FileHandler on the calling thread
+    logger= logging.getLogger("bench.legacy")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate= False
+    handler= SlowFileHandler(path)
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(levelname)s - %(message)s'))
+    logger.addHandler(handler)
+    return logger
+
+
+def pipeline_logger(name: str, path: str, level: int, sample_debug: float = 1.0):
+    # Same wiring as config.logging.setup_logger, pointed at a scratch file
+    logger= logging.getLogger(f"bench.{name}")
+    logger.setLevel(level)
+    logger.propagate= False
+    file_handler= SlowRotatingFileHandler(path, maxBytes=10 * 1024 * 1024, backupCount=1, encoding="utf-8")
+    file_handler.setFormatter(JSONFormatter())
+    log_queue= queue.SimpleQueue()
+    queue_handler= DeferredQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter({logging.DEBUG: sample_debug}))
+    queue_handler.addFilter(ContextFilter())
+    logger.addHandler(queue_handler)
+    listener= QueueListener(log_queue, file_handler, respect_handler_level=True)
+    listener.start()
+    return logger, listener
+
+
+def legacy_request(logger: logging.Logger, session_id: str):
+    # The old call sites: eager f-strings on every call
+    logger.info(f"Received request for current step: session {session_id}")
+    logger.info(f"Retrieving current step for session {session_id}")
+    logger.debug(f"Raw LLM response: {RAW_RESPONSE}")
+    logger.debug(f"Created embedding with {384} dimensions")
+
+
+def pipeline_request(logger: logging.Logger, session_id: str):
+    session_id_var.set(session_id)
+    logger.debug("Received request for current step: session %s", session_id, extra=HOT)
+    logger.info("Retrieving current step for session %s", session_id, extra=HOT)
+    logger.debug("Raw LLM response: %s", RAW_RESPONSE, extra=HOT)
+    logger.debug("Created embedding with %s dimensions", 384, extra=HOT)
+
+
+def measure(fn, logger: logging.Logger, requests: int) -> float:
+    start= time.perf_counter()
+    for i in range(requests):
+        fn(logger, f"session-{i}")
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Benchmark the logging pipeline")
+    parser.add_argument("--requests", type=int, default=20000)
+    parser.add_argument("--write-latency-us", type=float, default=0.0, help="Simulated stall per log write")
+    args= parser.parse_args()
+    SlowDiskMixin.write_latency_s= args.write_latency_us / 1e6
+
+    report: Dict[str, Any] = {"requests": args.requests, "write_latency_us": args.write_latency_us, "caller_us_per_request": {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        logger= legacy_logger(os.path.join(tmp, "legacy.log"))
+        report["caller_us_per_request"]["legacy_sync_debug"] = round(measure(legacy_request, logger, args.requests), 2)
+
+        for name, level, sample in [("queued_debug", logging.DEBUG, 1.0),
+                                    ("queued_debug_sampled_10pct", logging.DEBUG, 0.1),
+                                    ("queued_info", logging.INFO, 1.0)]:
+            logger, listener= pipeline_logger(name, os.path.join(tmp, f"{name}.log"), level, sample)
+            report["caller_us_per_request"][name] = round(measure(pipeline_request, logger, args.requests), 2)
+            start= time.perf_counter()
+            listener.stop()
+            report.setdefault("listener_drain_ms", {})[name] = round((time.perf_counter() - start) * 1000, 1)
+
+        report["bytes_written"] = {}
+        for name in sorted(os.listdir(tmp)):
+            key= name.split(".")[0]
+            report["bytes_written"][key] = report["bytes_written"].get(key, 0) + os.path.getsize(os.path.join(tmp, name))
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
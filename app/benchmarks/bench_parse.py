@@ -0,0 +1,59 @@
+import asyncio
+import json
+from typing import Dict, Any
+
+from benchmarks.fakes import FakeProvider
+
+# Parse-failure rate of ritual generation with the old fixed 500-token budget and with the adaptive budget.
+# The fake provider writes 4-7 steps of 2-4 sentences and cuts its answer at max_output_tokens, like a real model.
+# strict_failure_rate is the share of responses a plain json.loads would reject (the old behaviour);
+# failure_rate is what remains after salvaging complete steps from truncated arrays.
+# Run from app/: python -m benchmarks.bench_parse [--requests N]
+
+
+async def run_mode(adaptive: bool, output_tokens: int, args) -> Dict[str, Any]:
+    from services.ai_service import AIMemoryService
+    from prompts.prompts import USER_STATES
+    from config.setting import Config
+
+    Config.llm_adaptive_output_tokens= adaptive
+    Config.llm_output_tokens= output_tokens
+    provider= FakeProvider("fake", latency_ms=args.latency_ms, sigma=0.0, sentences=(2, 4), step_range=(4, 7), seed=args.seed)
+    service= AIMemoryService(providers=[provider])
+
+    failures= 0
+    steps= 0
+    for i in range(args.requests):
+        try:
+            steps += len(await service.generate_ritual_step(USER_STATES[i % (len(USER_STATES) - 1)]))
+        except ValueError:
+            failures += 1
+
+    return {
+        "parse": service.get_parse_stats().get("generate_ritual_step"),
+        "request_failures": failures,
+        "truncated_responses": provider.truncated,
+        "steps_per_ritual": round(steps / max(1, args.requests - failures), 2),
+        "completion_tokens_per_call": round(provider.completion_tokens / provider.calls, 1),
+        "output_budget": service.output_budget.get_stats()
+    }
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Compare ritual parse failures with fixed and adaptive output budgets")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--latency-ms", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args= parser.parse_args()
+
+    report= {
+        "fixed_500": asyncio.run(run_mode(False, 500, args)),
+        "adaptive": asyncio.run(run_mode(True, 1024, args))
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+import asyncio
+import json
+import random
+import time
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+# Recall and latency of the in-process session mirror against the filtered vector-store query.
+# Synthetic sessions cluster around one centroid per user state and are loaded into the mirror with
+# load_mirror's paged list + fetch scan. 1% are then re-rated through the repository, and 0.5% more are
+# written straight to the index as another replica would; recall is reported before and after the
+# incremental refresh (refresh_mirror, one query filtered on updated_at) that picks those up. The "remote" side is the in-memory index behind AsyncVectorIndex, i.e. a
+# lower bound for Pinecone: --rtt-ms adds a simulated network round trip to each remote query. Both
+# sides apply the same filter (the query's state, rated >= 3), so the remote result is the exact answer.
+# Run from app/: python -m benchmarks.bench_session_mirror [--sessions N] [--queries N] [--rtt-ms MS]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    ordered= sorted(samples)
+    return {
+        "p50_us": round(ordered[len(ordered) // 2], 1),
+        "p99_us": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))], 1)
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    from prompts.prompts import USER_STATES
+    from benchmarks.fakes import HashEmbeddingBackend
+    import repository.pinecone_repository as pinecone_repository
+    from config.setting import Config
+
+    Config.vector_backend= "memory"
+    Config.session_mirror_enabled= True
+    # Everything upserted before the load would otherwise fall inside the refresh window
+    Config.session_mirror_refresh_overlap_s= 0.0
+    pinecone_repository.create_embedding_backend= lambda *_, **__: HashEmbeddingBackend(dim=args.dim)
+    repository= pinecone_repository.PineconeRespository()
+    index= repository.index.index
+    min_rating= Config.similar_session_min_rating
+
+    rng= np.random.default_rng(args.seed)
+    states= USER_STATES[:-1]
+    centroids= rng.normal(size=(len(states), args.dim)).astype(np.float32)
+    ritual= json.dumps([{"title": "Deep Calm Breathing", "content": "Inhale for 5 seconds, exhale for 7.", "step_type": "Breathing"}])
+
+    def sessions(prefix: str, count: int) -> List[Dict[str, Any]]:
+        vectors= []
+        for i in range(count):
+            state= int(rng.integers(len(states)))
+            values= (centroids[state] + rng.normal(scale=1.5, size=args.dim)).astype(np.float32).tolist()
+            metadata= {"user_state": states[state], "ritual_steps": ["Breathing"], "ritual": ritual, "rating": int(rng.integers(1, 6)),
+                        "updated_at": time.time()}
+            vectors.append({"id": f"{prefix}{i}", "values": values, "metadata": metadata})
+        return vectors
+
+    vectors= sessions("s", args.sessions)
+    index.upsert(vectors)
+    start= time.perf_counter()
+    await repository.load_mirror()
+    load_s= time.perf_counter() - start
+
+    # Re-rate a sample as feedback submissions on this replica would
+    sample= random.Random(args.seed).sample(vectors, args.sessions // 100)
+    await repository.update_session_ratings({vector["id"]: int(rng.integers(1, 6)) for vector in sample})
+    # Sessions stored by another replica reach the mirror only through a refresh
+    index.upsert(sessions("r", args.sessions // 200))
+
+    queries= []
+    for _ in range(args.queries):
+        state= int(rng.integers(len(states)))
+        queries.append((states[state], (centroids[state] + rng.normal(scale=1.5, size=args.dim)).astype(np.float32).tolist()))
+
+    remote_us, expected= [], []
+    for state, query in queries:
+        start= time.perf_counter()
+        results= await repository.index.query(vector=query, top_k=args.top_k, include_metadata=True,
+                                              filter={"rating": {"$gte": min_rating}, "user_state": state})
+        if args.rtt_ms:
+            await asyncio.sleep(args.rtt_ms / 1000)
+        remote_us.append((time.perf_counter() - start) * 1e6)
+        expected.append({match["id"] for match in results["matches"]})
+
+    def mirror_recall(timings: Optional[List[float]] = None) -> float:
+        recalls= []
+        for (state, query), truth in zip(queries, expected):
+            start= time.perf_counter()
+            found= repository.mirror.search(query, state, args.top_k)
+            if timings is not None:
+                timings.append((time.perf_counter() - start) * 1e6)
+            if truth:
+                recalls.append(len(truth & {session["session_id"] for session in found}) / len(truth))
+        return round(sum(recalls) / len(recalls), 4)
+
+    stale_recall= mirror_recall()
+    start= time.perf_counter()
+    await repository.refresh_mirror()
+    refresh_s= time.perf_counter() - start
+    mirror_us= []
+    recall= mirror_recall(mirror_us)
+    repository.index.close()
+
+    return {
+        "sessions": args.sessions,
+        "mirror": {**repository.mirror.get_stats(), "load_ms": round(load_s * 1000, 1), "refresh_ms": round(refresh_s * 1000, 1)},
+        "remote_query": percentiles(remote_us),
+        "mirror_query": percentiles(mirror_us),
+        f"recall_at_{args.top_k}_before_refresh": stale_recall,
+        f"recall_at_{args.top_k}": recall
+    }
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Compare the session mirror with the filtered vector-store query")
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--top-k", type=int, default=3)
+    parser.add_argument("--rtt-ms", type=float, default=0.0, help="Simulated network round trip added to remote queries")
+    parser.add_argument("--seed", type=int, default=0)
+    args= parser.parse_args()
+
+    report= asyncio.run(run(args))
+    report["mirror"].pop("shards")
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
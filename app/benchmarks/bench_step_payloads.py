@@ -0,0 +1,87 @@
+import json
+import timeit
+from typing import Dict, Any
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from models.schemas import Ritual, RitualStep
+from usecases.step_payloads import build_step_payloads, progress_at
+
+# Microbenchmark for the step-navigation response path.
+# Run from app/: python -m benchmarks.bench_step_payloads
+
+
+def make_ritual(steps: int = 7) -> Ritual:
+    return Ritual(
+        session_id="bench-session",
+        user_state="Anxiety and Overwhelm",
+        steps=[RitualStep(
+            step_number=i + 1,
+            title=f"Step {i + 1}",
+            content="Sit comfortably and inhale deeply through your nose for 5 seconds. Hold for 3 seconds, then exhale slowly for 7 seconds.",
+            step_type=f"Type{i}"
+        ) for i in range(steps)]
+    )
+
+
+response_adapter= TypeAdapter(Dict[str, Any])
+
+
+def baseline_current_step(session: Dict[str, Any]) -> bytes:
+    # Previous path: linear step scan, fresh dicts, then generic response validation and encoding
+    current= None
+    for step in session['ritual'].steps:
+        if step.step_number == session['current_step']:
+            current= step
+            break
+    completed= len(session['completed_steps'])
+    total= session['total_steps']
+    response= {
+        "success": True,
+        "session_id": session['ritual'].session_id,
+        "current_step": current,
+        "progress": {
+            "completed_steps": completed,
+            "total_steps": total,
+            "percentage": int((completed / total) * 100) if total > 0 else 0,
+            "current_step_number": session['current_step']
+        },
+        "is_complete": session['current_step'] > total
+    }
+    content= jsonable_encoder(response_adapter.validate_python(response))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode("utf-8")
+
+
+def precomputed_current_step(session: Dict[str, Any]) -> bytes:
+    return session['payloads']['current'][session['current_step'] - 1]
+
+
+def main(number: int = 20000):
+    ritual= make_ritual()
+    position= 6
+    session= {
+        "ritual": ritual,
+        "current_step": position,
+        "total_steps": len(ritual.steps),
+        "completed_steps": list(range(1, position)),
+        "payloads": build_step_payloads(ritual.session_id, ritual)
+    }
+    assert json.loads(baseline_current_step(session)) == json.loads(precomputed_current_step(session))
+    assert json.loads(precomputed_current_step(session))["progress"] == progress_at(position, len(ritual.steps))
+
+    build_us= timeit.timeit(lambda: build_step_payloads(ritual.session_id, ritual), number=1000) / 1000 * 1e6
+    results= {}
+    for name, fn in [("baseline", baseline_current_step), ("precomputed", precomputed_current_step)]:
+        best= min(timeit.repeat(lambda: fn(session), number=number, repeat=5))
+        results[name]= best / number * 1e6
+    print(json.dumps({
+        "baseline_us_per_call": round(results["baseline"], 3),
+        "precomputed_us_per_call": round(results["precomputed"], 3),
+        "speedup": round(results["baseline"] / results["precomputed"], 1),
+        "one_time_build_us_per_session": round(build_us, 1)
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
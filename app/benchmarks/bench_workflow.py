@@ -0,0 +1,105 @@
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, Any
+
+# Per-request overhead of the LangGraph and direct workflow executors. The ritual architect, session
+# store, write-behind queue and session ids are stubbed, so the same nodes run under both executors and
+# only the orchestration differs. Persistence and session start sleep for --branch-ms (0 isolates overhead).
+# Run from app/: python -m benchmarks.bench_workflow [--requests N] [--branch-ms MS]
+
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.setdefault("LOG_FILE", os.path.join(tempfile.gettempdir(), "focusforge-bench-workflow.log"))
+
+
+class StubArchitect:
+    def __init__(self, ritual):
+        self.ritual= ritual
+
+    async def process_input(self, user_input):
+        return self.ritual.model_copy(update={"session_id": user_input.session_id})
+
+
+class StubGuide:
+    def __init__(self, delay_s: float):
+        self.delay= delay_s
+
+    async def start_session(self, ritual):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return {"success": True}
+
+    async def collect_feedback(self, session_id, feedback):
+        return {"success": True}
+
+
+class StubRepository:
+    def generate_session_id(self) -> str:
+        return str(uuid.uuid4())
+
+
+class StubWriter:
+    def __init__(self, delay_s: float):
+        self.delay= delay_s
+
+    async def enqueue(self, session_memory):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+
+async def run_executor(executor: str, args) -> Dict[str, Any]:
+    import services.workflow as workflow
+    from models.schemas import Ritual, RitualStep
+    from config.setting import Config
+
+    Config.workflow_executor= executor
+    Config.session_write_behind= True
+    workflow.session_writer= StubWriter(args.branch_ms / 1000)
+    workflow.pinecone_service= StubRepository()
+    ritual= Ritual(
+        session_id="bench",
+        user_state="Burnout",
+        steps=[RitualStep(step_number=i + 1, title=f"Step {i + 1}", content="Breathe in slowly and out again.", step_type="Breathing") for i in range(5)],
+        created_at=datetime.now()
+    )
+    service= workflow.WorkflowService()
+    service.architect= StubArchitect(ritual)
+    service.guide= StubGuide(args.branch_ms / 1000)
+
+    for _ in range(min(100, args.requests)):
+        await service.run_workflow("warm up")
+
+    latencies= []
+    for _ in range(args.requests):
+        start= time.perf_counter()
+        await service.run_workflow("I feel exhausted and burned out")
+        latencies.append((time.perf_counter() - start) * 1e6)
+    latencies.sort()
+    return {
+        "mean_us": round(sum(latencies) / len(latencies), 1),
+        "p50_us": round(latencies[len(latencies) // 2], 1),
+        "p99_us": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))], 1)
+    }
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Compare LangGraph and direct workflow executors")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--branch-ms", type=float, default=0.0, help="Stub latency of persistence and session start")
+    args= parser.parse_args()
+
+    report= {executor: asyncio.run(run_executor(executor, args)) for executor in ("langgraph", "direct")}
+    if args.branch_ms:
+        # Both branches sleep branch_ms; run in sequence they would take twice that
+        report["sequential_branches_us"] = round(2 * args.branch_ms * 1000, 1)
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
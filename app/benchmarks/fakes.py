@@ -0,0 +1,181 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
+
+import numpy as np
+
+from prompts.prompts import USER_STATES
+from services.llm_providers import LLMProvider
+
+# Deterministic stand-ins for the LLM and the embedding model, used by offline benchmarks
+
+STEP_TYPES= ["Breathing", "Affirmation", "Journaling", "Gratitude", "Movement", "Visualization", "Focus"]
+SENTENCES= [
+    "Sit comfortably and inhale deeply through your nose for 5 seconds.",
+    "Hold for 3 seconds, then exhale slowly for 7 seconds, releasing the tension in your shoulders.",
+    "Repeat softly to yourself that you are capable and calm, letting each word sink in.",
+    "Write down three things you are grateful for today, no matter how small they seem.",
+    "Notice how your body feels and let your attention settle on the present moment.",
+    "Picture yourself handling the day's challenges with ease and steady focus."
+]
+
+
+class FakeAIService:
+    # Drop-in for AIMemoryService with log-normal latency and a configurable error rate
+    def __init__(self, analysis_ms: float = 400.0, generation_ms: float = 1500.0, sigma: float = 0.3,
+                 error_rate: float = 0.0, steps: int = 5, seed: Optional[int] = 0):
+        self.analysis_ms= analysis_ms
+        self.generation_ms= generation_ms
+        self.sigma= sigma
+        self.error_rate= error_rate
+        self.steps= steps
+        self.rng= random.Random(seed)
+        self.calls: Dict[str, int] = {"analyze_user_state": 0, "generate_ritual_step": 0, "analyze_and_generate": 0, "stream_ritual_steps": 0}
+        self.errors= 0
+
+    async def _delay(self, median_ms: float):
+        # Log-normal around the median, which is the usual shape of LLM latency
+        if median_ms > 0:
+            await asyncio.sleep(median_ms * self.rng.lognormvariate(0, self.sigma) / 1000)
+
+    def _maybe_fail(self, call: str):
+        if self.error_rate and self.rng.random() < self.error_rate:
+            self.errors += 1
+            raise ValueError(f"Fake {call} failure")
+
+    def _state_for(self, user_input: str) -> str:
+        digest= int(hashlib.sha256(user_input.encode("utf-8")).hexdigest(), 16)
+        return USER_STATES[digest % (len(USER_STATES) - 1)]
+
+    def _ritual_for(self, user_state: str) -> List[Dict[str, str]]:
+        return [{
+            "title": f"{STEP_TYPES[i % len(STEP_TYPES)]} for {user_state}",
+            "content": "Sit comfortably and inhale deeply through your nose for 5 seconds. Hold for 3 seconds, then exhale slowly for 7 seconds.",
+            "step_type": STEP_TYPES[i % len(STEP_TYPES)]
+        } for i in range(self.steps)]
+
+    async def analyze_user_state(self, user_input: str) -> Dict[str, Any]:
+        self.calls["analyze_user_state"] += 1
+        await self._delay(self.analysis_ms)
+        self._maybe_fail("analyze_user_state")
+        return {"state": self._state_for(user_input), "confidence": 0.9}
+
+    async def generate_ritual_step(self, user_state: str) -> List[Dict[str, str]]:
+        self.calls["generate_ritual_step"] += 1
+        await self._delay(self.generation_ms)
+        self._maybe_fail("generate_ritual_step")
+        return self._ritual_for(user_state)
+
+    async def analyze_and_generate(self, user_input: str) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        # One call for both: about as slow as generation alone, since the state adds only a few tokens
+        self.calls["analyze_and_generate"] += 1
+        await self._delay(self.generation_ms)
+        self._maybe_fail("analyze_and_generate")
+        state= self._state_for(user_input)
+        return {"state": state, "confidence": 0.9}, self._ritual_for(state)
+
+    async def stream_ritual_steps(self, user_state: str) -> AsyncIterator[Dict[str, str]]:
+        self.calls["stream_ritual_steps"] += 1
+        self._maybe_fail("stream_ritual_steps")
+        for step in self._ritual_for(user_state):
+            await self._delay(self.generation_ms / self.steps)
+            yield step
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {"calls": dict(self.calls), "errors": self.errors}
+
+
+class FakeProvider(LLMProvider):
+    # Local LLMProvider for router tests: log-normal latency, errors and invalid-JSON answers.
+    # Answers are cut at max_output_tokens like a real model; sentences=(low, high) gives each
+    # step a random number of sentences and step_range=(low, high) a random number of steps.
+    def __init__(self, name: str, latency_ms: float = 800.0, sigma: float = 0.3, error_rate: float = 0.0,
+                 invalid_rate: float = 0.0, steps: int = 5, seed: Optional[int] = 0, ms_per_token: float = 0.0,
+                 sentences: Optional[Tuple[int, int]] = None, step_range: Optional[Tuple[int, int]] = None):
+        self.name= name
+        # latency_ms is the time to first token; ms_per_token adds decode time for the answer
+        self.latency_ms= latency_ms
+        self.ms_per_token= ms_per_token
+        self.sigma= sigma
+        self.error_rate= error_rate
+        self.invalid_rate= invalid_rate
+        self.rng= random.Random(seed)
+        self.helper= FakeAIService(steps=steps)
+        self.sentences= sentences
+        self.step_range= step_range
+        self.calls= 0
+        self.truncated= 0
+        self.prompt_tokens= 0
+        self.completion_tokens= 0
+
+    def _steps_for(self, user_state: str) -> List[Dict[str, str]]:
+        steps= self.helper._ritual_for(user_state)
+        if self.step_range:
+            count= self.rng.randint(*self.step_range)
+            steps= [steps[i % len(steps)] for i in range(count)]
+        if self.sentences:
+            steps= [{**step, "content": " ".join(self.rng.choice(SENTENCES) for _ in range(self.rng.randint(*self.sentences)))}
+                    for step in steps]
+        return steps
+
+    def _answer(self, call: str, prompt: str, max_output_tokens: int) -> str:
+        if self.invalid_rate and self.rng.random() < self.invalid_rate:
+            return "Sorry, I can't help with that."
+        if call == "analyze_user_state":
+            answer= json.dumps({"state": self.helper._state_for(prompt), "confidence": 0.9})
+        elif call == "analyze_and_generate":
+            state= self.helper._state_for(prompt)
+            answer= json.dumps({"state": state, "confidence": 0.9, "steps": self._steps_for(state)}, indent=2)
+        else:
+            answer= json.dumps(self._steps_for(USER_STATES[0]), indent=2)
+        if len(answer) // 4 > max_output_tokens:
+            self.truncated += 1
+            answer= answer[:max_output_tokens * 4]
+        return answer
+
+    async def generate(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                       schema: Optional[Dict[str, Any]] = None) -> str:
+        self.calls += 1
+        answer= self._answer(call, prompt, max_output_tokens)
+        # Rough 4-characters-per-token estimate
+        prompt_tokens, completion_tokens= len(prompt) // 4, len(answer) // 4
+        delay_ms= self.latency_ms * self.rng.lognormvariate(0, self.sigma) + completion_tokens * self.ms_per_token
+        await asyncio.sleep(delay_ms / 1000)
+        if self.error_rate and self.rng.random() < self.error_rate:
+            raise ValueError(f"Fake {self.name} failure")
+        self.prompt_tokens += prompt_tokens
+        self.completion_tokens += completion_tokens
+        self.record_usage(call, prompt_tokens, completion_tokens)
+        return answer
+
+    async def stream(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                     schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        self.calls += 1
+        text= self._answer(call, prompt, max_output_tokens)
+        for start in range(0, len(text), 40):
+            await asyncio.sleep(self.latency_ms / 1000 / max(1, len(text) // 40))
+            # Failures happen before the first chunk, like a refused or timed-out request
+            if not start and self.error_rate and self.rng.random() < self.error_rate:
+                raise ValueError(f"Fake {self.name} failure")
+            yield text[start:start + 40]
+
+
+class HashEmbeddingBackend:
+    # Embedding backend that hashes tokens into a fixed-size unit vector; similar texts share tokens
+    def __init__(self, dim: int = 384):
+        self.dim= dim
+
+    def _encode_one(self, text: str) -> np.ndarray:
+        vector= np.zeros(self.dim, dtype=np.float32)
+        for token in re.findall(r"\w+", text.lower()):
+            digest= hashlib.blake2b(token.encode("utf-8"), digest_size=8).digest()
+            index= int.from_bytes(digest[:4], "little") % self.dim
+            vector[index] += 1.0 if digest[4] & 1 else -1.0
+        norm= np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return np.stack([self._encode_one(text) for text in texts])
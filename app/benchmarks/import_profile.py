@@ -0,0 +1,51 @@
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import List, Tuple
+
+# Import-time profile of the application entry point.
+# Run from app/: python -m benchmarks.import_profile [module] [--top N]
+
+
+def profile_imports(module: str) -> List[Tuple[str, int, int]]:
+    # Return (module, self_us, cumulative_us) rows from python -X importtime
+    result= subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+    rows= []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name= line[len("import time:"):].split("|")
+        rows.append((name.strip(), int(self_us), int(cumulative_us)))
+    if result.returncode != 0:
+        print(result.stderr.splitlines()[-1], file=sys.stderr)
+    return rows
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Show startup import cost per module")
+    parser.add_argument("module", nargs="?", default="main")
+    parser.add_argument("--top", type=int, default=25)
+    args= parser.parse_args()
+
+    rows= profile_imports(args.module)
+    packages= defaultdict(int)
+    for name, self_us, _ in rows:
+        packages[name.split(".")[0]] += self_us
+
+    print(f"Total import time for '{args.module}': {sum(r[1] for r in rows) / 1000:.1f} ms\n")
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for name, self_us, cumulative_us in sorted(rows, key=lambda r: -r[2])[:args.top]:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {name}")
+    print(f"\n{'self ms':>14}  top-level package")
+    for name, self_us in sorted(packages.items(), key=lambda p: -p[1])[:args.top]:
+        print(f"{self_us / 1000:>14.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+
+# Offline load test: boots the FastAPI app in-process with a fake LLM, a hashing embedding
+# backend and the in-memory vector index, then drives create -> step -> next -> feedback flows.
+# Run from app/: python -m benchmarks.load_test --concurrency 32 --flows 500 --out bench_results/load.json
+# Compare with an earlier run: python -m benchmarks.load_test --baseline bench_results/load.json
+
+# Applied before the app is imported so Config picks them up; real environment variables win
+BENCH_ENV= {
+    "VECTOR_BACKEND": "memory",
+    "SESSION_STORE_BACKEND": "memory",
+    "LOG_LEVEL": "WARNING",
+    "LOG_FILE": os.path.join(tempfile.gettempdir(), "focusforge-load-test.log"),
+}
+
+
+def git_revision() -> Dict[str, Any]:
+    # Commit the numbers belong to, so results can be compared across commits
+    def git(*args) -> str:
+        result= subprocess.run(["git", *args], capture_output=True, text=True)
+        return result.stdout.strip() if result.returncode == 0 else ""
+    return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--untracked-files=no"))}
+
+
+def memory_mb() -> Dict[str, float]:
+    # Current and peak resident set size of this process
+    values= {}
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(("VmRSS:", "VmHWM:")):
+                    values[line.split(":")[0]] = int(line.split()[1]) / 1024
+    except OSError:
+        import resource
+        peak= resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        values= {"VmRSS": peak, "VmHWM": peak}
+    return {"rss_mb": round(values.get("VmRSS", 0.0), 1), "peak_rss_mb": round(values.get("VmHWM", 0.0), 1)}
+
+
+def percentile(sorted_values: List[float], fraction: float) -> Optional[float]:
+    # Nearest-rank percentile
+    if not sorted_values:
+        return None
+    index= min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return round(sorted_values[index], 2)
+
+
+class Recorder:
+    # Latency samples and error counts per endpoint
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Dict[str, int] = defaultdict(int)
+
+    async def request(self, client, endpoint: str, method: str, url: str, **kwargs):
+        start= time.perf_counter()
+        try:
+            response= await client.request(method, url, **kwargs)
+        except Exception:
+            self.errors[endpoint] += 1
+            return None
+        self.latencies[endpoint].append((time.perf_counter() - start) * 1000)
+        if response.status_code >= 400:
+            self.errors[endpoint] += 1
+            return None
+        return response
+
+    def summary(self, duration_s: float) -> Dict[str, Any]:
+        report= {}
+        for endpoint in sorted(set(self.latencies) | set(self.errors)):
+            samples= sorted(self.latencies[endpoint])
+            report[endpoint] = {
+                "requests": len(samples),
+                "errors": self.errors[endpoint],
+                "p50_ms": percentile(samples, 0.50),
+                "p95_ms": percentile(samples, 0.95),
+                "p99_ms": percentile(samples, 0.99),
+                "mean_ms": round(sum(samples) / len(samples), 2) if samples else None,
+                "throughput_rps": round(len(samples) / duration_s, 2) if duration_s else None
+            }
+        return report
+
+
+async def run_flow(client, recorder: Recorder, text: str, rating: int, max_steps: int = 20) -> bool:
+    # One user: create a ritual, read the first step, advance to the end, then rate it
+    response= await recorder.request(client, "create", "POST", "/api/v1/ritual", json={"text": text})
+    if response is None:
+        return False
+    session_id= response.json()["session_id"]
+
+    if await recorder.request(client, "step", "GET", f"/api/v1/step/{session_id}") is None:
+        return False
+    for _ in range(max_steps):
+        response= await recorder.request(client, "next", "POST", f"/api/v1/step/{session_id}/next")
+        if response is None:
+            return False
+        if response.json().get("ritual_complete"):
+            break
+
+    response= await recorder.request(client, "feedback", "POST", f"/api/v1/feedback/{session_id}", json={"rating": rating})
+    return response is not None
+
+
+def flow_inputs(count: int, unique: bool, seed: int) -> List[Dict[str, Any]]:
+    from prompts.prompts import STATE_EXAMPLES
+
+    rng= random.Random(seed)
+    texts= [text for examples in STATE_EXAMPLES.values() for text in examples]
+    flows= []
+    for i in range(count):
+        text= rng.choice(texts)
+        flows.append({"text": f"{text} ({i})" if unique else text, "rating": rng.randint(1, 5)})
+    return flows
+
+
+async def measure_memory(client, flows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    # Sequential pass under tracemalloc: allocation peak and retained bytes per request, by endpoint
+    class TracingRecorder(Recorder):
+        def __init__(self):
+            super().__init__()
+            self.retained: Dict[str, List[int]] = defaultdict(list)
+            self.peaks: Dict[str, List[int]] = defaultdict(list)
+
+        async def request(self, client, endpoint, method, url, **kwargs):
+            tracemalloc.reset_peak()
+            before= tracemalloc.get_traced_memory()[0]
+            response= await super().request(client, endpoint, method, url, **kwargs)
+            current, peak= tracemalloc.get_traced_memory()
+            self.retained[endpoint].append(current - before)
+            self.peaks[endpoint].append(peak - before)
+            return response
+
+    recorder= TracingRecorder()
+    tracemalloc.start()
+    try:
+        for flow in flows:
+            await run_flow(client, recorder, flow["text"], flow["rating"])
+    finally:
+        tracemalloc.stop()
+    return {
+        endpoint: {
+            "requests": len(recorder.peaks[endpoint]),
+            "mean_peak_kb": round(sum(recorder.peaks[endpoint]) / len(recorder.peaks[endpoint]) / 1024, 1),
+            "mean_retained_kb": round(sum(recorder.retained[endpoint]) / len(recorder.retained[endpoint]) / 1024, 1)
+        } for endpoint in sorted(recorder.peaks)
+    }
+
+
+async def run(args) -> Dict[str, Any]:
+    import httpx
+    from benchmarks.fakes import FakeAIService, HashEmbeddingBackend
+    import repository.pinecone_repository as pinecone_repository
+    from services.ai_service import ai_service
+    from services.session_writer import session_writer
+    import main
+
+    fake_ai= FakeAIService(
+        analysis_ms= args.analysis_ms,
+        generation_ms= args.generation_ms,
+        sigma= args.latency_sigma,
+        error_rate= args.error_rate,
+        seed= args.seed
+    )
+    ai_service.override(fake_ai)
+    # The repository builds its embedding backend on first use; hand it the hashing backend instead
+    pinecone_repository.create_embedding_backend= lambda *_, **__: HashEmbeddingBackend()
+
+    flows= flow_inputs(args.flows, args.unique_inputs, args.seed)
+    recorder= Recorder()
+    memory_before= memory_mb()
+
+    transport= httpx.ASGITransport(app=main.app)
+    async with main.lifespan(main.app):
+        while not main.readiness["ready"]:
+            if main.readiness["error"]:
+                raise RuntimeError(f"Warmup failed: {main.readiness['error']}")
+            await asyncio.sleep(0.05)
+
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=args.timeout) as client:
+            queue: asyncio.Queue = asyncio.Queue()
+            for flow in flows:
+                queue.put_nowait(flow)
+            outcomes= {"completed": 0, "failed": 0}
+
+            async def user():
+                while not queue.empty():
+                    flow= queue.get_nowait()
+                    ok= await run_flow(client, recorder, flow["text"], flow["rating"])
+                    outcomes["completed" if ok else "failed"] += 1
+
+            start= time.perf_counter()
+            await asyncio.gather(*[user() for _ in range(args.concurrency)])
+            duration= time.perf_counter() - start
+            memory_after= memory_mb()
+
+            flush_start= time.perf_counter()
+            await session_writer.flush()
+            flush_s= time.perf_counter() - flush_start
+
+            per_request_memory= {}
+            if args.memory_flows:
+                per_request_memory= await measure_memory(client, flow_inputs(args.memory_flows, True, args.seed + 1))
+
+            stats= (await client.get("/api/v1/stats")).json()
+
+    return {
+        "meta": {
+            **git_revision(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "args": vars(args)
+        },
+        "flows": {
+            **outcomes,
+            "duration_s": round(duration, 3),
+            "flows_per_s": round(args.flows / duration, 2),
+            "write_behind_flush_s": round(flush_s, 3)
+        },
+        "endpoints": recorder.summary(duration),
+        "memory": {"before": memory_before, "after": memory_after, "per_request": per_request_memory},
+        "fake_ai": fake_ai.get_stats(),
+        "app_stats": stats
+    }
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> str:
+    # Side-by-side p95 and throughput per endpoint against an earlier result file
+    lines= [f"baseline {str(baseline['meta'].get('commit'))[:10]} -> current {str(current['meta'].get('commit'))[:10]}",
+            f"{'endpoint':<10} {'p95 ms':>18} {'rps':>18}"]
+    for endpoint, result in current["endpoints"].items():
+        before= baseline["endpoints"].get(endpoint)
+        if not before:
+            continue
+        lines.append(f"{endpoint:<10} {before['p95_ms']:>8} -> {result['p95_ms']:<8} {before['throughput_rps']:>8} -> {result['throughput_rps']:<8}")
+    return "\n".join(lines)
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Offline load test with fake LLM and vector store")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--flows", type=int, default=200, help="Number of create -> step -> next -> feedback flows")
+    parser.add_argument("--analysis-ms", type=float, default=400.0, help="Median fake state-analysis latency")
+    parser.add_argument("--generation-ms", type=float, default=1500.0, help="Median fake ritual-generation latency")
+    parser.add_argument("--latency-sigma", type=float, default=0.3, help="Log-normal sigma of fake LLM latency")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of fake LLM calls that fail")
+    parser.add_argument("--unique-inputs", action="store_true", help="Make every flow's input text distinct")
+    parser.add_argument("--memory-flows", type=int, default=20, help="Sequential flows traced for per-request memory (0 to skip)")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON result to this path")
+    parser.add_argument("--baseline", help="Earlier result file to compare against")
+    args= parser.parse_args()
+
+    for key, value in BENCH_ENV.items():
+        os.environ.setdefault(key, value)
+    report= asyncio.run(run(args))
+
+    output= json.dumps(report, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w") as f:
+            f.write(output)
+    print(output)
+    if args.baseline:
+        with open(args.baseline) as f:
+            print(compare(report, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,18 +1,123 @@
+import atexit
+import json
 import logging
+import os
+import queue
+import random
+import threading
+from contextvars import ContextVar
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Callable, Dict, Optional
+
+from config.setting import Config
+
+# Session id attached to every record logged while handling that session
+session_id_var: ContextVar[Optional[str]] = ContextVar("session_id", default=None)
+
+# Pass as extra= on hot-path log calls so they are subject to per-level sampling
+HOT= {"hot": True}
+
+
+class JSONFormatter(logging.Formatter):
+    # One JSON object per line, formatted on the listener thread from the message resolved at log time
+    def format(self, record: logging.LogRecord) -> str:
+        entry= {
+            "ts": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "session_id": getattr(record, "session_id", None)
+        }
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class ContextFilter(logging.Filter):
+    # Capture the session id from the caller's context before the record changes threads
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "session_id", None) is None:
+            record.session_id= session_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    # Keep a fraction of hot-path records per level; warnings and errors are never sampled
+    def __init__(self, rates: Dict[int, float]):
+        super().__init__()
+        self.rates= rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not getattr(record, "hot", False):
+            return True
+        rate= self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class DeferredQueueHandler(QueueHandler):
+    # Enqueue the record with its message resolved but unformatted: the args are rendered on the
+    # calling thread, before the caller can mutate them, and the JSON formatting is left to the
+    # listener thread. An optional start callback runs before the first record is queued.
+    def __init__(self, queue, start: Optional[Callable[[], None]] = None):
+        super().__init__(queue)
+        self.start= start
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.msg= record.getMessage()
+        record.args= None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.start is not None:
+            self.start()
+        super().enqueue(record)
+
+
+log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+listener: Optional[QueueListener] = None
+listener_lock= threading.Lock()
+
+
+def start_logging():
+    # Create the log file and start the listener thread, once. Called from the app's lifespan, and
+    # by the handler on the first record for scripts that log without one
+    global listener
+    if listener is not None:
+        return
+    with listener_lock:
+        if listener is not None:
+            return
+        log_dir = os.path.dirname(Config.log_file)
+        if log_dir:
+            os.makedirs(log_dir, exist_ok=True)
+        file_handler = RotatingFileHandler(
+            Config.log_file,
+            maxBytes=Config.log_max_bytes,
+            backupCount=Config.log_backup_count,
+            encoding="utf-8"
+        )
+        file_handler.setFormatter(JSONFormatter())
+        listener = QueueListener(log_queue, file_handler, respect_handler_level=True)
+        listener.start()
+        atexit.register(listener.stop)
+
 
 def setup_logger():
+    # Only wires the handler; the file and the listener thread are created by start_logging
     logger = logging.getLogger(__name__)
-    logger.setLevel(logging.DEBUG) 
-    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-
-    file_handler = logging.FileHandler('logs/app.log') 
-    file_handler.setLevel(logging.DEBUG)
-    file_handler.setFormatter(formatter)
+    logger.setLevel(Config.log_level.upper())
+    logger.propagate = False
 
     if not logger.hasHandlers():
-        logger.addHandler(file_handler)
-    
+        queue_handler = DeferredQueueHandler(log_queue, start=start_logging)
+        queue_handler.addFilter(SamplingFilter({
+            logging.DEBUG: Config.log_sample_debug,
+            logging.INFO: Config.log_sample_info
+        }))
+        queue_handler.addFilter(ContextFilter())
+        logger.addHandler(queue_handler)
+
     return logger
 
 # Initiate the logger instance
-logger = setup_logger()
\ No newline at end of file
+logger = setup_logger()
@@ -1,11 +1,138 @@
+from typing import Optional
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 class Settings(BaseSettings):
     
-    groq_api_key: str
-    gemini_api_key: str
-    pinecone_api_key: str
-    pinecone_index: str 
+    groq_api_key: str = ""
+    gemini_api_key: str = ""
+    pinecone_api_key: str = ""
+    pinecone_index: str = ""
+    
+    # LLM providers in preference order ("gemini", "groq"); the router re-ranks them by latency and errors
+    llm_providers: str = "gemini"
+    gemini_model: str = "gemini-1.5-flash"
+    groq_model: str = "llama-3.1-8b-instant"
+    # Hedging fires the next provider when the first has not answered within its p90 latency
+    llm_hedging: bool = False
+    llm_hedge_delay_ms: float = 1500.0
+    
+    # Per-provider call layer: AIMD concurrency limit, token-bucket rate limit (0 disables), deadlines and retries
+    llm_initial_concurrency: int = 4
+    llm_min_concurrency: int = 1
+    llm_max_concurrency: int = 32
+    llm_rate_per_s: float = 0.0
+    llm_burst: int = 10
+    llm_timeout_s: float = 30.0
+    llm_deadline_s: float = 60.0
+    llm_max_retries: int = 3
+    llm_backoff_s: float = 0.5
+    llm_max_backoff_s: float = 8.0
+    
+    # Ritual output-token budget: sized from observed step lengths when adaptive, else fixed at llm_output_tokens
+    llm_adaptive_output_tokens: bool = True
+    llm_output_tokens: int = 1024
+    llm_max_output_tokens: int = 2048
+    
+    # Vector store backend: "pinecone", "local" (self-hosted files) or "memory" (in-process stand-in)
+    vector_backend: str = "pinecone"
+    vector_pool_size: int = 8
+    vector_timeout_s: float = 10.0
+    
+    # Local vector store: memory-mapped vectors and SQLite metadata under this directory, optional int8
+    # search copy, and compaction once this fraction of rows is dead
+    local_vector_path: str = "vector_store"
+    local_vector_quantize: bool = False
+    local_vector_compact_ratio: float = 0.3
+    
+    # Workflow executor: "langgraph" (StateGraph) or "direct" (same nodes in plain asyncio)
+    workflow_executor: str = "langgraph"
+    
+    # Write-behind session persistence
+    session_write_behind: bool = True
+    session_write_batch_size: int = 32
+    session_write_flush_interval_ms: float = 50.0
+    session_write_max_retries: int = 5
+    session_write_backoff_s: float = 0.5
+    
+    # Bulk feedback: most ratings accepted per request, and metadata updates sent per batch
+    feedback_bulk_max_items: int = 500
+    feedback_batch_size: int = 50
+    
+    # Ritual pool mode: "generate", "pool_first" or "pool_only"
+    ritual_pool_mode: str = "generate"
+    ritual_pool_size: int = 5
+    ritual_pool_max_age_s: float = 86400.0
+    ritual_pool_min_rating: float = 3.0
+    ritual_pool_min_ratings: int = 3
+    
+    # Local embedding-based state classifier (falls back to the LLM below threshold)
+    state_classifier_enabled: bool = False
+    state_classifier_threshold: float = 0.6
+    state_classifier_temperature: float = 0.05
+    state_classifier_examples_path: Optional[str] = None
+    
+    # Reuse rituals from highly rated similar sessions; similar-session retrieval (remote or mirror)
+    # only considers sessions rated similar_session_min_rating or higher
+    ritual_reuse_enabled: bool = False
+    similar_session_min_rating: int = 3
+    ritual_reuse_score_threshold: float = 0.8
+    ritual_reuse_top_k: int = 3
+    
+    # Single LLM call for state analysis + ritual generation (only used with ritual_pool_mode="generate" and reuse off)
+    ritual_fused_mode: bool = False
+    
+    # Cache of LLM analysis and generation results keyed by normalized input, with single-flight deduplication;
+    # pooled and reused rituals are never cached
+    ritual_cache_enabled: bool = False
+    ritual_cache_ttl_s: float = 600.0
+    ritual_cache_max_size: int = 1024
+    
+    # Bulk ritual creation: parallel analysis + generation calls, batched session writes and the per-request input cap
+    bulk_ritual_concurrency: int = 8
+    bulk_ritual_write_batch_size: int = 32
+    bulk_ritual_flush_interval_ms: float = 200.0
+    bulk_ritual_max_items: int = 1000
+    
+    # In-process mirror of rated session vectors (sharded by user_state) for similarity retrieval,
+    # loaded from a paged scan of the index at startup, then refreshed every refresh interval with the
+    # sessions updated since (0 disables refreshes). A refresh that finds max_changes or more reloads in full
+    session_mirror_enabled: bool = False
+    session_mirror_refresh_s: float = 300.0
+    session_mirror_refresh_overlap_s: float = 60.0
+    session_mirror_refresh_max_changes: int = 1000
+    session_mirror_page_size: int = 100
+    
+    # Active session store: "memory", "sqlite" or "redis"
+    session_store_backend: str = "memory"
+    session_store_ttl_s: float = 3600.0
+    session_store_max_size: int = 10000
+    session_store_path: str = "sessions.db"
+    session_store_url: str = "redis://localhost:6379/0"
+    
+    # Embedding backend: "torch" (SentenceTransformer) or "onnx" (int8-quantized export)
+    embedding_backend: str = "torch"
+    embedding_onnx_path: str = "models/all-MiniLM-L6-v2-int8"
+    embedding_threads: int = 0
+    
+    # Embedding micro-batching
+    embedding_max_batch_size: int = 32
+    embedding_max_wait_ms: float = 5.0
+    
+    # Embedding cache (disk tier disabled when path is unset)
+    embedding_cache_size: int = 4096
+    embedding_cache_path: Optional[str] = None
+    
+    # Logging: JSON lines written by a background listener with size-based rotation
+    log_level: str = "INFO"
+    log_file: str = "logs/app.log"
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    # Fraction of hot-path records kept per level (1.0 keeps all)
+    log_sample_debug: float = 1.0
+    log_sample_info: float = 1.0
+    
+    # Prometheus-style metrics at /metrics (timers and counters are no-ops when disabled)
+    metrics_enabled: bool = True
     
     model_config= SettingsConfigDict(
         env_file=".env",
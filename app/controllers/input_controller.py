@@ -1,20 +1,32 @@
-from typing import Dict, Any
+import asyncio
+import json
+from datetime import datetime
+from typing import Dict, Any, AsyncIterator, List
 from fastapi import HTTPException
-from models.schemas import UserInput, RitualResponse, FeedbackResponse
+from models.schemas import UserInput, RitualResponse, FeedbackResponse, BulkFeedbackResponse, FeedbackResult, Ritual, SessionMemory
 from services.workflow import WorkflowService
+from services.session_writer import session_writer
+from repository.pinecone_repository import pinecone_service
 from usecases.ritual_guide import ritual_guide
-from config.logging import logger
+from usecases.bulk_ritual_builder import BulkRitualBuilder, BulkInput, create_bulk_ritual_builder, iter_items, summarize
+from config.setting import Config
+from config.logging import logger, HOT, session_id_var
+
+def sse_event(event: str, data: Dict[str, Any]) -> str:
+    # Format one server-sent event
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
 
 class InputController:
     # Initialize controller with WorkflowService and ritual_guide
     def __init__(self):
         self.workflow= WorkflowService()
         self.guide= ritual_guide
+        self.bulk_builder: BulkRitualBuilder= create_bulk_ritual_builder()
         logger.info("Input Controller initialized")
         
     async def process_user_input(self, user_input: UserInput) -> RitualResponse:
         # Log and process incoming user input to generate a ritual
-        logger.info(f"Processing user input: {user_input.text}")
+        logger.info("Processing user input: %s", user_input.text)
         try:
             workflow_state= await self.workflow.run_workflow(user_input.text)
             ritual= workflow_state['ritual']
@@ -26,36 +38,107 @@ class InputController:
                 message="Ritual created successfully"
             )
         except Exception as e:
-            logger.error(f"Error processing user input: {str(e)}")
+            logger.error("Error processing user input: %s", e)
             raise HTTPException(status_code=500, detail=f"Failed to process input: {str(e)}")
         
-    async def get_current_step(self, session_id: str) -> Dict[str, Any]:
-        # Retrieve the current step for the given session
-        logger.info(f"Retrieving current step for session {session_id}")
+    async def stream_user_input(self, text: str) -> AsyncIterator[str]:
+        # Stream ritual steps as server-sent events, starting the session at the first step
+        session_id = pinecone_service.generate_session_id()
+        session_id_var.set(session_id)
+        logger.info("Streaming ritual for session %s", session_id)
+        architect = self.workflow.architect
+        ritual = None
+        complete = False
+        try:
+            user_state = await architect.analyze_state(text)
+            yield sse_event("session", {"session_id": session_id, "user_state": user_state['state']})
+            
+            async for step in architect.stream_steps(user_state['state']):
+                if ritual is None:
+                    ritual = Ritual(session_id=session_id, user_state=user_state['state'], steps=[step], created_at=datetime.now())
+                    await self.guide.start_session(ritual, streaming=True)
+                else:
+                    await self.guide.add_step(session_id, step)
+                yield sse_event("step", step.model_dump())
+            complete = True
+        except Exception as e:
+            logger.error("Error streaming ritual for session %s: %s", session_id, e)
+            yield sse_event("error", {"session_id": session_id, "detail": f"Failed to stream ritual: {str(e)}"})
+        finally:
+            # Also runs when the client disconnects mid-stream (GeneratorExit or cancellation); the
+            # shielded task settles the session even if this request is being cancelled
+            if ritual is not None:
+                await asyncio.shield(asyncio.ensure_future(self._settle_stream(text, ritual, complete)))
+        if complete:
+            yield sse_event("done", {"session_id": session_id, "total_steps": len(ritual.steps)})
+    
+    async def _settle_stream(self, text: str, ritual: Ritual, complete: bool):
+        # A fully streamed ritual is finished and persisted; an interrupted one is dropped, since a
+        # partial ritual should neither stay navigable nor be stored for reuse
+        try:
+            if not complete:
+                logger.warning("Ritual stream for session %s ended early; dropping the session", ritual.session_id)
+                await self.guide.discard_session(ritual.session_id)
+                return
+            await self.guide.finish_streaming(ritual.session_id)
+            session_memory = SessionMemory(
+                session_id=ritual.session_id,
+                user_input=text,
+                user_state=ritual.user_state,
+                ritual_steps=[step.step_type for step in ritual.steps],
+                steps=ritual.steps,
+                rating=0,
+                timestamp=datetime.now()
+            )
+            if Config.session_write_behind:
+                await session_writer.enqueue(session_memory)
+            else:
+                await pinecone_service.store_session(session_memory)
+        except Exception as e:
+            logger.error("Error settling streamed session %s: %s", ritual.session_id, e)
+        
+    async def build_rituals_bulk(self, inputs: List[BulkInput]) -> AsyncIterator[str]:
+        # Stream one JSON line per input as its ritual is generated and stored, then a summary line
+        logger.info("Building %s rituals in bulk", len(inputs))
+        counts = {"total": 0, "succeeded": 0, "stored": 0}
+        try:
+            async for result in summarize(self.bulk_builder.build(iter_items(inputs)), counts):
+                yield json.dumps(result) + "\n"
+            yield json.dumps({"done": True, **counts}) + "\n"
+        except Exception as e:
+            logger.error("Error building rituals in bulk: %s", e)
+            yield json.dumps({"done": False, **counts, "error": f"Bulk ritual creation failed: {str(e)}"}) + "\n"
+        
+    async def get_current_step(self, session_id: str) -> bytes:
+        # Retrieve the pre-serialized current step for the given session
+        session_id_var.set(session_id)
+        logger.info("Retrieving current step for session %s", session_id, extra=HOT)
         try:
-            step_response = await self.guide.get_current_step(session_id)
-            if not step_response['success']:
-                raise ValueError(step_response['error'])
+            step_response = await self.guide.get_current_step_payload(session_id)
+            if step_response is None:
+                raise ValueError("Session not found")
             return step_response
         except Exception as e:
-            logger.error(f"Error retrieving step for session {session_id}: {str(e)}")
+            logger.error("Error retrieving step for session %s: %s", session_id, e)
             raise HTTPException(status_code=404, detail=f"Failed to retrieve step: {str(e)}")
 
-    async def next_step(self, session_id: str) -> Dict[str, Any]:
-        # Advance to the next step in the session
-        logger.info(f"Advancing to next step for session {session_id}")
+    async def next_step(self, session_id: str) -> bytes:
+        # Advance to the next step and return its pre-serialized response
+        session_id_var.set(session_id)
+        logger.info("Advancing to next step for session %s", session_id, extra=HOT)
         try:
-            step_response = await self.guide.next_step(session_id)
-            if not step_response['success']:
-                raise ValueError(step_response['error'])
+            step_response = await self.guide.next_step_payload(session_id)
+            if step_response is None:
+                raise ValueError("Session not found")
             return step_response
         except Exception as e:
-            logger.error(f"Error advancing step for session {session_id}: {str(e)}")
+            logger.error("Error advancing step for session %s: %s", session_id, e)
             raise HTTPException(status_code=404, detail=f"Failed to advance step: {str(e)}")
         
     async def submit_feedback(self, session_id: str, rating: int) -> FeedbackResponse:
         # Handle feedback submission for a session
-        logger.info(f"Submitting feedback for session {session_id}")
+        session_id_var.set(session_id)
+        logger.info("Submitting feedback for session %s", session_id)
         try:
             feedback = FeedbackResponse(success=True, session_id=session_id, rating=rating)
             feedback_response = await self.guide.collect_feedback(session_id, feedback)
@@ -68,5 +151,21 @@ class InputController:
                 message="Feedback saved"
             )
         except Exception as e:
-            logger.error(f"Error submitting feedback for session {session_id}: {str(e)}")
-            raise HTTPException(status_code=500, detail=f"Failed to save feedback: {str(e)}")
\ No newline at end of file
+            logger.error("Error submitting feedback for session %s: %s", session_id, e)
+            raise HTTPException(status_code=500, detail=f"Failed to save feedback: {str(e)}")
+
+    async def submit_feedback_bulk(self, ratings: Dict[str, int]) -> BulkFeedbackResponse:
+        # Handle many feedback submissions with batched storage writes
+        logger.info("Submitting bulk feedback for %s sessions", len(ratings))
+        try:
+            results = [FeedbackResult(**result) for result in await self.guide.collect_feedback_bulk(ratings)]
+            saved = sum(result.success for result in results)
+            return BulkFeedbackResponse(
+                success=saved == len(results),
+                saved=saved,
+                failed=len(results) - saved,
+                results=results
+            )
+        except Exception as e:
+            logger.error("Error submitting bulk feedback: %s", e)
+            raise HTTPException(status_code=500, detail=f"Failed to save feedback: {str(e)}")
@@ -1,14 +1,93 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import JSONResponse, Response
 import uvicorn
 from typing import Dict, Any
-from routes.api_endpoints import router
-from config.logging import logger
+from routes.api_endpoints import router, controller
+from services.ai_service import ai_service
+from services.session_writer import session_writer
+from services.ritual_pool import ritual_pool
+from services.metrics import registry, active_sessions
+from repository.pinecone_repository import pinecone_service
+from usecases.ritual_guide import ritual_guide
+from config.setting import Config
+from config.logging import logger, start_logging
+
+readiness: Dict[str, Any] = {"ready": False, "error": None, "timings_ms": {}}
+
+async def warmup():
+    # Build services off the event loop, then run one encode and pre-open the index connection
+    async def encode_once():
+        if not await pinecone_service.generate_embeddings("warmup"):
+            raise ValueError("Warmup embedding failed")
+
+    stages = [
+        ("ai_service", lambda: asyncio.to_thread(ai_service.get)),
+        ("pinecone_service", lambda: asyncio.to_thread(pinecone_service.get)),
+        ("embedding", encode_once),
+        ("vector_index", lambda: pinecone_service.index.describe_index_stats()),
+        ("ritual_guide", lambda: asyncio.to_thread(ritual_guide.get)),
+        ("controller", lambda: asyncio.to_thread(controller.get)),
+    ]
+    if Config.session_mirror_enabled:
+        stages.append(("session_mirror", lambda: pinecone_service.load_mirror()))
+    try:
+        for name, stage in stages:
+            start = time.perf_counter()
+            await stage()
+            readiness["timings_ms"][name] = round((time.perf_counter() - start) * 1000, 1)
+        if Config.ritual_pool_mode != "generate":
+            ritual_pool.prefill()
+        readiness["ready"] = True
+        logger.info("Warmup complete: %s", readiness['timings_ms'])
+    except Exception as e:
+        readiness["error"] = str(e)
+        logger.error("Warmup failed: %s", e)
+
+async def refresh_mirror():
+    # Refresh the session mirror periodically once warmup has loaded it
+    while True:
+        await asyncio.sleep(Config.session_mirror_refresh_s)
+        if readiness["ready"]:
+            await pinecone_service.refresh_mirror()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Logging starts with the app rather than at import; warm up in the background so the
+    # process starts serving liveness checks immediately
+    start_logging()
+    warmup_task = asyncio.create_task(warmup())
+    refresh_task = None
+    if Config.session_mirror_enabled and Config.session_mirror_refresh_s > 0:
+        refresh_task = asyncio.create_task(refresh_mirror())
+    yield
+    warmup_task.cancel()
+    if refresh_task:
+        refresh_task.cancel()
+    # Persist sessions still waiting in the write-behind queue
+    await session_writer.stop()
 
 # Initialize FastAPI application
-app= FastAPI(title="FocusForge: Ritual Builder", version='1.0.0')
+app= FastAPI(title="FocusForge: Ritual Builder", version='1.0.0', lifespan=lifespan)
 
 app.include_router(router)
 
+@app.get("/ready")
+async def ready() -> JSONResponse:
+    # Readiness probe: 503 until warmup has finished
+    return JSONResponse(status_code=200 if readiness["ready"] else 503, content=readiness)
+
+@app.get("/metrics")
+async def metrics() -> Response:
+    # Prometheus text exposition of stage latencies, LLM counters and session gauges
+    if not registry.enabled:
+        return Response(status_code=404, content="Metrics are disabled")
+    if ritual_guide.is_initialized:
+        active_sessions.set(await ritual_guide.active_sessions.count())
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get("/", response_model=Dict[str, str])
 async def root() -> Dict[str, Any]:
     # Root endpoint for server status
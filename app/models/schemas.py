@@ -27,8 +27,10 @@ class SessionMemory(BaseModel):
     user_input: str
     user_state: str
     ritual_steps: List[str]
+    steps: List[RitualStep] = []
     rating: Optional[int] = None
     timestamp: datetime = datetime.now()
+    bulk: bool = False  # Created by bulk onboarding and not started until first used
     
 # Schema for ritual creation response
 class RitualResponse(BaseModel):
@@ -43,4 +45,18 @@ class FeedbackResponse(BaseModel):
     session_id: str
     rating: int
     message: str = "Feedback saved"
+    
+# Schema for one entry of a bulk feedback response
+class FeedbackResult(BaseModel):
+    session_id: str
+    success: bool
+    rating: Optional[int] = None
+    error: Optional[str] = None
+    
+# Schema for bulk feedback submission response
+class BulkFeedbackResponse(BaseModel):
+    success: bool
+    saved: int
+    failed: int
+    results: List[FeedbackResult]
     
\ No newline at end of file
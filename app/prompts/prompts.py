@@ -1,3 +1,83 @@
+# Mental states the analysis prompt can return
+USER_STATES= [
+    "Anxiety and Overwhelm",
+    "Low Motivation / Apathy",
+    "Burnout",
+    "Sadness",
+    "Self-Doubt or Insecurity",
+    "Social Withdrawal",
+    "Procrastination Loop",
+    "Inner Critic or Shame",
+    "Fear of Failure",
+    "Decision Fatigue",
+    "unknown"
+]
+
+
+# Seed phrases used to build per-state centroids for the local state classifier
+STATE_EXAMPLES= {
+    "Anxiety and Overwhelm": [
+        "I feel anxious and overwhelmed by everything I have to do",
+        "My mind is racing and I can't calm down",
+        "There is too much on my plate and I'm panicking",
+        "I'm stressed and can't focus, everything feels like too much"
+    ],
+    "Low Motivation / Apathy": [
+        "I don't feel like doing anything today",
+        "Nothing seems worth the effort anymore",
+        "I have no energy or drive to start my work",
+        "I just don't care about my goals right now"
+    ],
+    "Burnout": [
+        "I'm completely exhausted from work and running on empty",
+        "I've been working nonstop and I feel drained and numb",
+        "Even small tasks feel exhausting after months of pushing hard",
+        "I'm worn out and can't keep up this pace"
+    ],
+    "Sadness": [
+        "I feel sad and heavy today",
+        "I've been crying and feeling down",
+        "Everything feels gloomy and I miss how things used to be",
+        "I feel low and lonely"
+    ],
+    "Self-Doubt or Insecurity": [
+        "I don't think I'm good enough for this",
+        "Everyone else seems more capable than me",
+        "I keep second-guessing my abilities",
+        "I feel like an impostor at work"
+    ],
+    "Social Withdrawal": [
+        "I don't want to see or talk to anyone",
+        "I've been avoiding my friends and staying alone",
+        "Socializing feels draining so I keep cancelling plans",
+        "I feel disconnected from people around me"
+    ],
+    "Procrastination Loop": [
+        "I keep putting off my tasks and scrolling instead",
+        "I know what I need to do but I keep delaying it",
+        "My deadline is close and I still haven't started",
+        "I waste hours avoiding the work I should be doing"
+    ],
+    "Inner Critic or Shame": [
+        "I keep beating myself up over my mistakes",
+        "I feel ashamed of who I am",
+        "A voice in my head tells me I always mess up",
+        "I'm so hard on myself for everything I do wrong"
+    ],
+    "Fear of Failure": [
+        "I'm scared that I will fail this exam",
+        "I'm afraid to try because I might not succeed",
+        "What if everything goes wrong and I disappoint everyone",
+        "The fear of failing stops me from starting"
+    ],
+    "Decision Fatigue": [
+        "I can't make any more decisions today",
+        "I'm stuck choosing between options and feel paralyzed",
+        "Every little choice feels exhausting",
+        "I've been deciding things all day and my brain is fried"
+    ]
+}
+
 ANALYSIS_PROMPT="""
 You are an AI analyzing user input to determine their mental state from the following predefined states: Anxiety and Overwhelm, Low Motivation / Apathy, Burnout, Sadness, Self-Doubt or Insecurity, Social Withdrawal, Procrastination Loop, Inner Critic or Shame, Fear of Failure, Decision Fatigue.
 
@@ -59,4 +139,81 @@ Output Example:
   }}
 ]
 
-JSON Response: """
\ No newline at end of file
+JSON Response: """
+FUSED_PROMPT="""
+You are an AI that first identifies a user's mental state and then generates a personalized ritual for it to promote emotional well-being.
+The possible mental states: Anxiety and Overwhelm, Low Motivation / Apathy, Burnout, Sadness, Self-Doubt or Insecurity, Social Withdrawal, Procrastination Loop, Inner Critic or Shame, Fear of Failure, Decision Fatigue.
+The possible ritual steps are: Breathing, Affirmation, Journaling, Movement, Visualization, Music, Micro-Action, Mindfulness, Gratitude, Reflection, Intention Setting, Mantra Chanting, Creative Expression.
+
+Task: Analyze the user's input text to identify the most relevant mental state with a confidence score (0.0 to 1.0), then generate a sequence of 4 to 7 ritual steps tailored to that state. Return a single JSON object.
+
+Instructions:
+- Interpret the user's input for emotional cues, tone, and context, and match it to one of the predefined states.
+- Assign a confidence score (e.g., 0.9 for strong match, 0.5 for unclear). If unclear, use "unknown" with confidence 0.5 and generate a general calming ritual.
+- Ensure each step_type is unique within the sequence.
+- For each step:
+  - Create a title (max 5 words).
+  - Provide detailed content (2-4 sentences) specific to the user's mental state.
+  - Ensure content is empathetic and actionable.
+- Prioritize a cohesive flow (calming to empowering).
+- Return only valid JSON with keys "state", "confidence" and "steps", where "steps" is an array of objects with keys "title", "content", "step_type".
+
+Input: {user_input}
+
+Output Example:
+{{
+  "state": "Anxiety and Overwhelm",
+  "confidence": 0.9,
+  "steps": [
+    {{
+      "title": "Deep Calm Breathing",
+      "content": "Sit comfortably and inhale deeply through your nose for 5 seconds, feeling your chest expand. Hold for 3 seconds, then exhale slowly for 7 seconds, releasing tension. Repeat 6 times, focusing on the rhythm to quiet your anxious mind.",
+      "step_type": "Breathing"
+    }},
+    {{
+      "title": "Positive Self Affirmation",
+      "content": "Repeat softly to yourself: 'I am capable and calm.' Say it 5 times, letting each word sink in to counter overwhelm. Picture yourself handling challenges with ease.",
+      "step_type": "Affirmation"
+    }}
+  ]
+}}
+
+JSON Response: """
+
+
+# Gemini response schemas (OpenAPI subset) for each LLM call, so the model emits the expected JSON shape
+STEP_SCHEMA= {
+    "type": "OBJECT",
+    "properties": {
+        "title": {"type": "STRING"},
+        "content": {"type": "STRING"},
+        "step_type": {"type": "STRING"}
+    },
+    "required": ["title", "content", "step_type"]
+}
+
+STATE_SCHEMA= {
+    "type": "OBJECT",
+    "properties": {
+        "state": {"type": "STRING", "format": "enum", "enum": USER_STATES},
+        "confidence": {"type": "NUMBER"}
+    },
+    "required": ["state", "confidence"]
+}
+
+RITUAL_SCHEMA= {
+    "type": "ARRAY",
+    "items": STEP_SCHEMA,
+    "min_items": 4,
+    "max_items": 7
+}
+
+FUSED_SCHEMA= {
+    "type": "OBJECT",
+    "properties": {
+        "state": STATE_SCHEMA["properties"]["state"],
+        "confidence": {"type": "NUMBER"},
+        "steps": RITUAL_SCHEMA
+    },
+    "required": ["state", "confidence", "steps"]
+}
@@ -0,0 +1,433 @@
+import glob
+import json
+import os
+import sqlite3
+import threading
+from functools import reduce
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+from config.logging import logger
+
+# Rows scored per block, so a filtered gather never materializes the whole matrix
+CHUNK_ROWS= 65536
+
+
+class LocalVectorStore:
+    # Self-hosted stand-in for a Pinecone index with the same call shapes. Vectors are appended to a
+    # memory-mapped float32 file; id -> row, norms and metadata live in SQLite. Overwrites and deletes
+    # leave dead rows that compaction rewrites away. Queries are brute force over the live rows, or with
+    # quantize=True over an int8 copy whose top candidates are rescored exactly from the float32 file.
+    def __init__(self, path: str, dim: int, quantize: bool = False, compact_ratio: float = 0.3,
+                 compact_min_rows: int = 10000, rescore_factor: int = 10):
+        os.makedirs(path, exist_ok=True)
+        self.path= path
+        self.dim= dim
+        self.quantize= quantize
+        self.compact_ratio= compact_ratio
+        self.compact_min_rows= compact_min_rows
+        self.rescore_factor= rescore_factor
+        self.lock= threading.RLock()
+        self.columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self.compactions= 0
+
+        self.conn= sqlite3.connect(os.path.join(path, "metadata.db"), isolation_level=None, check_same_thread=False, timeout=5.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS records (id TEXT PRIMARY KEY, row INTEGER NOT NULL, norm REAL NOT NULL, scale REAL NOT NULL DEFAULT 0, metadata TEXT NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS records_row ON records (row)")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+        stored_dim= self._meta("dim")
+        if stored_dim is not None and int(stored_dim) != dim:
+            raise ValueError(f"Local vector store at {path} holds {stored_dim}-dimensional vectors, not {dim}")
+        self._set_meta("dim", dim)
+        self.generation= int(self._meta("generation") or 0)
+        self._remove_stale_files()
+        self._load()
+        logger.info("Local vector store opened at %s with %s vectors", path, self.live_count)
+
+    def _meta(self, key: str) -> Optional[str]:
+        row= self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def _set_meta(self, key: str, value: Any):
+        self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+    def _file(self, kind: str, generation: Optional[int] = None) -> str:
+        return os.path.join(self.path, f"vectors.{self.generation if generation is None else generation}.{kind}")
+
+    def _remove_stale_files(self):
+        # Files of other generations are left over from a compaction that did not commit, or its cleanup
+        for kind in ("f32", "i8"):
+            for file in glob.glob(os.path.join(self.path, f"vectors.*.{kind}")):
+                if file != self._file(kind):
+                    os.remove(file)
+
+    def _open(self, kind: str, rows: int, generation: Optional[int] = None) -> np.memmap:
+        # Open the vector file of a generation, growing it to hold at least rows rows
+        file= self._file(kind, generation)
+        dtype= np.float32 if kind == "f32" else np.int8
+        row_bytes= self.dim * np.dtype(dtype).itemsize
+        if not os.path.exists(file) or os.path.getsize(file) < rows * row_bytes:
+            with open(file, "ab") as f:
+                f.truncate(rows * row_bytes)
+        return np.memmap(file, dtype=dtype, mode="r+", shape=(os.path.getsize(file) // row_bytes, self.dim))
+
+    def _load(self):
+        # Rebuild the in-memory row state from SQLite; only rows referenced by a record are live
+        rows, norms, scales= [], [], []
+        for row, norm, scale in self.conn.execute("SELECT row, norm, scale FROM records"):
+            rows.append(row)
+            norms.append(norm)
+            scales.append(scale)
+        rows= np.asarray(rows, dtype=np.int64)
+        # Rows past the last live one are free again
+        self.count= int(rows.max()) + 1 if len(rows) else 0
+        self.vectors= self._open("f32", max(self.count, 1024))
+        capacity= len(self.vectors)
+        self.live= np.zeros(capacity, dtype=bool)
+        self.live[rows] = True
+        self.live_count= len(rows)
+        self.norms= np.zeros(capacity, dtype=np.float32)
+        self.norms[rows] = norms
+        self.scales= np.zeros(capacity, dtype=np.float32)
+        self.scales[rows] = scales
+        self.columns= {}
+
+        self.quantized= None
+        if self.quantize:
+            self.quantized= self._open("i8", capacity)
+            if self._meta("quantized") != "1":
+                self._quantize_all()
+        elif self._meta("quantized") == "1":
+            # Quantization was switched off; the int8 copy would go stale
+            self._set_meta("quantized", 0)
+            if os.path.exists(self._file("i8")):
+                os.remove(self._file("i8"))
+
+    def _quantize_all(self):
+        # Build the int8 copy of a store that was written without one
+        for start in range(0, self.count, CHUNK_ROWS):
+            end= min(start + CHUNK_ROWS, self.count)
+            self.quantized[start:end], self.scales[start:end] = self._quantize_rows(self.vectors[start:end], self.norms[start:end])
+        self.quantized.flush()
+        self.conn.execute("BEGIN")
+        self.conn.executemany("UPDATE records SET scale = ? WHERE row = ?",
+                              ((float(self.scales[row]), int(row)) for row in np.flatnonzero(self.live[:self.count])))
+        self._set_meta("quantized", 1)
+        self.conn.execute("COMMIT")
+        logger.info("Quantized %s vectors to int8", self.live_count)
+
+    def _quantize_rows(self, vectors: np.ndarray, norms: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        # Symmetric per-row int8 quantization of the unit vectors
+        units= vectors / np.where(norms == 0, 1.0, norms)[:, None]
+        peaks= np.abs(units).max(axis=1)
+        scales= np.where(peaks == 0, 1.0, peaks / 127).astype(np.float32)
+        return np.round(units / scales[:, None]).astype(np.int8), scales
+
+    def _grow(self, rows: int):
+        # Double the vector files until rows fit; the in-memory row state grows with them
+        capacity= len(self.vectors)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        self.vectors.flush()
+        self.vectors= self._open("f32", capacity)
+        if self.quantized is not None:
+            self.quantized.flush()
+            self.quantized= self._open("i8", capacity)
+        self.live= np.concatenate([self.live, np.zeros(capacity - len(self.live), dtype=bool)])
+        self.norms= np.concatenate([self.norms, np.zeros(capacity - len(self.norms), dtype=np.float32)])
+        self.scales= np.concatenate([self.scales, np.zeros(capacity - len(self.scales), dtype=np.float32)])
+        self.columns= {field: (np.concatenate([objects, np.full(capacity - len(objects), None, dtype=object)]),
+                               np.concatenate([numbers, np.full(capacity - len(numbers), np.nan)]))
+                       for field, (objects, numbers) in self.columns.items()}
+
+    def _rows_of(self, ids: List[str]) -> Dict[str, Tuple[int, Dict[str, Any]]]:
+        found= {}
+        for start in range(0, len(ids), 500):
+            batch= ids[start:start + 500]
+            query= f"SELECT id, row, metadata FROM records WHERE id IN ({','.join('?' * len(batch))})"
+            for id, row, metadata in self.conn.execute(query, batch):
+                found[id] = (row, json.loads(metadata))
+        return found
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        # Append the vectors as new rows; a record that already existed leaves its old row dead
+        latest= {vector['id']: vector for vector in vectors}
+        records= list(latest.values())
+        if not records:
+            return {'upserted_count': 0}
+        values= np.asarray([record['values'] for record in records], dtype=np.float32)
+        if values.ndim != 2 or values.shape[1] != self.dim:
+            raise ValueError(f"Expected {self.dim}-dimensional vectors")
+        metadata= [dict(record.get('metadata') or {}) for record in records]
+        with self.lock:
+            self._append([record['id'] for record in records], values, metadata)
+            self._maybe_compact()
+        return {'upserted_count': len(vectors)}
+
+    def _append(self, ids: List[str], values: np.ndarray, metadata: List[Dict[str, Any]]):
+        existing= self._rows_of(ids)
+        start= self.count
+        rows= np.arange(start, start + len(ids))
+        self._grow(start + len(ids))
+        norms= np.linalg.norm(values, axis=1).astype(np.float32)
+        self.vectors[start:start + len(ids)] = values
+        self.vectors.flush()
+        if self.quantized is not None:
+            self.quantized[start:start + len(ids)], self.scales[rows] = self._quantize_rows(values, norms)
+            self.quantized.flush()
+        # Vectors are on disk before SQLite points at them; the transaction switches every id at once
+        self.conn.execute("BEGIN")
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO records (id, row, norm, scale, metadata) VALUES (?, ?, ?, ?, ?)",
+            [(id, int(row), float(norm), float(self.scales[row]), json.dumps(record))
+             for id, row, norm, record in zip(ids, rows, norms, metadata)]
+        )
+        self.conn.execute("COMMIT")
+
+        self.count= start + len(ids)
+        for old_row, _ in existing.values():
+            self.live[old_row] = False
+        self.live[rows] = True
+        self.live_count += len(ids) - len(existing)
+        self.norms[rows] = norms
+        for row, record in zip(rows, metadata):
+            self._set_columns(row, record)
+
+    def fetch(self, ids: List[str], **kwargs) -> SimpleNamespace:
+        with self.lock:
+            found= self._rows_of(list(ids))
+            return SimpleNamespace(vectors={id: {
+                'id': id,
+                'values': self.vectors[row].tolist(),
+                'metadata': metadata
+            } for id, (row, metadata) in found.items()})
+
+    def update(self, id: str, set_metadata: Optional[Dict[str, Any]] = None, values: Optional[List[float]] = None, **kwargs) -> Dict[str, Any]:
+        # Merge metadata in place; new values are appended as a new row like an upsert
+        with self.lock:
+            found= self._rows_of([id])
+            if id not in found:
+                return {}
+            row, metadata= found[id]
+            metadata.update(set_metadata or {})
+            if values is not None:
+                self._append([id], np.asarray([values], dtype=np.float32), [metadata])
+                self._maybe_compact()
+                return {}
+            self.conn.execute("UPDATE records SET metadata = ? WHERE id = ?", (json.dumps(metadata), id))
+            self._set_columns(row, metadata)
+        return {}
+
+    def delete(self, ids: List[str], **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            found= self._rows_of(list(ids))
+            self.conn.execute("BEGIN")
+            self.conn.executemany("DELETE FROM records WHERE id = ?", [(id,) for id in found])
+            self.conn.execute("COMMIT")
+            for row, _ in found.values():
+                self.live[row] = False
+            self.live_count -= len(found)
+            self._maybe_compact()
+        return {}
+
+    def _column(self, field: str) -> Tuple[np.ndarray, np.ndarray]:
+        # Values of one metadata field by row, loaded on first use by a filter: the objects for
+        # equality and a float copy (NaN when not a number) for range operators
+        if field not in self.columns:
+            objects= np.full(len(self.live), None, dtype=object)
+            numbers= np.full(len(self.live), np.nan)
+            path= '$."' + field.replace('"', '\\"') + '"'
+            for row, value, kind in self.conn.execute("SELECT row, json_extract(metadata, ?), json_type(metadata, ?) FROM records", (path, path)):
+                objects[row] = json.loads(value) if kind in ("array", "object") else (value == 1 if kind in ("true", "false") else value)
+                if kind in ("integer", "real"):
+                    numbers[row] = value
+            self.columns[field] = (objects, numbers)
+        return self.columns[field]
+
+    def _set_columns(self, row: int, metadata: Dict[str, Any]):
+        for field, (objects, numbers) in self.columns.items():
+            value= metadata.get(field)
+            objects[row] = value
+            numbers[row] = value if isinstance(value, (int, float)) and not isinstance(value, bool) else np.nan
+
+    def _filter_mask(self, filter: Optional[Dict[str, Any]]) -> np.ndarray:
+        # Vectorized equivalent of matches_filter over all rows; range operators match numbers only
+        mask= self.live[:self.count].copy()
+        for field, condition in (filter or {}).items():
+            if not isinstance(condition, dict):
+                condition= {"$eq": condition}
+            objects, numbers= (column[:self.count] for column in self._column(field))
+            for op, target in condition.items():
+                if op == "$eq":
+                    mask &= objects == target
+                elif op == "$ne":
+                    mask &= objects != target
+                elif op in ("$in", "$nin"):
+                    found= reduce(np.logical_or, (objects == value for value in target), np.zeros(self.count, dtype=bool))
+                    mask &= found if op == "$in" else ~found
+                elif op in ("$gt", "$gte", "$lt", "$lte"):
+                    with np.errstate(invalid="ignore"):
+                        mask &= {"$gt": numbers > target, "$gte": numbers >= target, "$lt": numbers < target, "$lte": numbers <= target}[op]
+        return mask
+
+    def query(self, vector: List[float], top_k: int = 10, include_metadata: bool = False, filter: Optional[Dict[str, Any]] = None,
+              include_values: bool = False, **kwargs) -> Dict[str, Any]:
+        query= np.asarray(vector, dtype=np.float32)
+        query= query / (np.linalg.norm(query) or 1.0)
+        while True:
+            with self.lock:
+                generation= self.generation
+                rows= np.flatnonzero(self._filter_mask(filter))
+                state= (self.vectors, self.quantized, self.norms, self.scales, self.count)
+            # Scoring runs outside the lock; the files are only replaced by compaction, which bumps the generation
+            scored= self._search(rows, query, top_k, *state)
+            with self.lock:
+                if self.generation != generation:
+                    continue
+                return {'matches': self._matches(scored, include_metadata, include_values)}
+
+    def _search(self, rows: np.ndarray, query: np.ndarray, top_k: int, vectors: np.ndarray, quantized: Optional[np.ndarray],
+                norms: np.ndarray, scales: np.ndarray, count: int) -> List[Tuple[int, float]]:
+        if not len(rows) or top_k <= 0:
+            return []
+        if quantized is not None:
+            # Approximate scores from the int8 copy pick the candidates that are rescored exactly
+            approximate= self._scores(quantized, rows, query, count) * scales[rows]
+            rows= rows[self._top(approximate, top_k * self.rescore_factor)]
+            rows.sort()
+        norms= norms[rows]
+        scores= self._scores(vectors, rows, query, count) / np.where(norms == 0, 1.0, norms)
+        top= self._top(scores, top_k)
+        return [(int(rows[i]), float(scores[i])) for i in top[np.argsort(-scores[top])]]
+
+    def _scores(self, matrix: np.ndarray, rows: np.ndarray, query: np.ndarray, count: int) -> np.ndarray:
+        # Dot products of the given rows with the query, one block at a time; a mostly-unfiltered
+        # query scans contiguous blocks rather than gathering its rows
+        scores= np.empty(len(rows), dtype=np.float32)
+        if len(rows) > count // 2:
+            full= np.empty(count, dtype=np.float32)
+            for start in range(0, count, CHUNK_ROWS):
+                block= matrix[start:min(start + CHUNK_ROWS, count)]
+                full[start:start + len(block)] = self._dot(block, query)
+            scores[:] = full[rows]
+            return scores
+        for start in range(0, len(rows), CHUNK_ROWS):
+            block= matrix[rows[start:start + CHUNK_ROWS]]
+            scores[start:start + len(block)] = self._dot(block, query)
+        return scores
+
+    def _dot(self, block: np.ndarray, query: np.ndarray) -> np.ndarray:
+        # einsum accumulates int8 rows in float32 without materializing an upcast copy of the block
+        if block.dtype == np.float32:
+            return block @ query
+        return np.einsum("ij,j->i", block, query, dtype=np.float32, casting="unsafe")
+
+    def _top(self, scores: np.ndarray, k: int) -> np.ndarray:
+        if k >= len(scores):
+            return np.arange(len(scores))
+        return np.argpartition(-scores, k - 1)[:k]
+
+    def _matches(self, scored: List[Tuple[int, float]], include_metadata: bool, include_values: bool) -> List[Dict[str, Any]]:
+        # Rows overwritten or deleted while scoring no longer map to a record and are dropped
+        if not scored:
+            return []
+        query= f"SELECT row, id, metadata FROM records WHERE row IN ({','.join('?' * len(scored))})"
+        records= {row: (id, metadata) for row, id, metadata in self.conn.execute(query, [row for row, _ in scored])}
+        return [{
+            'id': records[row][0],
+            'score': score,
+            'metadata': json.loads(records[row][1]) if include_metadata else {},
+            'values': self.vectors[row].tolist() if include_values else []
+        } for row, score in scored if row in records]
+
+    def _maybe_compact(self):
+        dead= self.count - self.live_count
+        if dead >= self.compact_min_rows and dead >= self.compact_ratio * self.count:
+            self.compact()
+
+    def compact(self):
+        # Rewrite the live rows into the next generation's files and repoint SQLite at them in one
+        # transaction; a crash before the commit leaves the current generation intact
+        with self.lock:
+            rows= np.flatnonzero(self.live[:self.count])
+            generation= self.generation + 1
+            capacity= max(len(rows), 1024)
+            vectors= self._open("f32", capacity, generation)
+            quantized= self._open("i8", capacity, generation) if self.quantized is not None else None
+            for start in range(0, len(rows), CHUNK_ROWS):
+                block= rows[start:start + CHUNK_ROWS]
+                vectors[start:start + len(block)] = self.vectors[block]
+                if quantized is not None:
+                    quantized[start:start + len(block)] = self.quantized[block]
+            vectors.flush()
+            if quantized is not None:
+                quantized.flush()
+
+            self.conn.execute("BEGIN")
+            self.conn.executemany("UPDATE records SET row = ? WHERE row = ?", ((new, int(old)) for new, old in enumerate(rows)))
+            self._set_meta("generation", generation)
+            self.conn.execute("COMMIT")
+
+            dead= self.count - len(rows)
+            old_files= [self._file("f32"), self._file("i8")]
+            self.generation= generation
+            self.vectors, self.quantized= vectors, quantized
+            self.count= len(rows)
+            self.live= np.zeros(len(vectors), dtype=bool)
+            self.live[:self.count] = True
+            self.norms= self._moved(self.norms, rows, len(vectors), 0)
+            self.scales= self._moved(self.scales, rows, len(vectors), 0)
+            self.columns= {field: (self._moved(objects, rows, len(vectors), None), self._moved(numbers, rows, len(vectors), np.nan))
+                           for field, (objects, numbers) in self.columns.items()}
+            for file in old_files:
+                if os.path.exists(file):
+                    os.remove(file)
+            self.compactions += 1
+            logger.info("Compacted local vector store: %s dead rows removed, %s live", dead, self.count)
+
+    def _moved(self, values: np.ndarray, rows: np.ndarray, capacity: int, fill: Any) -> np.ndarray:
+        moved= np.full(capacity, fill, dtype=values.dtype)
+        moved[:len(rows)] = values[rows]
+        return moved
+
+    def list_paginated(self, prefix: Optional[str] = None, limit: int = 100, pagination_token: Optional[str] = None,
+                       **kwargs) -> SimpleNamespace:
+        # Page through ids in key order; the token is the last id returned, so writes between pages are harmless.
+        # A prefix is a key range, so it is served from the primary key index too
+        sql, params= "SELECT id FROM records WHERE id > ?", [pagination_token or ""]
+        if prefix:
+            sql += " AND id >= ? AND id < ?"
+            params += [prefix, prefix + "\U0010ffff"]
+        with self.lock:
+            ids= [row[0] for row in self.conn.execute(sql + " ORDER BY id LIMIT ?", (*params, limit + 1))]
+        more= len(ids) > limit
+        ids= ids[:limit]
+        return SimpleNamespace(
+            vectors=[SimpleNamespace(id=id) for id in ids],
+            pagination=SimpleNamespace(next=ids[-1]) if more else None
+        )
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            return {
+                'total_vector_count': self.live_count,
+                'dimension': self.dim,
+                'dead_rows': self.count - self.live_count,
+                'file_bytes': self.vectors.nbytes + (self.quantized.nbytes if self.quantized is not None else 0),
+                'quantized': self.quantized is not None,
+                'compactions': self.compactions
+            }
+
+    def close(self):
+        with self.lock:
+            self.vectors.flush()
+            if self.quantized is not None:
+                self.quantized.flush()
+            self.conn.close()
@@ -1,125 +1,355 @@
+import json
+import asyncio
+import os
+import time
 import uuid
-from typing import List, Dict, Any, Optional
-from pinecone import Pinecone
-from sentence_transformers import SentenceTransformer
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional, Set
 
 from models.schemas import SessionMemory
-from config.logging import logger
+from services.embedding_engine import EmbeddingEngine
+from services.embedding_backends import create_embedding_backend
+from services.lazy import LazyService
+from services.embedding_cache import EmbeddingCache, DiskEmbeddingStore
+from services.metrics import stage_latency
+from repository.vector_index import AsyncVectorIndex, InMemoryIndex
+from repository.local_vector_store import LocalVectorStore
+from repository.session_mirror import SessionMirror
+from config.logging import logger, HOT
 from config.setting import Config
 
 
 class PineconeRespository:
-    # Initialize Pinecone client and embedding model
+    # Initialize vector index and embedding model
     def __init__(self):
-        self.pc= Pinecone(api_key= Config.pinecone_api_key)
-        self.index= self.pc.Index(Config.pinecone_index)
+        self.embedding_model= create_embedding_backend(
+            Config.embedding_backend,
+            onnx_path= Config.embedding_onnx_path,
+            threads= Config.embedding_threads
+        )
+        # The local backend sizes its vector file from the embedding dimension
+        self.index= AsyncVectorIndex(
+            self._create_index(),
+            pool_size= Config.vector_pool_size,
+            timeout= Config.vector_timeout_s
+        )
+        
+        self.embedding_engine= EmbeddingEngine(
+            self.embedding_model,
+            max_batch_size= Config.embedding_max_batch_size,
+            max_wait_ms= Config.embedding_max_wait_ms
+        )
+        disk_store= None
+        if Config.embedding_cache_path:
+            # Vectors differ slightly between backends, so each keeps its own disk tier
+            disk_store= DiskEmbeddingStore(
+                os.path.join(Config.embedding_cache_path, Config.embedding_backend),
+                dim= self.embedding_model.dim
+            )
+        self.embedding_cache= EmbeddingCache(max_size= Config.embedding_cache_size, disk_store= disk_store)
+        
+        # Local replica of rated session vectors for similarity reads; serves queries once loaded
+        self.mirror= SessionMirror(
+            self.embedding_model.dim,
+            min_rating= Config.similar_session_min_rating
+        ) if Config.session_mirror_enabled else None
+        # Mirror being rebuilt by load_mirror; this process's writes go to both. While a load or refresh
+        # runs, mirror_written holds the ids they touched, which older copies read from the index must not overwrite
+        self.mirror_loading: Optional[SessionMirror] = None
+        self.mirror_written: Optional[Set[str]] = None
         
-        self.embedding_model= SentenceTransformer("all-MiniLM-L6-v2")
+        # Outcome of this process's last write of each recent session (False once a write failed, e.g. a
+        # write-behind batch dropped after its retries), so a rating update knows most sessions exist
+        self.write_status: "OrderedDict[str, bool]" = OrderedDict()
+        
+    def _create_index(self):
+        # Build the blocking index client for the configured backend
+        if Config.vector_backend == "memory":
+            return InMemoryIndex()
+        if Config.vector_backend == "local":
+            return LocalVectorStore(
+                Config.local_vector_path,
+                dim= self.embedding_model.dim,
+                quantize= Config.local_vector_quantize,
+                compact_ratio= Config.local_vector_compact_ratio
+            )
+        if Config.vector_backend != "pinecone":
+            raise ValueError(f"Unknown vector backend: {Config.vector_backend}")
+        from pinecone import Pinecone
+        self.pc= Pinecone(api_key= Config.pinecone_api_key)
+        return self.pc.Index(
+            Config.pinecone_index,
+            pool_threads= Config.vector_pool_size,
+            connection_pool_maxsize= Config.vector_pool_size
+        )
         
     async def generate_embeddings(self, text: str) -> List[float]:
-        # Generate embeddings for given text
+        # Generate embeddings for given text, reusing cached vectors for identical text
         try:
-            embedding= self.embedding_model.encode(text).tolist()
-            logger.debug(f"Created embedding with {len(embedding)} dimensions")
+            embedding= self.embedding_cache.get(text)
+            if embedding is not None:
+                return embedding
+            with stage_latency.time(stage="embedding.encode"):
+                embedding= await self.embedding_engine.encode(text)
+            self.embedding_cache.put(text, embedding)
+            logger.debug("Created embedding with %s dimensions", len(embedding), extra=HOT)
             return embedding
         except Exception as e:
-            logger.error(f"Error creating embedding: {str(e)}")
+            logger.error("Error creating embedding: %s", e)
             return []
         
     async def store_session(self, session_memory: SessionMemory) -> bool:
         # Store session data with embeddings in Pinecone
+        return await self.store_sessions([session_memory])
+    
+    async def store_sessions(self, session_memories: List[SessionMemory]) -> bool:
+        # Store several sessions in one multi-vector upsert
         try:
-            memory_text = f"{session_memory.user_input} {session_memory.user_state} {' '.join(session_memory.ritual_steps)}"
-            embedding = await self.generate_embeddings(memory_text)
-            if not embedding:
+            embeddings = await asyncio.gather(*[
+                self.generate_embeddings(self._session_text(memory.user_input, memory.user_state, memory.ritual_steps))
+                for memory in session_memories
+            ])
+            if not all(embeddings):
                 logger.error("Failed to create embedding for session")
+                self._record_writes(session_memories, False)
                 return False
             
-            self.index.upsert(
-                vectors=[{
-                    'id': session_memory.session_id,
-                    'values': embedding,
-                    'metadata': {
-                        'user_input': session_memory.user_input,
-                        'user_state': session_memory.user_state,
-                        'ritual_steps': session_memory.ritual_steps,
-                        'rating': session_memory.rating,
-                        'timestamp': session_memory.timestamp.isoformat()
-                    }
-                }])
-            logger.info(f"Session {session_memory.session_id} saved to memory")
+            vectors= [{
+                'id': memory.session_id,
+                'values': embedding,
+                'metadata': {
+                    'user_input': memory.user_input,
+                    'user_state': memory.user_state,
+                    'ritual_steps': memory.ritual_steps,
+                    'ritual': json.dumps([step.model_dump() for step in memory.steps]),
+                    'rating': memory.rating,
+                    'timestamp': memory.timestamp.isoformat(),
+                    'bulk': memory.bulk,
+                    'updated_at': time.time()
+                }
+            } for memory, embedding in zip(session_memories, embeddings)]
+            try:
+                with stage_latency.time(stage="vector.upsert"):
+                    await self.index.upsert(vectors=vectors)
+            except Exception:
+                self._record_writes(session_memories, False)
+                raise
+            self._record_writes(session_memories, True)
+            for mirror in self._mirrors():
+                for vector in vectors:
+                    mirror.add(vector['id'], vector['values'], vector['metadata'])
+            if self.mirror_written is not None:
+                self.mirror_written.update(vector['id'] for vector in vectors)
+            logger.info("Saved %s session(s) to memory: %s", len(session_memories), ', '.join(m.session_id for m in session_memories))
             return True
             
         except Exception as e:
-            logger.error(f"Error saving session memory: {str(e)}")
+            logger.error("Error saving session memory: %s", e)
             return False
         
     async def update_session_rating(self, session_id: str, rating: int) -> bool:
-        # Update Rating for stored Session
+        return (await self.update_session_ratings({session_id: rating}))[session_id] == "updated"
+    
+    def _record_writes(self, session_memories: List[SessionMemory], stored: bool):
+        for memory in session_memories:
+            self.write_status[memory.session_id] = stored
+            self.write_status.move_to_end(memory.session_id)
+        while len(self.write_status) > Config.session_store_max_size:
+            self.write_status.popitem(last=False)
+    
+    async def update_session_ratings(self, ratings: Dict[str, int]) -> Dict[str, str]:
+        # Metadata-only rating updates, each "updated", "not_found" or "failed". Pinecone silently ignores
+        # an update of an id that was never written, so existence is checked first, without fetching values
         try:
-            session = await self.get_session(session_id)
-            if not session:
-                logger.error(f"Session {session_id} not found for rating update")
-                return False
-            self.index.upsert(
-                vectors=[{
-                    'id': session_id,
-                    'values': await self.generate_embeddings(
-                        f"{session['user_input']} {session['user_state']} {' '.join(session['ritual_steps'])}"
-                    ),
-                    'metadata': {
-                        'user_input': session['user_input'],
-                        'user_state': session['user_state'],
-                        'ritual_steps': session['ritual_steps'],
-                        'rating': rating,
-                        'timestamp': session['timestamp']
-                    }
-                }]
-            )
-            logger.info(f"Updated rating for session {session_id}: {rating}")
-            return True
+            existing= await self._existing(list(ratings))
         except Exception as e:
-            logger.error(f"Error updating session rating for {session_id}: {str(e)}")
-            return False
+            logger.error("Error checking sessions before a rating update: %s", e)
+            return dict.fromkeys(ratings, "failed")
         
+        async def update(session_id: str, rating: int) -> str:
+            if session_id not in existing:
+                logger.error("Session %s not found in storage", session_id)
+                return "not_found"
+            try:
+                with stage_latency.time(stage="vector.update"):
+                    await self.index.update(id=session_id, set_metadata={'rating': rating, 'updated_at': time.time()})
+                logger.info("Updated rating for session %s: %s", session_id, rating)
+                await self._mirror_rating(session_id, rating)
+                return "updated"
+            except Exception as e:
+                logger.error("Error updating session rating for %s: %s", session_id, e)
+                return "failed"
+        
+        # Pinecone has no multi-record metadata update, so the updates run concurrently on the index pool
+        results= await asyncio.gather(*[update(session_id, rating) for session_id, rating in ratings.items()])
+        return dict(zip(ratings, results))
+    
+    async def _existing(self, session_ids: List[str]) -> Set[str]:
+        # Sessions this process wrote are known; others are looked up by id alone with a prefix listing
+        existing= {session_id for session_id in session_ids if self.write_status.get(session_id)}
+        unknown= [session_id for session_id in session_ids if session_id not in self.write_status]
+        if not unknown:
+            return existing
+        
+        async def listed(session_id: str) -> bool:
+            with stage_latency.time(stage="vector.list"):
+                page= await self.index.list_paginated(prefix=session_id, limit=1)
+            return any(item.id == session_id for item in page.vectors)
+        
+        try:
+            found= await asyncio.gather(*[listed(session_id) for session_id in unknown])
+            return existing | {session_id for session_id, present in zip(unknown, found) if present}
+        except Exception as e:
+            # Pod-based Pinecone indexes cannot list ids
+            logger.warning("Listing ids failed, checking sessions with a fetch: %s", e)
+            with stage_latency.time(stage="vector.fetch"):
+                result= await self.index.fetch(ids=unknown)
+            return existing | set(result.vectors or {})
+        
+    def _mirrors(self) -> List[SessionMirror]:
+        return [mirror for mirror in (self.mirror, self.mirror_loading) if mirror is not None]
+    
+    async def _mirror_rating(self, session_id: str, rating: int):
+        # Re-rate the mirrored copy; the record is fetched only when a mirror has to add the session
+        record= None
+        for mirror in self._mirrors():
+            if mirror.apply_rating(session_id, rating) or rating < mirror.min_rating:
+                continue
+            # A well rated session this mirror does not hold yet (stored unrated or by another replica)
+            if record is None:
+                try:
+                    with stage_latency.time(stage="vector.fetch"):
+                        record= ((await self.index.fetch(ids=[session_id])).vectors or {}).get(session_id)
+                except Exception as e:
+                    logger.warning("Could not fetch session %s for the mirror: %s", session_id, e)
+                if record is None:
+                    return
+            mirror.add(session_id, record['values'], {**record['metadata'], 'rating': rating})
+        if self.mirror_written is not None:
+            self.mirror_written.add(session_id)
+    
+    async def load_mirror(self):
+        # Build a fresh mirror from a scan of every stored session, then swap it in. Used for the initial
+        # load and when a refresh cannot be done incrementally. Pinecone lists ids on serverless indexes only
+        if self.mirror is None or self.mirror_written is not None:
+            return
+        loaded= SessionMirror(self.mirror.dim, min_rating= self.mirror.min_rating)
+        self.mirror_loading= loaded
+        self.mirror_written= set()
+        started= time.time()
+        try:
+            token= None
+            while True:
+                page= await self.index.list_paginated(limit= Config.session_mirror_page_size, pagination_token= token)
+                ids= [item.id for item in page.vectors]
+                if ids:
+                    with stage_latency.time(stage="vector.fetch"):
+                        records= (await self.index.fetch(ids=ids)).vectors or {}
+                    for session_id, record in records.items():
+                        if session_id not in self.mirror_written:
+                            loaded.add(session_id, record['values'], record['metadata'])
+                token= page.pagination.next if page.pagination else None
+                if not token:
+                    break
+            self.mirror.replace(loaded, synced_at= started)
+            logger.info("Session mirror loaded: %s sessions", self.mirror.get_stats()['sessions'])
+        except Exception as e:
+            logger.error("Session mirror load failed, similarity reads stay %s: %s",
+                         "on the previous load" if self.mirror.ready else "remote", e)
+        finally:
+            self.mirror_loading= None
+            self.mirror_written= None
+    
+    async def refresh_mirror(self):
+        # Apply the sessions stored or re-rated (on any replica) since the last sync, found with one query
+        # filtered on updated_at. The window reaches back session_mirror_refresh_overlap_s to cover clock
+        # skew between replicas and index write latency; re-applying a record is harmless
+        if self.mirror is None or self.mirror_written is not None:
+            return
+        if self.mirror.synced_at is None:
+            return await self.load_mirror()
+        limit= Config.session_mirror_refresh_max_changes
+        self.mirror_written= set()
+        started= time.time()
+        try:
+            # The filter does the selecting; any non-zero vector will do for the query itself
+            probe= [1.0] + [0.0] * (self.mirror.dim - 1)
+            with stage_latency.time(stage="vector.query"):
+                results= await self.index.query(
+                    vector= probe,
+                    top_k= limit,
+                    include_metadata= True,
+                    include_values= True,
+                    filter= {'updated_at': {"$gte": self.mirror.synced_at - Config.session_mirror_refresh_overlap_s}}
+                )
+            matches= results['matches']
+            if len(matches) < limit:
+                for match in matches:
+                    if match['id'] not in self.mirror_written:
+                        self.mirror.add(match['id'], match['values'], match['metadata'])
+                self.mirror.refreshed(len(matches), synced_at= started)
+                logger.info("Session mirror refreshed: %s changed sessions", len(matches))
+                return
+        except Exception as e:
+            logger.error("Session mirror refresh failed, retrying next period: %s", e)
+            return
+        finally:
+            self.mirror_written= None
+        logger.info("More than %s sessions changed since the last sync, reloading the session mirror", limit - 1)
+        await self.load_mirror()
+    
     async def retrieve_similar_sessions(self, user_input: str, user_state: Dict[str, Any], top_k: int = 3) -> List[Dict[str, Any]]:
         # Retrieve Similar sessions based on input and state
         try:
             query_text= f"{user_input} {user_state['state']}"
             embedding= await self.generate_embeddings(query_text)
-            results= self.index.query(
-                vector= embedding,
-                top_k= top_k,
-                include_metadata= True,
-                filter= {'rating': {"$gte": 3}}
-            )
+            if self.mirror is not None and self.mirror.ready:
+                # Same candidates as the remote query below: the user's own state, rated similar_session_min_rating or higher
+                with stage_latency.time(stage="mirror.query"):
+                    sessions= self.mirror.search(embedding, user_state['state'], top_k)
+                logger.info("Retrieved %s similar sessions from the mirror", len(sessions))
+                return sessions
+            with stage_latency.time(stage="vector.query"):
+                # Only sessions of the same state can be reused, so top_k is taken among those alone
+                results= await self.index.query(
+                    vector= embedding,
+                    top_k= top_k,
+                    include_metadata= True,
+                    filter= {'rating': {"$gte": Config.similar_session_min_rating}, 'user_state': user_state['state']}
+                )
             
             sessions= [{
                 'session_id': match['id'],
                 'score': match['score'],
                 'user_state': match['metadata'].get('user_state'),
                 "ritual_steps": match['metadata'].get("ritual_steps", []),
+                "ritual": json.loads(match['metadata'].get("ritual") or "[]"),
                 "rating": match['metadata'].get("rating")
             } for match in results['matches']]
-            logger.info(f"Retrieved {len(sessions)} similar sessions")
+            logger.info("Retrieved %s similar sessions", len(sessions))
             return sessions
         except Exception as e:
-            logger.error(f"Session retrieval error: {str(e)}")
+            logger.error("Session retrieval error: %s", e)
             return []
         
     async def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
         # Fetch session metadata by ID
         try:
-            result = self.index.fetch(ids=[session_id])
+            with stage_latency.time(stage="vector.fetch"):
+                result = await self.index.fetch(ids=[session_id])
             if result.vectors and session_id in result.vectors:
                 return result.vectors[session_id]['metadata']
-            logger.error(f"Session {session_id} not found")
+            logger.error("Session %s not found", session_id)
             return None
         except Exception as e:
-            logger.error(f"Error fetching session {session_id}: {str(e)}")
+            logger.error("Error fetching session %s: %s", session_id, e)
             return None    
     
+    def _session_text(self, user_input: str, user_state: str, ritual_steps: List[str]) -> str:
+        # Text embedded for a session; shared by store and rating update so the cache hits
+        return f"{user_input} {user_state} {' '.join(ritual_steps)}"
+    
     def generate_session_id(self) -> str:
         return str(uuid.uuid4())        # Generate Unique session id
 
-pinecone_service= PineconeRespository()     
\ No newline at end of file
+pinecone_service= LazyService(PineconeRespository)     
\ No newline at end of file
@@ -0,0 +1,177 @@
+import json
+import time
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+
+
+def unit(vector) -> np.ndarray:
+    vector= np.asarray(vector, dtype=np.float32)
+    norm= np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def mirror_record(metadata: Dict[str, Any]) -> Dict[str, Any]:
+    # The fields retrieval returns, with the ritual decoded once instead of on every query
+    ritual= metadata.get("ritual")
+    return {
+        "user_state": metadata.get("user_state"),
+        "ritual_steps": list(metadata.get("ritual_steps") or []),
+        "ritual": json.loads(ritual) if isinstance(ritual, str) else (ritual or []),
+        "rating": metadata.get("rating")
+    }
+
+
+class MirrorShard:
+    # Unit vectors of one user_state in a contiguous float32 matrix; rows grow by doubling and
+    # removals move the last row into the gap, so a query is one matrix-vector product
+    def __init__(self, dim: int, capacity: int = 64):
+        self.vectors= np.empty((capacity, dim), dtype=np.float32)
+        self.ids: List[str] = []
+        self.records: List[Dict[str, Any]] = []
+        self.positions: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def upsert(self, session_id: str, vector: np.ndarray, record: Dict[str, Any]):
+        position= self.positions.get(session_id)
+        if position is None:
+            position= len(self.ids)
+            if position == len(self.vectors):
+                grown= np.empty((len(self.vectors) * 2, self.vectors.shape[1]), dtype=np.float32)
+                grown[:position] = self.vectors[:position]
+                self.vectors= grown
+            self.ids.append(session_id)
+            self.records.append(record)
+            self.positions[session_id] = position
+        else:
+            self.records[position] = record
+        self.vectors[position] = vector
+
+    def remove(self, session_id: str) -> Optional[Tuple[np.ndarray, Dict[str, Any]]]:
+        position= self.positions.pop(session_id, None)
+        if position is None:
+            return None
+        removed= (self.vectors[position].copy(), self.records[position])
+        last= len(self.ids) - 1
+        if position != last:
+            self.vectors[position] = self.vectors[last]
+            self.ids[position] = self.ids[last]
+            self.records[position] = self.records[last]
+            self.positions[self.ids[position]] = position
+        self.ids.pop()
+        self.records.pop()
+        return removed
+
+    def search(self, query: np.ndarray, top_k: int) -> List[Tuple[int, float]]:
+        count= len(self.ids)
+        if not count or top_k <= 0:
+            return []
+        scores= self.vectors[:count] @ query
+        k= min(top_k, count)
+        top= np.argpartition(-scores, k - 1)[:k] if k < count else np.arange(count)
+        return [(int(i), float(scores[i])) for i in top[np.argsort(-scores[top])]]
+
+
+class SessionMirror:
+    # In-process read replica of highly rated session vectors, sharded by user_state. It is built
+    # from a full scan of the vector store and periodically refreshed with the sessions changed since,
+    # which picks up writes and ratings from other replicas; this process's own writes are applied as they happen.
+    def __init__(self, dim: int, min_rating: int = 3):
+        self.dim= dim
+        self.min_rating= min_rating
+        self.shards: Dict[str, MirrorShard] = {}
+        self.shard_of: Dict[str, str] = {}
+        self.ready= False
+        self.loaded_at: Optional[float] = None
+        # Wall-clock time the last load or refresh started; sessions updated after it are not mirrored yet
+        self.synced_at: Optional[float] = None
+
+        self.loads= 0
+        self.refreshes= 0
+        self.refreshed_sessions= 0
+        self.queries= 0
+        self.demotions= 0
+        self.misses= 0
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self.shard_of
+
+    def add(self, session_id: str, vector, metadata: Dict[str, Any]):
+        # Record a stored session; only sessions rated min_rating or higher are kept
+        record= mirror_record(metadata)
+        if (record["rating"] or 0) < self.min_rating:
+            self.remove(session_id)
+            return
+        state= self.shard_of.get(session_id)
+        if state is not None and state != record["user_state"]:
+            self.remove(session_id)
+        state= record["user_state"]
+        if state not in self.shards:
+            self.shards[state] = MirrorShard(self.dim)
+        self.shards[state].upsert(session_id, unit(vector), record)
+        self.shard_of[session_id] = state
+
+    def remove(self, session_id: str):
+        state= self.shard_of.pop(session_id, None)
+        if state is not None:
+            self.shards[state].remove(session_id)
+
+    def apply_rating(self, session_id: str, rating: int) -> bool:
+        # Re-rate or drop a mirrored session; False if it is not mirrored, so the caller adds it from the store
+        state= self.shard_of.get(session_id)
+        if state is None:
+            self.misses += 1
+            return False
+        if rating < self.min_rating:
+            self.remove(session_id)
+            self.demotions += 1
+            return True
+        shard= self.shards[state]
+        position= shard.positions[session_id]
+        shard.records[position] = {**shard.records[position], "rating": rating}
+        return True
+
+    def replace(self, loaded: "SessionMirror", synced_at: float):
+        # Swap in the sessions of a freshly loaded mirror, keeping this one's counters
+        self.shards= loaded.shards
+        self.shard_of= loaded.shard_of
+        self.ready= True
+        self.loaded_at= time.monotonic()
+        self.synced_at= synced_at
+        self.loads += 1
+
+    def refreshed(self, changed: int, synced_at: float):
+        # Record an incremental refresh that applied the sessions changed since the previous sync
+        self.synced_at= synced_at
+        self.refreshes += 1
+        self.refreshed_sessions += changed
+
+    def search(self, vector, user_state: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        # Top-k cosine matches among the highly rated sessions of one user_state
+        self.queries += 1
+        shard= self.shards.get(user_state)
+        if shard is None:
+            return []
+        return [{
+            "session_id": shard.ids[position],
+            "score": score,
+            **shard.records[position]
+        } for position, score in shard.search(unit(vector), top_k)]
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "ready": self.ready,
+            "sessions": len(self.shard_of),
+            "shards": {state: len(shard) for state, shard in self.shards.items()},
+            "resident_bytes": sum(shard.vectors.nbytes for shard in self.shards.values()),
+            "loads": self.loads,
+            "last_load_age_s": round(time.monotonic() - self.loaded_at, 1) if self.loaded_at is not None else None,
+            "last_sync_age_s": round(time.time() - self.synced_at, 1) if self.synced_at is not None else None,
+            "refreshes": self.refreshes,
+            "refreshed_sessions": self.refreshed_sessions,
+            "queries": self.queries,
+            "demotions": self.demotions,
+            "misses": self.misses
+        }
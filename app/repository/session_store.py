@@ -0,0 +1,298 @@
+import asyncio
+import json
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Any, Optional, Tuple
+
+from models.schemas import Ritual
+from config.logging import logger
+
+
+def serialize_session(session: Dict[str, Any]) -> bytes:
+    # Compact JSON form of an active ritual session
+    return json.dumps({
+        "r": session["ritual"].model_dump(mode="json"),
+        "c": session["current_step"],
+        "t": session["total_steps"],
+        "s": session["started_at"].isoformat(),
+        "d": session["completed_steps"],
+        "f": session.get("streaming", False)
+    }, separators=(",", ":")).encode("utf-8")
+
+
+def deserialize_session(data: bytes) -> Dict[str, Any]:
+    raw= json.loads(data)
+    return {
+        "ritual": Ritual.model_validate(raw["r"]),
+        "current_step": raw["c"],
+        "total_steps": raw["t"],
+        "started_at": datetime.fromisoformat(raw["s"]),
+        "completed_steps": raw["d"],
+        "streaming": raw["f"]
+    }
+
+
+class SessionStore(ABC):
+    # Interface for active ritual session storage with idle-TTL eviction
+    @abstractmethod
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def put(self, session_id: str, session: Dict[str, Any]):
+        ...
+
+    @abstractmethod
+    async def delete(self, session_id: str):
+        ...
+
+    @abstractmethod
+    async def count(self) -> int:
+        # Cheap session count for frequently scraped gauges; get_stats may walk the whole store
+        ...
+
+    @abstractmethod
+    async def get_stats(self) -> Dict[str, Any]:
+        ...
+
+
+class InMemorySessionStore(SessionStore):
+    # Process-local store kept in LRU order so expired sessions sit at the front
+    def __init__(self, ttl_s: float = 3600.0, max_size: int = 10000):
+        self.ttl= ttl_s
+        self.max_size= max_size
+        self.sessions: "OrderedDict[str, Tuple[Dict[str, Any], int, float]]" = OrderedDict()
+        self.resident_bytes= 0
+        self.evictions_ttl= 0
+        self.evictions_size= 0
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        entry= self.sessions.get(session_id)
+        if entry is None:
+            return None
+        session, size, last_access= entry
+        now= time.monotonic()
+        if now - last_access > self.ttl:
+            self._remove(session_id)
+            self.evictions_ttl += 1
+            return None
+        self.sessions[session_id] = (session, size, now)
+        self.sessions.move_to_end(session_id)
+        return session
+
+    async def put(self, session_id: str, session: Dict[str, Any]):
+        entry= self.sessions.get(session_id)
+        # The serialized size is dominated by the ritual, so measure it once per session
+        size= entry[1] if entry is not None else len(serialize_session(session))
+        if entry is None:
+            self.resident_bytes += size
+        self.sessions[session_id] = (session, size, time.monotonic())
+        self.sessions.move_to_end(session_id)
+        self._evict()
+
+    async def delete(self, session_id: str):
+        self._remove(session_id)
+
+    def _remove(self, session_id: str):
+        entry= self.sessions.pop(session_id, None)
+        if entry is not None:
+            self.resident_bytes -= entry[1]
+
+    def _evict(self):
+        cutoff= time.monotonic() - self.ttl
+        while self.sessions:
+            session_id, (_, _, last_access)= next(iter(self.sessions.items()))
+            if last_access >= cutoff:
+                break
+            self._remove(session_id)
+            self.evictions_ttl += 1
+        while len(self.sessions) > self.max_size:
+            self._remove(next(iter(self.sessions)))
+            self.evictions_size += 1
+
+    async def count(self) -> int:
+        return len(self.sessions)
+
+    async def get_stats(self) -> Dict[str, Any]:
+        self._evict()
+        return {
+            "backend": "memory",
+            "sessions": len(self.sessions),
+            "resident_bytes": self.resident_bytes,
+            "evictions_ttl": self.evictions_ttl,
+            "evictions_size": self.evictions_size
+        }
+
+
+class SQLiteSessionStore(SessionStore):
+    # SQLite (WAL) store that several uvicorn workers on one host can share. Queries run on one
+    # dedicated thread off the event loop; reads record the access time in memory and write them
+    # back in one batch every touch_interval_s, so the idle TTL is accurate to that interval
+    def __init__(self, path: str = "sessions.db", ttl_s: float = 3600.0, max_size: int = 10000, touch_interval_s: Optional[float] = None):
+        self.ttl= ttl_s
+        self.max_size= max_size
+        self.touch_interval= touch_interval_s if touch_interval_s is not None else min(60.0, ttl_s / 10)
+        self.touched: Dict[str, float] = {}
+        self.last_touch_flush= time.time()
+        self.executor= ThreadPoolExecutor(max_workers=1, thread_name_prefix="session-store")
+        self.conn= sqlite3.connect(path, isolation_level=None, check_same_thread=False, timeout=5.0)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("CREATE TABLE IF NOT EXISTS sessions (id TEXT PRIMARY KEY, data BLOB NOT NULL, last_access REAL NOT NULL)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sessions_last_access ON sessions (last_access)")
+        self.evictions_ttl= 0
+        self.evictions_size= 0
+        self.puts= 0
+        logger.info("SQLite session store opened at %s", path)
+
+    async def _run(self, call, *args) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self.executor, call, *args)
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data= await self._run(self._get, session_id)
+        return deserialize_session(data) if data is not None else None
+
+    def _get(self, session_id: str) -> Optional[bytes]:
+        now= time.time()
+        row= self.conn.execute("SELECT data, last_access FROM sessions WHERE id = ?", (session_id,)).fetchone()
+        if row is None:
+            return None
+        if now - max(row[1], self.touched.get(session_id, 0.0)) > self.ttl:
+            self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+            self.touched.pop(session_id, None)
+            self.evictions_ttl += 1
+            return None
+        self.touched[session_id] = now
+        if now - self.last_touch_flush >= self.touch_interval:
+            self._flush_touched()
+        return row[0]
+
+    def _flush_touched(self):
+        # Write back the access times recorded since the last flush in one transaction
+        touched, self.touched= self.touched, {}
+        self.last_touch_flush= time.time()
+        if touched:
+            self.conn.execute("BEGIN")
+            self.conn.executemany(
+                "UPDATE sessions SET last_access = MAX(last_access, ?) WHERE id = ?",
+                [(last_access, session_id) for session_id, last_access in touched.items()]
+            )
+            self.conn.execute("COMMIT")
+
+    async def put(self, session_id: str, session: Dict[str, Any]):
+        await self._run(self._put, session_id, serialize_session(session))
+
+    def _put(self, session_id: str, data: bytes):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO sessions (id, data, last_access) VALUES (?, ?, ?)",
+            (session_id, data, time.time())
+        )
+        self.touched.pop(session_id, None)
+        self.puts += 1
+        # Sweep periodically rather than on every write
+        if self.puts % 100 == 0:
+            self._evict()
+
+    async def delete(self, session_id: str):
+        await self._run(self._delete, session_id)
+
+    def _delete(self, session_id: str):
+        self.conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+        self.touched.pop(session_id, None)
+
+    def _evict(self):
+        # Recent reads must count before anything is judged idle
+        self._flush_touched()
+        cursor= self.conn.execute("DELETE FROM sessions WHERE last_access < ?", (time.time() - self.ttl,))
+        self.evictions_ttl += cursor.rowcount
+        count= self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+        if count > self.max_size:
+            cursor= self.conn.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions ORDER BY last_access LIMIT ?)",
+                (count - self.max_size,)
+            )
+            self.evictions_size += cursor.rowcount
+
+    async def count(self) -> int:
+        # Expired rows not yet swept are included until the next eviction pass
+        return await self._run(lambda: self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0])
+
+    async def get_stats(self) -> Dict[str, Any]:
+        return await self._run(self._get_stats)
+
+    def _get_stats(self) -> Dict[str, Any]:
+        self._evict()
+        count, size= self.conn.execute("SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM sessions").fetchone()
+        return {
+            "backend": "sqlite",
+            "sessions": count,
+            "resident_bytes": size,
+            "evictions_ttl": self.evictions_ttl,
+            "evictions_size": self.evictions_size
+        }
+
+
+class RedisSessionStore(SessionStore):
+    # Redis-protocol store; idle TTL is refreshed on read and max size is left to maxmemory policy
+    def __init__(self, client, ttl_s: float = 3600.0, prefix: str = "focusforge:session:"):
+        self.client= client
+        self.ttl= int(ttl_s)
+        self.prefix= prefix
+
+    async def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        data= await self.client.getex(self.prefix + session_id, ex=self.ttl)
+        return deserialize_session(data) if data else None
+
+    async def put(self, session_id: str, session: Dict[str, Any]):
+        await self.client.set(self.prefix + session_id, serialize_session(session), ex=self.ttl)
+
+    async def delete(self, session_id: str):
+        await self.client.delete(self.prefix + session_id)
+
+    async def count(self) -> int:
+        # DBSIZE is O(1) but counts the whole logical database, so give sessions a database of
+        # their own (the /<db> suffix of SESSION_STORE_URL) for the gauge to be exact
+        return await self.client.dbsize()
+
+    async def get_stats(self) -> Dict[str, Any]:
+        # Count only this store's keys: SCAN by prefix, with the value sizes fetched per page in one pipeline
+        sessions, size= 0, 0
+        cursor= 0
+        while True:
+            cursor, keys= await self.client.scan(cursor=cursor, match=self.prefix + "*", count=1000)
+            if keys:
+                pipeline= self.client.pipeline(transaction=False)
+                for key in keys:
+                    pipeline.strlen(key)
+                sessions += len(keys)
+                size += sum(await pipeline.execute())
+            if not cursor:
+                break
+        # Redis counts expirations and evictions server-wide only, so they are reported as such
+        info= await self.client.info("stats")
+        return {
+            "backend": "redis",
+            "sessions": sessions,
+            "resident_bytes": size,
+            "server_expired_keys": info.get("expired_keys", 0),
+            "server_evicted_keys": info.get("evicted_keys", 0)
+        }
+
+
+def create_session_store(backend: str, ttl_s: float, max_size: int, path: str, url: str) -> SessionStore:
+    # Build the configured session store backend
+    if backend == "memory":
+        return InMemorySessionStore(ttl_s=ttl_s, max_size=max_size)
+    if backend == "sqlite":
+        return SQLiteSessionStore(path=path, ttl_s=ttl_s, max_size=max_size)
+    if backend == "redis":
+        try:
+            import redis.asyncio as redis
+        except ImportError:
+            raise ValueError("The redis session store requires the 'redis' package")
+        return RedisSessionStore(redis.from_url(url), ttl_s=ttl_s)
+    raise ValueError(f"Unknown session store backend: {backend}")
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config.logging import logger
+
+
+def matches_filter(metadata: Dict[str, Any], filter: Optional[Dict[str, Any]]) -> bool:
+    # Evaluate a Pinecone-style metadata filter against one record
+    if not filter:
+        return True
+    for field, condition in filter.items():
+        value= metadata.get(field)
+        if not isinstance(condition, dict):
+            condition= {"$eq": condition}
+        for op, target in condition.items():
+            if op == "$eq" and value != target:
+                return False
+            if op == "$ne" and value == target:
+                return False
+            if op == "$in" and value not in target:
+                return False
+            if op == "$nin" and value in target:
+                return False
+            if op in ("$gt", "$gte", "$lt", "$lte"):
+                if value is None:
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+    return True
+
+
+class InMemoryIndex:
+    # In-process stand-in for a Pinecone index with the same call shapes
+    def __init__(self):
+        self.records: Dict[str, Dict[str, Any]] = {}
+        self.lock= threading.Lock()
+        logger.info("In-memory vector index initialized")
+
+    def upsert(self, vectors: List[Dict[str, Any]], **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            for vector in vectors:
+                self.records[vector['id']] = {
+                    'id': vector['id'],
+                    'values': list(vector['values']),
+                    'metadata': dict(vector.get('metadata') or {})
+                }
+        return {'upserted_count': len(vectors)}
+
+    def fetch(self, ids: List[str], **kwargs) -> SimpleNamespace:
+        with self.lock:
+            found= {id: dict(self.records[id]) for id in ids if id in self.records}
+        return SimpleNamespace(vectors=found)
+
+    def update(self, id: str, set_metadata: Optional[Dict[str, Any]] = None, values: Optional[List[float]] = None, **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            record= self.records.get(id)
+            if record is not None:
+                if set_metadata:
+                    record['metadata'].update(set_metadata)
+                if values is not None:
+                    record['values'] = list(values)
+        return {}
+
+    def query(self, vector: List[float], top_k: int = 10, include_metadata: bool = False, filter: Optional[Dict[str, Any]] = None,
+              include_values: bool = False, **kwargs) -> Dict[str, Any]:
+        with self.lock:
+            candidates= [record for record in self.records.values() if matches_filter(record['metadata'], filter)]
+        if not candidates:
+            return {'matches': []}
+
+        matrix= np.asarray([record['values'] for record in candidates], dtype=np.float32)
+        query= np.asarray(vector, dtype=np.float32)
+        norms= np.linalg.norm(matrix, axis=1) * (np.linalg.norm(query) or 1.0)
+        scores= matrix @ query / np.where(norms == 0, 1.0, norms)
+        order= np.argsort(-scores)[:top_k]
+        return {'matches': [{
+            'id': candidates[i]['id'],
+            'score': float(scores[i]),
+            'metadata': dict(candidates[i]['metadata']) if include_metadata else {},
+            'values': list(candidates[i]['values']) if include_values else []
+        } for i in order]}
+
+    def list_paginated(self, prefix: Optional[str] = None, limit: int = 100, pagination_token: Optional[str] = None,
+                       **kwargs) -> SimpleNamespace:
+        # Page through ids in insertion order; records are never removed, so the offset token stays valid
+        offset= int(pagination_token or 0)
+        with self.lock:
+            matching= [id for id in self.records if id.startswith(prefix)] if prefix else self.records
+            ids= list(islice(matching, offset, offset + limit))
+            more= offset + len(ids) < len(matching)
+        return SimpleNamespace(
+            vectors=[SimpleNamespace(id=id) for id in ids],
+            pagination=SimpleNamespace(next=str(offset + len(ids))) if more else None
+        )
+
+    def describe_index_stats(self, **kwargs) -> Dict[str, Any]:
+        return {'total_vector_count': len(self.records)}
+
+
+class AsyncVectorIndex:
+    # Run blocking index calls on a bounded thread pool with per-call timeouts
+    def __init__(self, index, pool_size: int = 8, timeout: float = 10.0):
+        self.index= index
+        self.timeout= timeout
+        self.executor= ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix="vector-index")
+
+    async def _call(self, method: str, **kwargs) -> Any:
+        loop= asyncio.get_running_loop()
+        call= getattr(self.index, method)
+        return await asyncio.wait_for(
+            loop.run_in_executor(self.executor, lambda: call(**kwargs)),
+            timeout=self.timeout
+        )
+
+    async def upsert(self, vectors: List[Dict[str, Any]]) -> Any:
+        return await self._call("upsert", vectors=vectors)
+
+    async def fetch(self, ids: List[str]) -> Any:
+        return await self._call("fetch", ids=ids)
+
+    async def update(self, id: str, set_metadata: Dict[str, Any]) -> Any:
+        return await self._call("update", id=id, set_metadata=set_metadata)
+
+    async def query(self, vector: List[float], top_k: int, include_metadata: bool = True, filter: Optional[Dict[str, Any]] = None,
+                    include_values: bool = False) -> Any:
+        return await self._call("query", vector=vector, top_k=top_k, include_metadata=include_metadata, filter=filter, include_values=include_values)
+
+    async def list_paginated(self, prefix: Optional[str] = None, limit: int = 100, pagination_token: Optional[str] = None) -> Any:
+        kwargs= {"prefix": prefix} if prefix else {}
+        return await self._call("list_paginated", limit=limit, pagination_token=pagination_token, **kwargs)
+
+    async def describe_index_stats(self) -> Any:
+        return await self._call("describe_index_stats")
+
+    def close(self):
+        self.executor.shutdown(wait=False)
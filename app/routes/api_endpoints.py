@@ -1,59 +1,128 @@
-from fastapi import APIRouter, HTTPException, status
-from typing import Dict, Any
+from fastapi import APIRouter, HTTPException, Request, status
+from fastapi.responses import StreamingResponse, Response
+from typing import Dict, Any, List
 from pydantic import BaseModel  
-from models.schemas import UserInput, RitualResponse, FeedbackResponse
+from models.schemas import UserInput, RitualResponse, FeedbackResponse, BulkFeedbackResponse
 from controllers.input_controller import InputController
-from config.logging import logger
+from repository.pinecone_repository import pinecone_service
+from services.session_writer import session_writer
+from services.lazy import LazyService
+from services.ritual_pool import ritual_pool
+from services.state_classifier import state_classifier
+from services.ritual_reuse import ritual_reuse
+from services.ritual_cache import ritual_cache
+from services.ai_service import ai_service
+from usecases.ritual_guide import ritual_guide
+from usecases.bulk_ritual_builder import iter_jsonl
+from config.setting import Config
+from config.logging import logger, HOT
 
 router= APIRouter(prefix='/api/v1', tags=['ritual'])
-controller= InputController()
+controller= LazyService(InputController)
 
 class FeedbackRequest(BaseModel):
     rating: int
 
+class BulkFeedbackItem(BaseModel):
+    session_id: str
+    rating: int
+
+class BulkFeedbackRequest(BaseModel):
+    feedback: List[BulkFeedbackItem]
+
+class RawJSONResponse(Response):
+    # Returns already-serialized JSON bytes without re-validation or re-encoding
+    media_type = "application/json"
+
 @router.post("/ritual", response_model= RitualResponse)
 async def create_ritual(user_input: UserInput):
-    logger.info(f"Received request to create ritual: {user_input.text}")
+    logger.info("Received request to create ritual: %s", user_input.text, extra=HOT)
     try:
         response= await controller.process_user_input(user_input)
         return response
     except HTTPException as e:
-        logger.error(f"HTTP error in create_ritual: {str(e)}")
+        logger.error("HTTP error in create_ritual: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in create_ritual: {str(e)}")
+        logger.error("Unexpected error in create_ritual: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to create ritual: {str(e)}"
         )
         
-@router.get("/step/{session_id}", response_model= Dict[str, Any])
+@router.get("/ritual/stream")
+async def stream_ritual(text: str):
+    # Server-sent events: session, one step event per ritual step, then done (or error)
+    logger.info("Received request to stream ritual: %s", text, extra=HOT)
+    return StreamingResponse(
+        controller.stream_user_input(text),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@router.post("/rituals/batch")
+async def create_rituals_batch(request: Request):
+    # Body: {"inputs": [...]} or JSON Lines (application/x-ndjson), each input a string or {"text", "id"}.
+    # Response: JSON Lines, one result per input in completion order, then a {"done": ...} summary.
+    # The body is read in full before results stream (the server cannot read and stream at once), so
+    # inputs are capped per request; the bulk_ritual_builder CLI streams files of any size.
+    try:
+        content_type = request.headers.get("content-type", "")
+        if "ndjson" in content_type or "jsonl" in content_type:
+            inputs = []
+            async for item in iter_jsonl(request.stream()):
+                inputs.append(item)
+                if len(inputs) > Config.bulk_ritual_max_items:
+                    break
+        else:
+            body = await request.json()
+            inputs = body.get("inputs") if isinstance(body, dict) else None
+            if not isinstance(inputs, list):
+                raise ValueError("Body must be {\"inputs\": [...]} or JSON Lines")
+        if not inputs:
+            raise ValueError("At least one input is required")
+        if len(inputs) > Config.bulk_ritual_max_items:
+            raise ValueError(f"At most {Config.bulk_ritual_max_items} inputs per request")
+    except ValueError as e:
+        logger.error("Validation error in create_rituals_batch: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    logger.info("Received bulk ritual request: %s inputs", len(inputs), extra=HOT)
+    return StreamingResponse(
+        controller.build_rituals_bulk(inputs),
+        media_type="application/x-ndjson",
+        headers={"X-Accel-Buffering": "no"}
+    )
+        
+@router.get("/step/{session_id}", response_model= Dict[str, Any], response_class= RawJSONResponse)
 async def get_current_step(session_id: str):
-    logger.info(f"Received request for current step: session {session_id}")
+    logger.info("Received request for current step: session %s", session_id, extra=HOT)
     try:
         response = await controller.get_current_step(session_id)
-        return response
+        return RawJSONResponse(content=response)
     except HTTPException as e:
-        logger.error(f"HTTP error in get_current_step: {str(e)}")
+        logger.error("HTTP error in get_current_step: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in get_current_step: {str(e)}")
+        logger.error("Unexpected error in get_current_step: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to retrieve step: {str(e)}"
         )
         
-@router.post("/step/{session_id}/next", response_model= Dict[str, Any])
+@router.post("/step/{session_id}/next", response_model= Dict[str, Any], response_class= RawJSONResponse)
 async def next_step(session_id: str):
-    logger.info(f"Received request to advance step: session {session_id}")
+    logger.info("Received request to advance step: session %s", session_id, extra=HOT)
     try:
         response = await controller.next_step(session_id)
-        return response
+        return RawJSONResponse(content=response)
     except HTTPException as e:
-        logger.error(f"HTTP error in next_step: {str(e)}")
+        logger.error("HTTP error in next_step: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in next_step: {str(e)}")
+        logger.error("Unexpected error in next_step: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to advance step: {str(e)}"
@@ -61,24 +130,70 @@ async def next_step(session_id: str):
     
 @router.post('/feedback/{session_id}', response_model= FeedbackResponse)
 async def submit_feedback(session_id: str, feedback_request: FeedbackRequest):
-    logger.info(f"Received feedback request: session {session_id}, rating {feedback_request.rating}")
+    logger.info("Received feedback request: session %s, rating %s", session_id, feedback_request.rating, extra=HOT)
     try:
         if not 1 <= feedback_request.rating <= 5:
             raise ValueError("Rating must be between 1 and 5")
         response = await controller.submit_feedback(session_id, feedback_request.rating)
         return response
     except ValueError as e:
-        logger.error(f"Validation error in submit_feedback: {str(e)}")
+        logger.error("Validation error in submit_feedback: %s", e)
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail=str(e)
         )
     except HTTPException as e:
-        logger.error(f"HTTP error in submit_feedback: {str(e)}")
+        logger.error("HTTP error in submit_feedback: %s", e)
         raise
     except Exception as e:
-        logger.error(f"Unexpected error in submit_feedback: {str(e)}")
+        logger.error("Unexpected error in submit_feedback: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Failed to save feedback: {str(e)}"
-        )
\ No newline at end of file
+        )
+
+@router.post('/feedback', response_model= BulkFeedbackResponse)
+async def submit_feedback_bulk(request: BulkFeedbackRequest):
+    # Many {session_id, rating} pairs in one request; a repeated session keeps its last rating
+    logger.info("Received bulk feedback request: %s ratings", len(request.feedback), extra=HOT)
+    try:
+        if not request.feedback:
+            raise ValueError("At least one rating is required")
+        if len(request.feedback) > Config.feedback_bulk_max_items:
+            raise ValueError(f"At most {Config.feedback_bulk_max_items} ratings per request")
+        for item in request.feedback:
+            if not 1 <= item.rating <= 5:
+                raise ValueError(f"Rating must be between 1 and 5 (session {item.session_id})")
+        response = await controller.submit_feedback_bulk({item.session_id: item.rating for item in request.feedback})
+        return response
+    except ValueError as e:
+        logger.error("Validation error in submit_feedback_bulk: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    except HTTPException as e:
+        logger.error("HTTP error in submit_feedback_bulk: %s", e)
+        raise
+    except Exception as e:
+        logger.error("Unexpected error in submit_feedback_bulk: %s", e)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Failed to save feedback: {str(e)}"
+        )
+        
+@router.get('/stats', response_model= Dict[str, Any])
+async def get_stats():
+    # Runtime stats for tuning background workers
+    return {
+        "embedding": pinecone_service.embedding_engine.get_stats(),
+        "embedding_cache": pinecone_service.embedding_cache.get_stats(),
+        "session_writer": session_writer.get_stats(),
+        "ritual_pool": ritual_pool.get_stats(),
+        "state_classifier": state_classifier.get_stats(),
+        "ritual_reuse": ritual_reuse.get_stats(),
+        "session_mirror": pinecone_service.mirror.get_stats() if pinecone_service.mirror else None,
+        "ritual_cache": ritual_cache.get_stats(),
+        "llm": ai_service.get_stats() if ai_service.is_initialized else None,
+        "sessions": await ritual_guide.active_sessions.get_stats()
+    }
\ No newline at end of file
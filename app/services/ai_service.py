@@ -1,24 +1,43 @@
 import json
-from typing import Dict, Any, List
-
-import google.generativeai as genai
+import re
+import time
+from typing import Dict, Any, List, AsyncIterator, Optional, Tuple
 
 from config.setting import Config
-from config.logging import logger
-from prompts.prompts import ANALYSIS_PROMPT, GENERATION_PROMPT
+from config.logging import logger, HOT
+from prompts.prompts import ANALYSIS_PROMPT, GENERATION_PROMPT, FUSED_PROMPT, STATE_SCHEMA, RITUAL_SCHEMA, FUSED_SCHEMA
+from services.json_stream import JSONArrayStreamParser
+from services.lazy import LazyService
+from services.metrics import stage_latency, stage_errors, llm_parse_failures, llm_responses
+from services.llm_providers import LLMRouter, LLMProvider, create_providers
+from services.output_budget import OutputBudget
+
+PARSE_OUTCOMES= ("ok", "salvaged", "invalid")
 
 class AIMemoryService:
     
-    def __init__(self):
-        # Initialize Gemini AI client with configuration
-        genai.configure(api_key=Config.gemini_api_key)
-        self.gemini_client = genai.GenerativeModel('gemini-1.5-flash')
+    def __init__(self, providers: Optional[List[LLMProvider]] = None):
+        # Route calls across the configured LLM providers (Gemini, Groq) or the ones given
+        self.router = LLMRouter(
+            providers or create_providers(),
+            hedge=Config.llm_hedging,
+            hedge_delay_s=Config.llm_hedge_delay_ms / 1000
+        )
         self.state_prompt = ANALYSIS_PROMPT
         self.ritual_prompt = GENERATION_PROMPT
+        self.fused_prompt = FUSED_PROMPT
+        self.output_budget = OutputBudget(
+            initial_tokens=Config.llm_output_tokens,
+            max_tokens=Config.llm_max_output_tokens,
+            max_steps=RITUAL_SCHEMA["max_items"],
+            adaptive=Config.llm_adaptive_output_tokens
+        )
+        self.parse_counts: Dict[str, Dict[str, int]] = {}
 
     def parse_response(self, response: str) -> Any:
-        # Parse and clean JSON response from LLM
-        logger.debug(f"Raw LLM response: {response}")
+        # Parse and clean JSON response from LLM; None when it is not valid JSON. Failures are recorded
+        # by the callers once salvage has had its turn, so a salvaged response is not counted as one
+        logger.debug("Raw LLM response: %s", response, extra=HOT)
         try:
             # Clean response
             cleaned = response.strip().strip('`').strip()
@@ -27,38 +46,100 @@ class AIMemoryService:
             
             return json.loads(cleaned)
             
-        except json.JSONDecodeError:
-            logger.error(f"JSON decode error, raw response: {response}")
+        except (ValueError, TypeError):
             return None
-        except Exception as e:
-            logger.error(f"Parse error: {str(e)}")
+
+    def _record_parse(self, call: str, outcome: str, response: Optional[str] = None):
+        counts = self.parse_counts.setdefault(call, dict.fromkeys(PARSE_OUTCOMES, 0))
+        counts[outcome] += 1
+        llm_responses.inc(call=call, outcome=outcome)
+        if outcome == "invalid":
+            llm_parse_failures.inc()
+            logger.error("Unusable %s response, raw response: %s", call, response)
+
+    def parse_state(self, response: str) -> Optional[Dict[str, Any]]:
+        # Parsed state analysis, or None if the response lacks state and confidence
+        result = self.parse_response(response)
+        if result and isinstance(result, dict) and "state" in result and "confidence" in result:
+            self._record_parse("analyze_user_state", "ok")
+            return result
+        self._record_parse("analyze_user_state", "invalid", response)
+        return None
+
+    def parse_steps(self, response: str) -> Optional[List[Dict[str, str]]]:
+        # Ritual steps that have every required field; a truncated array keeps its complete steps
+        valid_steps = self._valid_steps(self.parse_response(response))
+        salvaged = False
+        if not valid_steps:
+            valid_steps = self._valid_steps(JSONArrayStreamParser().feed(response))
+            salvaged = bool(valid_steps)
+        return self._finish_steps("generate_ritual_step", response, valid_steps, salvaged)
+
+    def parse_fused(self, response: str) -> Optional[Dict[str, Any]]:
+        # Combined analysis + ritual, held to the same checks as the two separate responses
+        result = self.parse_response(response)
+        salvaged = False
+        if not (result and isinstance(result, dict)):
+            result = self._salvage_fused(response)
+            salvaged = result is not None
+        valid_steps = None
+        if result and "state" in result and "confidence" in result:
+            valid_steps = self._valid_steps(result.get("steps"))
+        if self._finish_steps("analyze_and_generate", response, valid_steps, salvaged) is None:
             return None
+        return {"state": result["state"], "confidence": result["confidence"], "steps": valid_steps}
+
+    def _salvage_fused(self, response: str) -> Optional[Dict[str, Any]]:
+        # State and confidence precede the steps, so a cut-off object still carries them
+        state = re.search(r'"state"\s*:\s*"((?:[^"\\]|\\.)*)"', response)
+        confidence = re.search(r'"confidence"\s*:\s*(-?[\d.]+)', response)
+        if not (state and confidence):
+            return None
+        try:
+            return {
+                "state": json.loads(f'"{state.group(1)}"'),
+                "confidence": float(confidence.group(1)),
+                "steps": JSONArrayStreamParser().feed(response[response.find('"steps"'):])
+            }
+        except ValueError:
+            return None
+
+    def _finish_steps(self, call: str, response: str, valid_steps: Optional[List[Dict[str, str]]], salvaged: bool) -> Optional[List[Dict[str, str]]]:
+        # Record the parse outcome and feed step lengths and truncations to the output budget
+        truncated = salvaged or not response.strip().rstrip('`').strip().endswith((']', '}'))
+        if valid_steps:
+            self._record_parse(call, "salvaged" if salvaged else "ok")
+            self.output_budget.observe(valid_steps, truncated=truncated)
+            if salvaged:
+                logger.warning("Salvaged %s complete ritual steps from a truncated %s response", len(valid_steps), call)
+            return valid_steps
+        self._record_parse(call, "invalid", response)
+        if truncated:
+            self.output_budget.observe([], truncated=True)
+        return None
+
+    def _valid_steps(self, result: Any) -> Optional[List[Dict[str, str]]]:
+        if result and isinstance(result, list):
+            valid_steps = [step for step in result if isinstance(step, dict) and all(key in step for key in ["title", "content", "step_type"])]
+            if valid_steps:
+                return valid_steps
+        return None
 
     async def analyze_user_state(self, user_input: str) -> Dict[str, Any]:
         # Analyze user input to determine emotional state
         prompt = self.state_prompt.format(user_input=user_input)
         
         try:
-            response = await self.gemini_client.generate_content_async(
-                contents=prompt,
-                generation_config={
-                    "temperature": 0.1,
-                    "max_output_tokens": 100,
-                    "response_mime_type": "application/json"
-                }
-            )
-            
-            result = self.parse_response(response.text)
-            
-            if result and isinstance(result, dict) and "state" in result and "confidence" in result:
-                logger.info(f"Detected State: {result['state']} (confidence: {result['confidence']})")
-                return result
-            
-            logger.error("Failed to analyze user state")
-            raise ValueError("Unable to determine user state")
+            with stage_latency.time(stage="llm.analyze_user_state"):
+                result = await self.router.complete(
+                    "analyze_user_state", prompt, self.parse_state,
+                    temperature=0.1, max_output_tokens=100, output="object", schema=STATE_SCHEMA
+                )
+            logger.info("Detected State: %s (confidence: %s)", result['state'], result['confidence'])
+            return result
             
         except Exception as e:
-            logger.error(f"Error analyzing user state: {str(e)}")
+            logger.error("Error analyzing user state: %s", e)
             raise ValueError(f"State analysis failed: {str(e)}")
 
     async def generate_ritual_step(self, user_state: str) -> List[Dict[str, str]]:
@@ -66,28 +147,94 @@ class AIMemoryService:
         prompt = self.ritual_prompt.format(user_state=user_state)
         
         try:
-            response = await self.gemini_client.generate_content_async(
-                contents=prompt,
-                generation_config={
-                    "temperature": 0.3,
-                    "max_output_tokens": 500,
-                    "response_mime_type": "application/json"
-                }
-            )
-            
-            result = self.parse_response(response.text)
-            
-            if result and isinstance(result, list):
-                valid_steps = [step for step in result if all(key in step for key in ["title", "content", "step_type"])]
-                if valid_steps:
-                    logger.info(f"Generated {len(valid_steps)} ritual steps for state: {user_state}")
-                    return valid_steps
-            
-            logger.error("Failed to generate ritual steps")
-            raise ValueError("Unable to generate ritual steps")
+            with stage_latency.time(stage="llm.generate_ritual_step"):
+                valid_steps = await self.router.complete(
+                    "generate_ritual_step", prompt, self.parse_steps,
+                    temperature=0.3, max_output_tokens=self.output_budget.tokens(), output="array", schema=RITUAL_SCHEMA
+                )
+            logger.info("Generated %s ritual steps for state: %s", len(valid_steps), user_state)
+            return valid_steps
             
         except Exception as e:
-            logger.error(f"Error generating ritual steps: {str(e)}")
+            logger.error("Error generating ritual steps: %s", e)
             raise ValueError(f"Ritual generation failed: {str(e)}")
 
-ai_service = AIMemoryService()
\ No newline at end of file
+    async def analyze_and_generate(self, user_input: str) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        # Determine the user state and generate its ritual in a single LLM call
+        prompt = self.fused_prompt.format(user_input=user_input)
+        
+        try:
+            with stage_latency.time(stage="llm.analyze_and_generate"):
+                result = await self.router.complete(
+                    "analyze_and_generate", prompt, self.parse_fused,
+                    temperature=0.2, max_output_tokens=self.output_budget.tokens(extra=100), output="object", schema=FUSED_SCHEMA
+                )
+            logger.info("Detected State: %s (confidence: %s) with %s ritual steps", result['state'], result['confidence'], len(result['steps']))
+            return {"state": result["state"], "confidence": result["confidence"]}, result["steps"]
+            
+        except Exception as e:
+            logger.error("Error in fused analysis and generation: %s", e)
+            raise ValueError(f"Fused analysis and generation failed: {str(e)}")
+
+    async def stream_ritual_steps(self, user_state: str) -> AsyncIterator[Dict[str, str]]:
+        # Stream ritual steps, yielding each step as soon as its JSON object closes
+        prompt = self.ritual_prompt.format(user_state=user_state)
+        parser = JSONArrayStreamParser()
+        emitted = []
+        
+        # Only the waits on the provider are timed; while a step is yielded the consumer's time is its own
+        provider_s = 0.0
+        try:
+            chunks = self.router.stream(
+                "stream_ritual_steps", prompt,
+                temperature=0.3, max_output_tokens=self.output_budget.tokens(), output="array", schema=RITUAL_SCHEMA
+            )
+            while True:
+                start = time.perf_counter()
+                try:
+                    text = await chunks.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    provider_s += time.perf_counter() - start
+                for step in parser.feed(text):
+                    if isinstance(step, dict) and all(key in step for key in ["title", "content", "step_type"]):
+                        emitted.append(step)
+                        yield step
+        except Exception as e:
+            stage_errors.inc(stage="llm.stream_ritual_steps")
+            logger.error("Error streaming ritual steps: %s", e)
+            raise ValueError(f"Ritual streaming failed: {str(e)}")
+        finally:
+            stage_latency.observe(provider_s, stage="llm.stream_ritual_steps")
+        
+        # Steps already streamed are kept even when the array was cut off mid-object
+        truncated = not parser.closed
+        self._record_parse("stream_ritual_steps", ("salvaged" if truncated else "ok") if emitted else "invalid")
+        self.output_budget.observe(emitted, truncated=truncated)
+        if not emitted:
+            logger.error("Streamed response contained no ritual steps")
+            raise ValueError("Unable to generate ritual steps")
+        logger.info("Streamed %s ritual steps for state: %s", len(emitted), user_state)
+
+    def get_parse_stats(self) -> Dict[str, Any]:
+        # strict_failure_rate: responses that were not complete valid JSON (the rate without salvage);
+        # failure_rate: responses that still yielded nothing usable
+        stats = {}
+        for call, counts in self.parse_counts.items():
+            total = sum(counts.values())
+            stats[call] = {
+                **counts,
+                "strict_failure_rate": round((counts["salvaged"] + counts["invalid"]) / total, 4),
+                "failure_rate": round(counts["invalid"] / total, 4)
+            }
+        return stats
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            **self.router.get_stats(),
+            "parse": self.get_parse_stats(),
+            "output_budget": self.output_budget.get_stats()
+        }
+
+ai_service = LazyService(AIMemoryService)
\ No newline at end of file
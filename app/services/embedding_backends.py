@@ -0,0 +1,124 @@
+import os
+from typing import List
+
+import numpy as np
+
+from config.setting import Config
+from config.logging import logger
+
+MODEL_NAME= "all-MiniLM-L6-v2"
+
+
+class SentenceTransformerBackend:
+    # PyTorch SentenceTransformer backend (reference implementation)
+    def __init__(self, model_name: str = MODEL_NAME, threads: int = 0):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        if threads > 0:
+            torch.set_num_threads(threads)
+        self.model= SentenceTransformer(model_name)
+        self.dim= self.model.get_sentence_embedding_dimension()
+        logger.info("Loaded SentenceTransformer embedding backend: %s", model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        return self.model.encode(texts, batch_size=len(texts))
+
+
+class OnnxEmbeddingBackend:
+    # int8-quantized ONNX export of the same model, run with onnxruntime on CPU
+    def __init__(self, model_dir: str, threads: int = 0, max_length: int = 256):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        options= ort.SessionOptions()
+        options.graph_optimization_level= ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.inter_op_num_threads= 1
+        if threads > 0:
+            options.intra_op_num_threads= threads
+        self.session= ort.InferenceSession(
+            os.path.join(model_dir, "model_int8.onnx"), options, providers=["CPUExecutionProvider"]
+        )
+        self.input_names= {model_input.name for model_input in self.session.get_inputs()}
+        self.dim= self.session.get_outputs()[0].shape[-1]
+
+        self.tokenizer= Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=max_length)
+        self.tokenizer.enable_padding()
+        logger.info("Loaded ONNX int8 embedding backend from %s", model_dir)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        # Tokenize, run the transformer, then mean-pool and L2-normalize like the SentenceTransformer pipeline
+        encodings= self.tokenizer.encode_batch(texts)
+        input_ids= np.asarray([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask= np.asarray([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds= {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.asarray([encoding.type_ids for encoding in encodings], dtype=np.int64)
+
+        token_embeddings= self.session.run(None, feeds)[0]
+        mask= attention_mask[..., None].astype(np.float32)
+        pooled= (token_embeddings * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        return pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+
+
+def create_embedding_backend(backend: str, onnx_path: str, threads: int = 0):
+    # Build the configured embedding backend
+    if backend == "torch":
+        return SentenceTransformerBackend(threads=threads)
+    if backend == "onnx":
+        if not os.path.exists(os.path.join(onnx_path, "model_int8.onnx")):
+            raise ValueError(f"No ONNX model at {onnx_path}; run 'python -m services.embedding_backends export --out {onnx_path}'")
+        return OnnxEmbeddingBackend(onnx_path, threads=threads)
+    raise ValueError(f"Unknown embedding backend: {backend}")
+
+
+def export_onnx(out_dir: str, model_name: str = MODEL_NAME):
+    # Export the transformer to ONNX, quantize weights to int8 and save the tokenizer
+    import torch
+    from onnxruntime.quantization import quantize_dynamic, QuantType
+    from sentence_transformers import SentenceTransformer
+
+    os.makedirs(out_dir, exist_ok=True)
+    model= SentenceTransformer(model_name)
+    transformer= model[0].auto_model.eval()
+    tokenizer= model.tokenizer
+    tokenizer.save_pretrained(out_dir)
+
+    class TokenEmbeddings(torch.nn.Module):
+        def __init__(self, encoder):
+            super().__init__()
+            self.encoder= encoder
+
+        def forward(self, input_ids, attention_mask, token_type_ids):
+            return self.encoder(input_ids=input_ids, attention_mask=attention_mask, token_type_ids=token_type_ids)[0]
+
+    dummy= tokenizer(["export the embedding model"], return_tensors="pt")
+    fp32_path= os.path.join(out_dir, "model.onnx")
+    dynamic_axes= {name: {0: "batch", 1: "sequence"} for name in ["input_ids", "attention_mask", "token_type_ids", "token_embeddings"]}
+    with torch.no_grad():
+        torch.onnx.export(
+            TokenEmbeddings(transformer),
+            (dummy["input_ids"], dummy["attention_mask"], dummy["token_type_ids"]),
+            fp32_path,
+            input_names=["input_ids", "attention_mask", "token_type_ids"],
+            output_names=["token_embeddings"],
+            dynamic_axes=dynamic_axes,
+            opset_version=14
+        )
+    quantize_dynamic(fp32_path, os.path.join(out_dir, "model_int8.onnx"), weight_type=QuantType.QInt8)
+    logger.info("Exported int8 ONNX model to %s", out_dir)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Embedding backend utilities")
+    subparsers= parser.add_subparsers(dest="command", required=True)
+    export_parser= subparsers.add_parser("export", help="Export an int8-quantized ONNX model")
+    export_parser.add_argument("--out", default=Config.embedding_onnx_path)
+    export_parser.add_argument("--model", default=MODEL_NAME)
+    args= parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.out, args.model)
+        print(f"Exported {args.model} to {args.out}")
@@ -0,0 +1,126 @@
+import os
+import hashlib
+from collections import OrderedDict
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from config.logging import logger
+
+
+def embedding_key(text: str) -> str:
+    # Content hash of whitespace-normalized text
+    normalized= " ".join(text.split())
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class DiskEmbeddingStore:
+    # Append-only memory-mapped float32 vectors with a key log that survives restarts
+    def __init__(self, path: str, dim: int, initial_rows: int = 1024):
+        os.makedirs(path, exist_ok=True)
+        self.dim= dim
+        self.vectors_path= os.path.join(path, "vectors.f32")
+        self.keys_path= os.path.join(path, "keys.log")
+        self.rows: Dict[str, int] = {}
+
+        if os.path.exists(self.keys_path):
+            with open(self.keys_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    parts= line.split()
+                    if len(parts) == 2:
+                        self.rows[parts[0]] = int(parts[1])
+
+        existing= os.path.getsize(self.vectors_path) // (4 * dim) if os.path.exists(self.vectors_path) else 0
+        # Ignore keys pointing past the end of a truncated vectors file
+        self.rows= {key: row for key, row in self.rows.items() if row < existing}
+        self.count= max(self.rows.values(), default=-1) + 1
+        self.capacity= max(existing, initial_rows)
+        self.vectors= self._open(self.capacity)
+        self.keys_file= open(self.keys_path, "a", encoding="utf-8")
+        logger.info("Disk embedding store opened at %s with %s vectors", path, len(self.rows))
+
+    def _open(self, rows: int) -> np.memmap:
+        mode= "r+" if os.path.exists(self.vectors_path) else "w+"
+        if mode == "r+" and os.path.getsize(self.vectors_path) < rows * 4 * self.dim:
+            with open(self.vectors_path, "r+b") as f:
+                f.truncate(rows * 4 * self.dim)
+        return np.memmap(self.vectors_path, dtype=np.float32, mode=mode, shape=(rows, self.dim))
+
+    def get(self, key: str) -> Optional[List[float]]:
+        row= self.rows.get(key)
+        if row is None:
+            return None
+        return self.vectors[row].tolist()
+
+    def put(self, key: str, vector: List[float]):
+        if key in self.rows or len(vector) != self.dim:
+            return
+        if self.count >= self.capacity:
+            self.vectors.flush()
+            self.capacity *= 2
+            self.vectors= self._open(self.capacity)
+        self.vectors[self.count] = vector
+        self.rows[key] = self.count
+        self.keys_file.write(f"{key} {self.count}\n")
+        self.keys_file.flush()
+        self.count += 1
+
+    def close(self):
+        self.vectors.flush()
+        self.keys_file.close()
+
+
+class EmbeddingCache:
+    # Bounded in-memory LRU with an optional on-disk tier, keyed by content hash
+    def __init__(self, max_size: int = 4096, disk_store: Optional[DiskEmbeddingStore] = None):
+        self.max_size= max_size
+        self.memory: "OrderedDict[str, List[float]]" = OrderedDict()
+        self.disk= disk_store
+        self.memory_hits= 0
+        self.disk_hits= 0
+        self.misses= 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key= embedding_key(text)
+        vector= self.memory.get(key)
+        if vector is not None:
+            self.memory.move_to_end(key)
+            self.memory_hits += 1
+            return vector
+        if self.disk:
+            vector= self.disk.get(key)
+            if vector is not None:
+                self.disk_hits += 1
+                self._remember(key, vector)
+                return vector
+        self.misses += 1
+        return None
+
+    def put(self, text: str, vector: List[float]):
+        if not vector:
+            return
+        key= embedding_key(text)
+        self._remember(key, vector)
+        if self.disk:
+            self.disk.put(key, vector)
+
+    def _remember(self, key: str, vector: List[float]):
+        self.memory[key] = vector
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_size:
+            self.memory.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups= self.memory_hits + self.disk_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0,
+            "memory_entries": len(self.memory),
+            "disk_entries": len(self.disk.rows) if self.disk else 0
+        }
+
+    def close(self):
+        if self.disk:
+            self.disk.close()
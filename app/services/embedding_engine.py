@@ -0,0 +1,100 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
+
+from config.logging import logger
+
+
+class EmbeddingEngine:
+    # Gather concurrent encode requests into batched calls on a worker thread
+    def __init__(self, model, max_batch_size: int = 32, max_wait_ms: float = 5.0):
+        self.model= model
+        self.max_batch_size= max_batch_size
+        self.max_wait= max_wait_ms / 1000
+        self.executor= ThreadPoolExecutor(max_workers=1, thread_name_prefix="embedding")
+
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests= 0
+        self.batches= 0
+        self.batched_items= 0
+        self.max_batch_seen= 0
+        self.max_queue_depth= 0
+        logger.info("Embedding engine initialized (max_batch_size=%s, max_wait_ms=%s)", max_batch_size, max_wait_ms)
+
+    async def encode(self, text: str) -> List[float]:
+        # Queue a single text and wait for its vector from the next batch
+        self._ensure_worker()
+        future= self.loop.create_future()
+        self.queue.put_nowait((text, future))
+        self.requests += 1
+        self.max_queue_depth= max(self.max_queue_depth, self.queue.qsize())
+        return await future
+
+    def _ensure_worker(self):
+        # Start the batching task lazily on the running loop
+        loop= asyncio.get_running_loop()
+        if self.worker is None or self.worker.done() or self.loop is not loop:
+            self.loop= loop
+            self.queue= asyncio.Queue()
+            self.worker= loop.create_task(self._run())
+
+    async def _collect_batch(self) -> List[Tuple[str, asyncio.Future]]:
+        # Wait for the first request, then fill the batch until size or time limit
+        batch= [await self.queue.get()]
+        deadline= self.loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            if not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+                continue
+            timeout= deadline - self.loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        # Worker loop: encode each collected batch off the event loop
+        while True:
+            batch= await self._collect_batch()
+            texts= [text for text, _ in batch]
+            self.batches += 1
+            self.batched_items += len(batch)
+            self.max_batch_seen= max(self.max_batch_seen, len(batch))
+            try:
+                vectors= await self.loop.run_in_executor(self.executor, self._encode_batch, texts)
+                for (_, future), vector in zip(batch, vectors):
+                    if not future.done():
+                        future.set_result(vector)
+            except Exception as e:
+                logger.error("Error encoding batch of %s: %s", len(batch), e)
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _encode_batch(self, texts: List[str]) -> List[List[float]]:
+        return self.model.encode(texts).tolist()
+
+    def get_stats(self) -> Dict[str, Any]:
+        # Queue depth and batch-size stats for tuning
+        return {
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "max_queue_depth": self.max_queue_depth,
+            "requests": self.requests,
+            "batches": self.batches,
+            "avg_batch_size": round(self.batched_items / self.batches, 2) if self.batches else 0,
+            "max_batch_size_seen": self.max_batch_seen,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000
+        }
+
+    async def close(self):
+        # Stop the worker task and release the encode thread
+        if self.worker and not self.worker.done():
+            self.worker.cancel()
+        self.executor.shutdown(wait=False)
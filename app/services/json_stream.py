@@ -0,0 +1,54 @@
+import json
+from typing import List, Any
+
+
+class JSONArrayStreamParser:
+    # Incrementally parse a JSON array of objects, emitting each object once it closes
+    def __init__(self):
+        self.started= False
+        self.closed= False
+        self.depth= 0
+        self.in_string= False
+        self.escape= False
+        self.current: List[str] = []
+
+    def feed(self, text: str) -> List[Any]:
+        # Consume a chunk of text and return the objects completed by it
+        objects= []
+        for char in text:
+            if not self.started:
+                # Skip any preamble such as a ```json fence until the array opens
+                if char == '[':
+                    self.started= True
+                continue
+            if self.depth == 0:
+                if char == '{':
+                    self.depth= 1
+                    self.current= [char]
+                elif char == ']':
+                    self.closed= True
+                continue
+
+            self.current.append(char)
+            if self.in_string:
+                if self.escape:
+                    self.escape= False
+                elif char == '\\':
+                    self.escape= True
+                elif char == '"':
+                    self.in_string= False
+                continue
+
+            if char == '"':
+                self.in_string= True
+            elif char in '{[':
+                self.depth += 1
+            elif char in '}]':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        objects.append(json.loads(''.join(self.current)))
+                    except json.JSONDecodeError:
+                        pass
+                    self.current= []
+        return objects
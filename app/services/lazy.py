@@ -0,0 +1,32 @@
+import threading
+from typing import Any, Callable
+
+
+class LazyService:
+    # Module-level service handle that builds the real service on first use
+    def __init__(self, factory: Callable[[], Any]):
+        object.__setattr__(self, "_factory", factory)
+        object.__setattr__(self, "_instance", None)
+        object.__setattr__(self, "_lock", threading.Lock())
+
+    def get(self) -> Any:
+        # Build the service once, even if first used from several threads
+        if self._instance is None:
+            with self._lock:
+                if self._instance is None:
+                    object.__setattr__(self, "_instance", self._factory())
+        return self._instance
+
+    def override(self, instance: Any):
+        # Replace the service, e.g. with a fake for offline benchmarks
+        object.__setattr__(self, "_instance", instance)
+
+    @property
+    def is_initialized(self) -> bool:
+        return self._instance is not None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.get(), name)
+
+    def __setattr__(self, name: str, value: Any):
+        setattr(self.get(), name, value)
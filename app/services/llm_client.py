@@ -0,0 +1,298 @@
+import asyncio
+import random
+import re
+import time
+from contextlib import asynccontextmanager
+from typing import Dict, Any, Awaitable, Callable, Optional, AsyncIterator
+
+from services.metrics import retries, registry
+from config.setting import Config
+from config.logging import logger
+
+# HTTP statuses that mean the provider is overloaded or briefly unavailable
+RETRYABLE_STATUS= {408, 429, 500, 502, 503, 504}
+OVERLOAD_STATUS= {429, 503}
+
+llm_concurrency_limit= registry.gauge("focusforge_llm_concurrency_limit", "Current adaptive LLM concurrency limit, by provider")
+llm_in_flight= registry.gauge("focusforge_llm_in_flight", "LLM calls currently holding a concurrency slot, by provider")
+
+
+def status_code(error: Exception) -> Optional[int]:
+    # google.api_core exceptions carry the HTTP status as .code; other clients use status_code
+    for attribute in ("code", "status_code"):
+        value= getattr(error, attribute, None)
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def retry_after_s(error: Exception) -> Optional[float]:
+    # Server-suggested delay from a Retry-After header, a RetryInfo detail or the error text
+    response= getattr(error, "response", None)
+    headers= getattr(response, "headers", None)
+    if headers:
+        value= headers.get("retry-after") or headers.get("Retry-After")
+        try:
+            return float(value) if value is not None else None
+        except ValueError:
+            pass
+    for detail in getattr(error, "details", None) or []:
+        delay= getattr(detail, "retry_delay", None)
+        if delay is not None:
+            return getattr(delay, "seconds", 0) + getattr(delay, "nanos", 0) / 1e9
+    match= re.search(r"retry[_ ]delay\s*\{\s*seconds:\s*(\d+)", str(error)) or re.search(r"retry in ([\d.]+)\s*s", str(error), re.I)
+    return float(match.group(1)) if match else None
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, asyncio.TimeoutError):
+        return True
+    code= status_code(error)
+    return code in RETRYABLE_STATUS if code is not None else False
+
+
+class AIMDLimiter:
+    # Additive-increase / multiplicative-decrease cap on concurrent calls
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 decrease_factor: float = 0.5, cooldown_s: float = 1.0, name: str = "gemini"):
+        self.name= name
+        self.limit= float(initial)
+        self.min_limit= min_limit
+        self.max_limit= max_limit
+        self.decrease_factor= decrease_factor
+        self.cooldown= cooldown_s
+        self.in_flight= 0
+        self.condition= asyncio.Condition()
+        self.last_decrease= 0.0
+
+        self.max_in_flight= 0
+        self.waiting= 0
+        self.increases= 0
+        self.decreases= 0
+
+    async def acquire(self):
+        async with self.condition:
+            self.waiting += 1
+            try:
+                await self.condition.wait_for(lambda: self.in_flight < int(self.limit))
+            finally:
+                self.waiting -= 1
+            self.in_flight += 1
+            self.max_in_flight= max(self.max_in_flight, self.in_flight)
+        llm_in_flight.set(self.in_flight, provider=self.name)
+
+    async def release(self, success: bool = False, overloaded: bool = False):
+        async with self.condition:
+            # Whether this call ran with every slot taken, i.e. the limit was actually binding
+            saturated= self.in_flight >= int(self.limit)
+            self.in_flight -= 1
+            if overloaded:
+                now= time.monotonic()
+                # One decrease per cooldown, so a burst of failures from the same overload halves once
+                if now - self.last_decrease >= self.cooldown:
+                    self.limit= max(self.min_limit, self.limit * self.decrease_factor)
+                    self.last_decrease= now
+                    self.decreases += 1
+                    logger.warning("LLM concurrency limit decreased to %s", int(self.limit))
+            elif success and saturated and self.limit < self.max_limit:
+                # Roughly +1 per limit's worth of successful calls at the limit; other errors and
+                # calls made with spare slots say nothing about whether more concurrency would help
+                self.limit= min(self.max_limit, self.limit + 1 / self.limit)
+                self.increases += 1
+            self.condition.notify_all()
+        llm_in_flight.set(self.in_flight, provider=self.name)
+        llm_concurrency_limit.set(int(self.limit), provider=self.name)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": int(self.limit),
+            "min_limit": self.min_limit,
+            "max_limit": self.max_limit,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_in_flight": self.max_in_flight,
+            "increases": self.increases,
+            "decreases": self.decreases
+        }
+
+
+class TokenBucket:
+    # Request-rate limit: refills at rate per second up to burst tokens
+    def __init__(self, rate_per_s: float, burst: int):
+        self.rate= rate_per_s
+        self.burst= burst
+        self.tokens= float(burst)
+        self.updated= time.monotonic()
+        self.lock= asyncio.Lock()
+        self.waits= 0
+        self.wait_s= 0.0
+
+    def _refill(self):
+        now= time.monotonic()
+        self.tokens= min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated= now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # The lock makes waiters take tokens in arrival order
+        async with self.lock:
+            self._refill()
+            if self.tokens < 1:
+                delay= (1 - self.tokens) / self.rate
+                self.waits += 1
+                self.wait_s += delay
+                await asyncio.sleep(delay)
+                self._refill()
+            self.tokens -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        if self.rate > 0:
+            self._refill()
+        return {
+            "rate_per_s": self.rate,
+            "burst": self.burst,
+            "tokens": round(self.tokens, 2),
+            "waits": self.waits,
+            "wait_s": round(self.wait_s, 3)
+        }
+
+
+class LLMClient:
+    # Wraps provider calls with rate limiting, adaptive concurrency, deadlines and retries
+    def __init__(self, limiter: AIMDLimiter, bucket: TokenBucket, timeout_s: float = 30.0, deadline_s: float = 60.0,
+                 max_retries: int = 3, backoff_s: float = 0.5, max_backoff_s: float = 8.0):
+        self.limiter= limiter
+        self.bucket= bucket
+        self.timeout= timeout_s
+        self.deadline= deadline_s
+        self.max_retries= max_retries
+        self.backoff= backoff_s
+        self.max_backoff= max_backoff_s
+
+        self.calls= 0
+        self.failures= 0
+        self.retries= 0
+        self.timeouts= 0
+        self.throttled= 0
+
+    @asynccontextmanager
+    async def _slot(self, deadline: float):
+        # Rate token plus concurrency slot; waiting for them counts against the call's deadline
+        loop= asyncio.get_running_loop()
+        await asyncio.wait_for(self.bucket.acquire(), max(0.0, deadline - loop.time()))
+        await asyncio.wait_for(self.limiter.acquire(), max(0.0, deadline - loop.time()))
+        outcome= {"success": False, "overloaded": False}
+        try:
+            yield outcome
+        finally:
+            await self.limiter.release(outcome["success"], outcome["overloaded"])
+
+    def _record_error(self, error: Exception, outcome: Dict[str, bool]):
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+            outcome["overloaded"] = True
+        elif status_code(error) in OVERLOAD_STATUS:
+            self.throttled += 1
+            outcome["overloaded"] = True
+
+    async def _backoff(self, name: str, attempt: int, error: Exception, deadline: float) -> bool:
+        # Sleep before the next attempt; False when retries or the deadline are exhausted
+        if attempt >= self.max_retries or not is_retryable(error):
+            return False
+        delay= min(self.max_backoff, self.backoff * (2 ** attempt)) * random.uniform(0.5, 1.5)
+        suggested= retry_after_s(error)
+        if suggested is not None:
+            delay= max(delay, suggested)
+        loop= asyncio.get_running_loop()
+        if loop.time() + delay >= deadline:
+            return False
+        self.retries += 1
+        retries.inc(component="llm")
+        logger.warning("LLM call %s failed (%s), retrying in %.2fs (attempt %s)", name, error, delay, attempt + 1)
+        await asyncio.sleep(delay)
+        return True
+
+    async def call(self, name: str, request: Callable[[], Awaitable[Any]]) -> Any:
+        # Run request() with retries; request must start a fresh provider call each time it is invoked
+        loop= asyncio.get_running_loop()
+        deadline= loop.time() + self.deadline
+        self.calls += 1
+        attempt= 0
+        while True:
+            try:
+                async with self._slot(deadline) as outcome:
+                    try:
+                        timeout= min(self.timeout, max(0.0, deadline - loop.time()))
+                        result= await asyncio.wait_for(request(), timeout)
+                        outcome["success"] = True
+                        return result
+                    except Exception as e:
+                        self._record_error(e, outcome)
+                        raise
+            except Exception as e:
+                if not await self._backoff(name, attempt, e, deadline):
+                    self.failures += 1
+                    raise
+                attempt += 1
+
+    async def stream(self, name: str, request: Callable[[], Awaitable[Any]]) -> AsyncIterator[Any]:
+        # Like call() for streaming responses; the slot is held until the stream ends and
+        # only failures before the first chunk are retried
+        loop= asyncio.get_running_loop()
+        deadline= loop.time() + self.deadline
+        self.calls += 1
+        attempt= 0
+        while True:
+            started= False
+            try:
+                async with self._slot(deadline) as outcome:
+                    try:
+                        response= await asyncio.wait_for(request(), min(self.timeout, max(0.0, deadline - loop.time())))
+                        iterator= response.__aiter__()
+                        while True:
+                            try:
+                                chunk= await asyncio.wait_for(iterator.__anext__(), min(self.timeout, max(0.0, deadline - loop.time())))
+                            except StopAsyncIteration:
+                                break
+                            started= True
+                            yield chunk
+                        outcome["success"] = True
+                        return
+                    except Exception as e:
+                        self._record_error(e, outcome)
+                        raise
+            except Exception as e:
+                if started or not await self._backoff(name, attempt, e, deadline):
+                    self.failures += 1
+                    raise
+                attempt += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "failures": self.failures,
+            "retries": self.retries,
+            "timeouts": self.timeouts,
+            "throttled": self.throttled,
+            "limiter": self.limiter.get_stats(),
+            "rate_limit": self.bucket.get_stats()
+        }
+
+
+def build_llm_client(provider: str) -> LLMClient:
+    # Each provider gets its own limiter and bucket, since rate limits are per provider
+    return LLMClient(
+        AIMDLimiter(
+            initial= Config.llm_initial_concurrency,
+            min_limit= Config.llm_min_concurrency,
+            max_limit= Config.llm_max_concurrency,
+            name= provider
+        ),
+        TokenBucket(Config.llm_rate_per_s, Config.llm_burst),
+        timeout_s= Config.llm_timeout_s,
+        deadline_s= Config.llm_deadline_s,
+        max_retries= Config.llm_max_retries,
+        backoff_s= Config.llm_backoff_s,
+        max_backoff_s= Config.llm_max_backoff_s
+    )
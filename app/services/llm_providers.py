@@ -0,0 +1,339 @@
+import asyncio
+import random
+import time
+from collections import deque
+from typing import List, Dict, Any, Optional, Callable, AsyncIterator
+
+from services.llm_client import LLMClient, build_llm_client
+from services.metrics import registry, llm_tokens
+from config.setting import Config
+from config.logging import logger
+
+provider_latency= registry.histogram(
+    "focusforge_llm_provider_duration_seconds", "Latency of completed LLM calls, by provider and call")
+router_hedges= registry.counter(
+    "focusforge_llm_hedges_total", "Hedged LLM requests fired, by call and whether the hedge won")
+
+
+class InvalidResponse(Exception):
+    # The provider answered, but not with the JSON the caller expected
+    pass
+
+
+class LLMProvider:
+    # Text-in, text-out completion against one provider; output is "object" or "array" JSON,
+    # optionally constrained by a response schema where the provider supports one
+    name= "base"
+
+    async def generate(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                       schema: Optional[Dict[str, Any]] = None) -> str:
+        raise NotImplementedError
+
+    def stream(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+               schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        raise NotImplementedError
+
+    def record_usage(self, call: str, prompt_tokens: Optional[int], completion_tokens: Optional[int]):
+        llm_tokens.inc(prompt_tokens or 0, call=call, kind="prompt", provider=self.name)
+        llm_tokens.inc(completion_tokens or 0, call=call, kind="completion", provider=self.name)
+
+
+class GeminiProvider(LLMProvider):
+    name= "gemini"
+
+    def __init__(self, api_key: str, model: str = "gemini-1.5-flash", client: Optional[LLMClient] = None):
+        import google.generativeai as genai
+        genai.configure(api_key=api_key)
+        self.model= genai.GenerativeModel(model)
+        self.client= client or build_llm_client(self.name)
+
+    def _config(self, temperature: float, max_output_tokens: int, schema: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        config= {
+            "temperature": temperature,
+            "max_output_tokens": max_output_tokens,
+            "response_mime_type": "application/json"
+        }
+        if schema is not None:
+            config["response_schema"] = schema
+        return config
+
+    def _record(self, call: str, response: Any):
+        usage= getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.record_usage(call, getattr(usage, "prompt_token_count", 0), getattr(usage, "candidates_token_count", 0))
+
+    async def generate(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                       schema: Optional[Dict[str, Any]] = None) -> str:
+        response= await self.client.call(call, lambda: self.model.generate_content_async(
+            contents=prompt,
+            generation_config=self._config(temperature, max_output_tokens, schema)
+        ))
+        self._record(call, response)
+        return response.text
+
+    async def stream(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                     schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        chunk= None
+        async for chunk in self.client.stream(call, lambda: self.model.generate_content_async(
+            contents=prompt,
+            generation_config=self._config(temperature, max_output_tokens, schema),
+            stream=True
+        )):
+            yield chunk.text
+        # Usage is reported on the final chunk
+        self._record(call, chunk)
+
+
+class GroqProvider(LLMProvider):
+    name= "groq"
+
+    def __init__(self, api_key: str, model: str = "llama-3.1-8b-instant", client: Optional[LLMClient] = None):
+        from groq import AsyncGroq
+        # Retries, timeouts and rate limits are handled by LLMClient
+        self.groq= AsyncGroq(api_key=api_key, max_retries=0)
+        self.model= model
+        self.client= client or build_llm_client(self.name)
+
+    def _request(self, prompt: str, temperature: float, max_output_tokens: int, output: str, stream: bool = False):
+        kwargs= {}
+        if output == "object":
+            # Groq's JSON mode only accepts a top-level object, so arrays rely on the prompt;
+            # schemas are not passed since structured outputs are limited to a few Groq models
+            kwargs["response_format"] = {"type": "json_object"}
+        return self.groq.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=temperature,
+            max_tokens=max_output_tokens,
+            stream=stream,
+            **kwargs
+        )
+
+    async def generate(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                       schema: Optional[Dict[str, Any]] = None) -> str:
+        response= await self.client.call(call, lambda: self._request(prompt, temperature, max_output_tokens, output))
+        usage= getattr(response, "usage", None)
+        if usage is not None:
+            self.record_usage(call, usage.prompt_tokens, usage.completion_tokens)
+        return response.choices[0].message.content or ""
+
+    async def stream(self, call: str, prompt: str, temperature: float, max_output_tokens: int, output: str,
+                     schema: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        async for chunk in self.client.stream(call, lambda: self._request(prompt, temperature, max_output_tokens, output, stream=True)):
+            if chunk.choices and chunk.choices[0].delta.content:
+                yield chunk.choices[0].delta.content
+
+
+class ProviderStats:
+    # EWMA latency and error rate plus a recent-latency window for the hedging budget
+    def __init__(self, alpha: float = 0.2, window: int = 200):
+        self.alpha= alpha
+        self.latencies: deque = deque(maxlen=window)
+        self.ewma_latency_s: Optional[float] = None
+        self.ewma_error= 0.0
+        self.requests= 0
+        self.errors= 0
+        self.invalid= 0
+
+    def record(self, elapsed_s: float, error: bool = False, invalid: bool = False):
+        self.requests += 1
+        self.errors += error
+        self.invalid += invalid
+        failed= error or invalid
+        self.ewma_error= self.alpha * failed + (1 - self.alpha) * self.ewma_error
+        if not error:
+            self.latencies.append(elapsed_s)
+            self.ewma_latency_s= elapsed_s if self.ewma_latency_s is None else self.alpha * elapsed_s + (1 - self.alpha) * self.ewma_latency_s
+
+    def p90_s(self, min_samples: int) -> Optional[float]:
+        if len(self.latencies) < min_samples:
+            return None
+        ordered= sorted(self.latencies)
+        return ordered[int(len(ordered) * 0.9)]
+
+    def score(self, error_penalty: float) -> Optional[float]:
+        # Expected cost of a call: latency inflated by the recent failure rate
+        if self.ewma_latency_s is None:
+            return None
+        return self.ewma_latency_s * (1 + error_penalty * self.ewma_error)
+
+    def get_stats(self, min_samples: int) -> Dict[str, Any]:
+        p90= self.p90_s(min_samples)
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "invalid": self.invalid,
+            "ewma_latency_ms": round(self.ewma_latency_s * 1000, 1) if self.ewma_latency_s is not None else None,
+            "ewma_error_rate": round(self.ewma_error, 4),
+            "p90_ms": round(p90 * 1000, 1) if p90 is not None else None
+        }
+
+
+class LLMRouter:
+    # Ranks providers by observed latency and errors, fails over, and optionally hedges slow calls
+    def __init__(self, providers: List[LLMProvider], hedge: bool = False, hedge_delay_s: float = 1.5,
+                 min_samples: int = 20, error_penalty: float = 4.0, explore_rate: float = 0.05):
+        if not providers:
+            raise ValueError("At least one LLM provider must be configured")
+        self.providers= providers
+        self.hedge= hedge
+        self.hedge_delay= hedge_delay_s
+        self.min_samples= min_samples
+        self.error_penalty= error_penalty
+        self.explore_rate= explore_rate
+        self.stats: Dict[str, ProviderStats] = {provider.name: ProviderStats() for provider in providers}
+        self.hedges= 0
+        self.hedge_wins= 0
+        self.failovers= 0
+
+    def rank(self, explore: bool = True) -> List[LLMProvider]:
+        # Configured order until every provider has a score, then cheapest first
+        ranked= list(self.providers)
+        scores= [self.stats[provider.name].score(self.error_penalty) for provider in ranked]
+        if all(score is not None for score in scores):
+            ranked= [provider for _, provider in sorted(zip(scores, ranked), key=lambda pair: pair[0])]
+        if explore and len(ranked) > 1 and random.random() < self.explore_rate:
+            # Occasionally lead with another provider so its stats stay current
+            ranked.insert(0, ranked.pop(random.randrange(1, len(ranked))))
+        return ranked
+
+    async def _attempt(self, provider: LLMProvider, call: str, prompt: str, parse: Callable[[str], Any], params: Dict[str, Any]) -> Any:
+        stats= self.stats[provider.name]
+        start= time.perf_counter()
+        try:
+            text= await provider.generate(call, prompt, **params)
+        except Exception:
+            stats.record(time.perf_counter() - start, error=True)
+            raise
+        elapsed= time.perf_counter() - start
+        result= parse(text)
+        stats.record(elapsed, invalid=result is None)
+        provider_latency.observe(elapsed, provider=provider.name, call=call)
+        if result is None:
+            raise InvalidResponse(f"{provider.name} returned an invalid response for {call}")
+        return result
+
+    async def complete(self, call: str, prompt: str, parse: Callable[[str], Any], **params) -> Any:
+        # Return parse(text) from the first provider that answers with a valid response
+        ranked= self.rank()
+        if self.hedge and len(ranked) > 1:
+            return await self._hedged(ranked, call, prompt, parse, params)
+        last_error: Optional[Exception] = None
+        for provider in ranked:
+            try:
+                return await self._attempt(provider, call, prompt, parse, params)
+            except Exception as e:
+                last_error= e
+                self.failovers += 1
+                logger.warning("LLM provider %s failed for %s: %s", provider.name, call, e)
+        raise ValueError(f"All LLM providers failed for {call}: {last_error}")
+
+    async def _hedged(self, ranked: List[LLMProvider], call: str, prompt: str, parse: Callable[[str], Any], params: Dict[str, Any]) -> Any:
+        # Start the best provider; if it has not answered within its p90, race the next one as well
+        remaining= list(ranked)
+        budget= self.stats[remaining[0].name].p90_s(self.min_samples) or self.hedge_delay
+        pending: Dict[asyncio.Future, LLMProvider] = {}
+        hedge_task: Optional[asyncio.Future] = None
+        last_error: Optional[Exception] = None
+
+        def launch(provider: LLMProvider) -> asyncio.Future:
+            task= asyncio.ensure_future(self._attempt(provider, call, prompt, parse, params))
+            pending[task] = provider
+            return task
+
+        launch(remaining.pop(0))
+        try:
+            timeout= budget
+            while pending or remaining:
+                if not pending:
+                    # Every started provider failed; move to the next one without waiting for a budget
+                    self.failovers += 1
+                    launch(remaining.pop(0))
+                    timeout= None
+                done, _ = await asyncio.wait(pending.keys(), timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # Primary is past its p90: fire the hedge and wait for whichever is first
+                    if remaining:
+                        self.hedges += 1
+                        hedge_task= launch(remaining.pop(0))
+                    timeout= None
+                    continue
+                for task in done:
+                    provider= pending.pop(task)
+                    if task.exception() is None:
+                        won= task is hedge_task
+                        self.hedge_wins += won
+                        if hedge_task is not None:
+                            router_hedges.inc(call=call, won=str(won).lower())
+                        return task.result()
+                    last_error= task.exception()
+                    logger.warning("LLM provider %s failed for %s: %s", provider.name, call, last_error)
+            raise ValueError(f"All LLM providers failed for {call}: {last_error}")
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def stream(self, call: str, prompt: str, **params) -> AsyncIterator[str]:
+        # Streaming is not hedged. Providers are tried in rank order until one yields a first chunk, whose
+        # latency is what the stream records; once chunks have gone out, a failure is the caller's to handle
+        last_error: Optional[Exception] = None
+        for provider in self.rank():
+            stats= self.stats[provider.name]
+            chunks= provider.stream(call, prompt, **params)
+            start= time.perf_counter()
+            try:
+                first= await chunks.__anext__()
+            except StopAsyncIteration:
+                stats.record(time.perf_counter() - start, invalid=True)
+                last_error= InvalidResponse(f"{provider.name} returned an empty stream for {call}")
+            except Exception as e:
+                stats.record(time.perf_counter() - start, error=True)
+                last_error= e
+            else:
+                first_chunk_s= time.perf_counter() - start
+                failed= False
+                try:
+                    yield first
+                    async for chunk in chunks:
+                        yield chunk
+                except Exception:
+                    failed= True
+                    raise
+                finally:
+                    stats.record(first_chunk_s, error=failed)
+                    await chunks.aclose()
+                return
+            self.failovers += 1
+            logger.warning("LLM provider %s failed to stream %s: %s", provider.name, call, last_error)
+        raise ValueError(f"All LLM providers failed for {call}: {last_error}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "hedging": self.hedge,
+            "order": [provider.name for provider in self.rank(explore=False)],
+            "hedges": self.hedges,
+            "hedge_wins": self.hedge_wins,
+            "failovers": self.failovers,
+            "providers": {name: stats.get_stats(self.min_samples) for name, stats in self.stats.items()},
+            "clients": {provider.name: provider.client.get_stats() for provider in self.providers if getattr(provider, "client", None)}
+        }
+
+
+def create_providers() -> List[LLMProvider]:
+    # Providers from LLM_PROVIDERS in preference order; ones without an API key are skipped
+    factories= {
+        "gemini": lambda: GeminiProvider(Config.gemini_api_key, Config.gemini_model) if Config.gemini_api_key else None,
+        "groq": lambda: GroqProvider(Config.groq_api_key, Config.groq_model) if Config.groq_api_key else None
+    }
+    providers= []
+    for name in [name.strip() for name in Config.llm_providers.split(",") if name.strip()]:
+        if name not in factories:
+            raise ValueError(f"Unknown LLM provider: {name}")
+        provider= factories[name]()
+        if provider is None:
+            logger.warning("Skipping LLM provider %s: no API key configured", name)
+            continue
+        providers.append(provider)
+    if not providers:
+        raise ValueError(f"No usable LLM provider in LLM_PROVIDERS={Config.llm_providers}; check GEMINI_API_KEY / GROQ_API_KEY")
+    return providers
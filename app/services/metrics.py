@@ -0,0 +1,206 @@
+import functools
+import time
+from bisect import bisect_left
+from typing import Dict, List, Tuple, Optional, Callable
+
+from config.setting import Config
+
+# Label values in a fixed order, used as the key for one time series
+LabelKey= Tuple[Tuple[str, str], ...]
+
+LATENCY_BUCKETS= (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+def _label_key(labels: Dict[str, str]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs= list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped= [(name, value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for name, value in pairs]
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric:
+    # Base class: a named family of time series keyed by label values
+    kind= "untyped"
+
+    def __init__(self, name: str, documentation: str, enabled: bool = True):
+        self.name= name
+        self.documentation= documentation
+        self.enabled= enabled
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines= [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        return "\n".join(lines + self.samples())
+
+
+class Counter(Metric):
+    kind= "counter"
+
+    def __init__(self, name: str, documentation: str, enabled: bool = True):
+        super().__init__(name, documentation, enabled)
+        self.values: Dict[LabelKey, float] = {}
+
+    def inc(self, amount: float = 1, **labels: str):
+        if not self.enabled:
+            return
+        key= _label_key(labels)
+        self.values[key] = self.values.get(key, 0) + amount
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.values.items()]
+
+
+class Gauge(Metric):
+    kind= "gauge"
+
+    def __init__(self, name: str, documentation: str, enabled: bool = True):
+        super().__init__(name, documentation, enabled)
+        self.values: Dict[LabelKey, float] = {}
+
+    def set(self, value: float, **labels: str):
+        if not self.enabled:
+            return
+        self.values[_label_key(labels)] = value
+
+    def samples(self) -> List[str]:
+        return [f"{self.name}{_format_labels(key)} {_format_value(value)}" for key, value in self.values.items()]
+
+
+class _NullTimer:
+    # Shared no-op context manager returned while metrics are disabled
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+
+NULL_TIMER= _NullTimer()
+
+
+class _Timer:
+    def __init__(self, histogram: "Histogram", key: LabelKey):
+        self.histogram= histogram
+        self.key= key
+
+    def __enter__(self):
+        self.start= time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram._observe(self.key, time.perf_counter() - self.start)
+        if exc_type is not None and issubclass(exc_type, Exception) and self.histogram.errors is not None:
+            self.histogram.errors.values[self.key] = self.histogram.errors.values.get(self.key, 0) + 1
+        return False
+
+
+class Histogram(Metric):
+    kind= "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                 errors: Optional[Counter] = None, enabled: bool = True):
+        super().__init__(name, documentation, enabled)
+        self.buckets= tuple(buckets)
+        # Per series: (per-bucket counts with a trailing +Inf slot, sum, count)
+        self.series: Dict[LabelKey, List] = {}
+        # Optional counter incremented when a timed block raises
+        self.errors= errors
+
+    def _observe(self, key: LabelKey, value: float):
+        series= self.series.get(key)
+        if series is None:
+            series= self.series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def observe(self, value: float, **labels: str):
+        if self.enabled:
+            self._observe(_label_key(labels), value)
+
+    def time(self, **labels: str):
+        # Context manager that records the duration of its block
+        if not self.enabled:
+            return NULL_TIMER
+        return _Timer(self, _label_key(labels))
+
+    def timed(self, **labels: str) -> Callable:
+        # Decorator for coroutine functions; returns the function unchanged while disabled
+        def decorator(func: Callable) -> Callable:
+            if not self.enabled:
+                return func
+            key= _label_key(labels)
+
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with _Timer(self, key):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def samples(self) -> List[str]:
+        lines= []
+        for key, (counts, total, count) in self.series.items():
+            cumulative= 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    # Collects metric families and renders them in the Prometheus text exposition format
+    def __init__(self, enabled: bool = True):
+        self.enabled= enabled
+        self.metrics: List[Metric] = []
+
+    def _register(self, metric: Metric) -> Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter(name, documentation, self.enabled))
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge(name, documentation, self.enabled))
+
+    def histogram(self, name: str, documentation: str, buckets: Tuple[float, ...] = LATENCY_BUCKETS,
+                  errors: Optional[Counter] = None) -> Histogram:
+        return self._register(Histogram(name, documentation, buckets, errors, self.enabled))
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self.metrics) + "\n"
+
+
+registry= MetricsRegistry(enabled= Config.metrics_enabled)
+
+stage_errors= registry.counter(
+    "focusforge_stage_errors_total", "Timed stages that raised, by stage")
+stage_latency= registry.histogram(
+    "focusforge_stage_duration_seconds", "Latency of workflow nodes and external calls, by stage",
+    errors= stage_errors)
+llm_tokens= registry.counter(
+    "focusforge_llm_tokens_total", "LLM tokens reported by the provider, by call and kind (prompt/completion)")
+llm_parse_failures= registry.counter(
+    "focusforge_llm_parse_failures_total", "LLM responses that yielded nothing usable, even after salvage")
+llm_responses= registry.counter(
+    "focusforge_llm_responses_total", "Parsed LLM responses, by call and outcome (ok/salvaged/invalid)")
+retries= registry.counter(
+    "focusforge_retries_total", "Retried operations, by component")
+active_sessions= registry.gauge(
+    "focusforge_active_sessions", "Ritual sessions held in the active session store")
@@ -0,0 +1,63 @@
+import json
+from collections import deque
+from typing import Dict, Any, List, Optional
+
+# Rough characters per token for English text; only used to size budgets, never billed
+CHARS_PER_TOKEN= 4
+
+
+def estimate_tokens(value: Any) -> float:
+    return len(json.dumps(value, ensure_ascii=False)) / CHARS_PER_TOKEN
+
+
+class OutputBudget:
+    # max_output_tokens for ritual generation, sized from the p95 step length seen so far
+    def __init__(self, initial_tokens: int = 1024, max_tokens: int = 2048, max_steps: int = 7, adaptive: bool = True,
+                 headroom: float = 1.3, overhead_tokens: int = 16, min_samples: int = 20, window: int = 500):
+        self.initial= initial_tokens
+        self.max_tokens= max_tokens
+        self.max_steps= max_steps
+        self.adaptive= adaptive
+        self.headroom= headroom
+        self.overhead= overhead_tokens
+        self.min_samples= min_samples
+        self.step_tokens: deque = deque(maxlen=window)
+        # Grows after truncated responses and decays back to 1 on complete ones
+        self.scale= 1.0
+        self.truncations= 0
+
+    def observe(self, steps: List[Dict[str, str]], truncated: bool = False):
+        for step in steps:
+            self.step_tokens.append(estimate_tokens(step))
+        self.truncations += truncated
+        if not self.adaptive:
+            return
+        if truncated:
+            self.scale= min(2.0, self.scale * 1.25)
+        else:
+            self.scale= max(1.0, self.scale * 0.98)
+
+    def p95_step_tokens(self) -> Optional[float]:
+        if len(self.step_tokens) < self.min_samples:
+            return None
+        ordered= sorted(self.step_tokens)
+        return ordered[int(len(ordered) * 0.95)]
+
+    def tokens(self, extra: int = 0) -> int:
+        # Budget for up to max_steps steps plus `extra` tokens of other output (e.g. the fused state)
+        if not self.adaptive:
+            return self.initial + extra
+        p95= self.p95_step_tokens()
+        budget= self.initial if p95 is None else p95 * self.max_steps * self.headroom + self.overhead
+        return int(min(self.max_tokens, budget * self.scale + extra))
+
+    def get_stats(self) -> Dict[str, Any]:
+        p95= self.p95_step_tokens()
+        return {
+            "adaptive": self.adaptive,
+            "max_output_tokens": self.tokens(),
+            "p95_step_tokens": round(p95, 1) if p95 is not None else None,
+            "samples": len(self.step_tokens),
+            "scale": round(self.scale, 3),
+            "truncations": self.truncations
+        }
@@ -0,0 +1,93 @@
+import asyncio
+import re
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, Any, Awaitable, Callable, Tuple
+
+from config.setting import Config
+from config.logging import logger
+
+
+def normalize_input(text: str) -> str:
+    # Case-, punctuation- and whitespace-insensitive form of the user's text
+    text= unicodedata.normalize("NFKC", text).lower().replace("’", "'")
+    return " ".join(re.findall(r"[\w']+", text))
+
+
+class RitualCache:
+    # TTL + LRU cache of LLM results keyed by call kind and normalized input, with single-flight computation
+    def __init__(self, ttl_s: float = 600.0, max_size: int = 1024):
+        self.ttl= ttl_s
+        self.max_size= max_size
+        self.entries: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self.in_flight: Dict[str, asyncio.Future] = {}
+
+        self.hits= 0
+        self.misses= 0
+        self.coalesced= 0
+        self.evictions= 0
+
+    def _lookup(self, key: str) -> Any:
+        entry= self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value= entry
+        if expires_at < time.monotonic():
+            del self.entries[key]
+            self.evictions += 1
+            return None
+        self.entries.move_to_end(key)
+        return value
+
+    def _store(self, key: str, value: Any):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, text: str, compute: Callable[[], Awaitable[Any]], kind: str = "ritual") -> Any:
+        # Serve a cached result, join an identical in-flight computation, or start one
+        key= f"{kind}:{normalize_input(text)}"
+        value= self._lookup(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task= self.in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            logger.debug("Joining in-flight ritual computation for input '%s'", key)
+        else:
+            self.misses += 1
+            task= asyncio.ensure_future(compute())
+            self.in_flight[key] = task
+
+            def finish(done: asyncio.Future):
+                self.in_flight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self._store(key, done.result())
+            task.add_done_callback(finish)
+
+        # Shield so one caller disconnecting does not cancel the computation for the others
+        return await asyncio.shield(task)
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups= self.hits + self.misses + self.coalesced
+        return {
+            "enabled": Config.ritual_cache_enabled,
+            "entries": len(self.entries),
+            "in_flight": len(self.in_flight),
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "llm_calls_saved_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0
+        }
+
+
+ritual_cache= RitualCache(
+    ttl_s= Config.ritual_cache_ttl_s,
+    max_size= Config.ritual_cache_max_size
+)
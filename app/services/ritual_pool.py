@@ -0,0 +1,181 @@
+import asyncio
+import time
+import uuid
+from collections import deque, OrderedDict
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Set
+
+from services.ai_service import ai_service
+from prompts.prompts import USER_STATES
+from config.setting import Config
+from config.logging import logger
+
+
+def validate_ritual_steps(steps: Any) -> bool:
+    # A pooled ritual needs 4-7 complete steps with unique step types
+    if not isinstance(steps, list) or not 4 <= len(steps) <= 7:
+        return False
+    if not all(isinstance(step, dict) and all(key in step for key in ["title", "content", "step_type"]) for step in steps):
+        return False
+    return len({step["step_type"] for step in steps}) == len(steps)
+
+
+class RitualPool:
+    # Keeps validated rituals per user state, served in rotation and refilled in the background
+    def __init__(self, generator: Callable[[str], Awaitable[List[Dict[str, str]]]], target_size: int = 5,
+                 max_age_s: float = 86400.0, min_rating: float = 3.0, min_ratings: int = 3,
+                 max_tracked_sessions: int = 10000):
+        self.generator= generator
+        self.target_size= target_size
+        self.max_age= max_age_s
+        self.min_rating= min_rating
+        self.min_ratings= min_ratings
+        self.max_tracked_sessions= max_tracked_sessions
+
+        self.pools: Dict[str, deque] = {}
+        self.served_sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        # At most one refill runs per state; requests waiting on an empty pool join it
+        self.refilling: Dict[str, asyncio.Task] = {}
+        self.waiters: Dict[str, Set[asyncio.Future]] = {}
+
+        self.hits= 0
+        self.misses= 0
+        self.generated= 0
+        self.rejected= 0
+        self.evicted_age= 0
+        self.evicted_rating= 0
+
+    async def acquire(self, user_state: str, session_id: str, wait: bool = False) -> Optional[List[Dict[str, str]]]:
+        # Serve the next pooled ritual for a state; optionally wait for a refill when empty
+        pool= self.pools.setdefault(user_state, deque())
+        self._evict_expired(user_state)
+        if not pool and wait:
+            await self._wait_for_ritual(user_state)
+        if not pool:
+            self.misses += 1
+            self._schedule_refill(user_state)
+            return None
+
+        entry= pool[0]
+        pool.rotate(-1)
+        entry["served"] += 1
+        self.hits += 1
+        self._track(session_id, entry)
+        if len(pool) < self.target_size:
+            self._schedule_refill(user_state)
+        return [dict(step) for step in entry["steps"]]
+
+    def record_feedback(self, session_id: str, rating: int):
+        # Fold a session rating into its pooled ritual and evict poorly rated entries
+        entry= self.served_sessions.pop(session_id, None)
+        if entry is None:
+            return
+        entry["ratings"].append(rating)
+        if len(entry["ratings"]) >= self.min_ratings:
+            average= sum(entry["ratings"]) / len(entry["ratings"])
+            pool= self.pools.get(entry["user_state"])
+            if average < self.min_rating and pool is not None and entry in pool:
+                pool.remove(entry)
+                self.evicted_rating += 1
+                logger.info("Evicted pooled ritual %s for %s (avg rating %.2f)", entry['id'], entry['user_state'], average)
+                self._schedule_refill(entry["user_state"])
+
+    async def refill(self, user_state: str, count: Optional[int] = None):
+        # Generate rituals until the state's pool reaches its target size
+        pool= self.pools.setdefault(user_state, deque())
+        needed= count if count is not None else self.target_size - len(pool)
+        for _ in range(max(needed, 0)):
+            if count is None and len(pool) >= self.target_size:
+                break
+            try:
+                steps= await self.generator(user_state)
+            except Exception as e:
+                logger.error("Ritual pool refill failed for %s: %s", user_state, e)
+                return
+            if not validate_ritual_steps(steps):
+                self.rejected += 1
+                continue
+            self.generated += 1
+            # New rituals go to the front so they are served before repeats
+            pool.appendleft({
+                "id": str(uuid.uuid4()),
+                "user_state": user_state,
+                "steps": steps,
+                "created_at": time.monotonic(),
+                "served": 0,
+                "ratings": []
+            })
+            self._wake(user_state)
+        logger.info("Ritual pool for %s now holds %s rituals", user_state, len(pool))
+
+    def prefill(self, states: Optional[List[str]] = None):
+        # Warm every known state's pool in the background
+        for state in (states or USER_STATES):
+            self._schedule_refill(state)
+
+    def _schedule_refill(self, user_state: str) -> asyncio.Task:
+        # Start the state's refill unless one is already running; either way return it
+        task= self.refilling.get(user_state)
+        if task is not None:
+            return task
+
+        async def run():
+            try:
+                await self.refill(user_state)
+            finally:
+                self.refilling.pop(user_state, None)
+                # A failed refill wakes its waiters too, so they fall through to a miss
+                self._wake(user_state)
+
+        task= asyncio.get_running_loop().create_task(run())
+        self.refilling[user_state] = task
+        return task
+
+    async def _wait_for_ritual(self, user_state: str):
+        # Join the state's single-flight refill and return as soon as it adds a ritual or ends
+        waiter= asyncio.get_running_loop().create_future()
+        self.waiters.setdefault(user_state, set()).add(waiter)
+        try:
+            self._schedule_refill(user_state)
+            await waiter
+        finally:
+            self.waiters[user_state].discard(waiter)
+
+    def _wake(self, user_state: str):
+        for waiter in self.waiters.get(user_state, ()):
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _evict_expired(self, user_state: str):
+        pool= self.pools[user_state]
+        cutoff= time.monotonic() - self.max_age
+        fresh= [entry for entry in pool if entry["created_at"] >= cutoff]
+        if len(fresh) != len(pool):
+            self.evicted_age += len(pool) - len(fresh)
+            pool.clear()
+            pool.extend(fresh)
+
+    def _track(self, session_id: str, entry: Dict[str, Any]):
+        self.served_sessions[session_id] = entry
+        while len(self.served_sessions) > self.max_tracked_sessions:
+            self.served_sessions.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "mode": Config.ritual_pool_mode,
+            "hits": self.hits,
+            "misses": self.misses,
+            "generated": self.generated,
+            "rejected": self.rejected,
+            "evicted_age": self.evicted_age,
+            "evicted_rating": self.evicted_rating,
+            "pool_sizes": {state: len(pool) for state, pool in self.pools.items()}
+        }
+
+
+ritual_pool= RitualPool(
+    lambda user_state: ai_service.generate_ritual_step(user_state),
+    target_size= Config.ritual_pool_size,
+    max_age_s= Config.ritual_pool_max_age_s,
+    min_rating= Config.ritual_pool_min_rating,
+    min_ratings= Config.ritual_pool_min_ratings
+)
@@ -0,0 +1,60 @@
+import time
+from typing import List, Dict, Any, Optional
+
+from repository.pinecone_repository import pinecone_service
+from config.setting import Config
+from config.logging import logger
+
+
+class RitualReuse:
+    # Serve the ritual of a highly rated, similar past session instead of generating one
+    def __init__(self, score_threshold: float = 0.8, top_k: int = 3):
+        self.score_threshold= score_threshold
+        self.top_k= top_k
+
+        self.lookups= 0
+        self.reuses= 0
+        self.lookup_ms= 0.0
+        self.generations= 0
+        self.generation_ms= 0.0
+
+    async def find(self, user_input: str, user_state: Dict[str, Any]) -> Optional[List[Dict[str, str]]]:
+        # Return the steps of the best matching rated session above the score threshold
+        start= time.perf_counter()
+        sessions= await pinecone_service.retrieve_similar_sessions(user_input, user_state, top_k=self.top_k)
+        self.lookups += 1
+        self.lookup_ms += (time.perf_counter() - start) * 1000
+
+        for session in sessions:
+            if session['score'] < self.score_threshold:
+                break
+            if session['user_state'] == user_state['state'] and session['ritual']:
+                self.reuses += 1
+                logger.info("Reusing ritual from session %s (score %.3f)", session['session_id'], session['score'])
+                return session['ritual']
+        return None
+
+    def record_generation(self, elapsed_ms: float):
+        # Track generation latency to estimate the time saved by reuse
+        self.generations += 1
+        self.generation_ms += elapsed_ms
+
+    def get_stats(self) -> Dict[str, Any]:
+        avg_generation_ms= self.generation_ms / self.generations if self.generations else 0.0
+        return {
+            "enabled": Config.ritual_reuse_enabled,
+            "score_threshold": self.score_threshold,
+            "lookups": self.lookups,
+            "reuses": self.reuses,
+            "reuse_rate": round(self.reuses / self.lookups, 4) if self.lookups else 0,
+            "avg_lookup_ms": round(self.lookup_ms / self.lookups, 2) if self.lookups else 0,
+            "avg_generation_ms": round(avg_generation_ms, 2),
+            # Generation time avoided by reuses minus lookup time paid on every request
+            "estimated_latency_saved_ms": round(self.reuses * avg_generation_ms - self.lookup_ms, 2)
+        }
+
+
+ritual_reuse= RitualReuse(
+    score_threshold= Config.ritual_reuse_score_threshold,
+    top_k= Config.ritual_reuse_top_k
+)
@@ -0,0 +1,143 @@
+import asyncio
+import random
+from typing import List, Dict, Any, Optional, Set
+
+from models.schemas import SessionMemory
+from repository.pinecone_repository import pinecone_service
+from services.metrics import retries
+from config.setting import Config
+from config.logging import logger
+
+
+class SessionWriter:
+    # Write-behind queue that persists sessions in batched upserts off the request path
+    def __init__(self, repository, batch_size: int = 32, flush_interval_ms: float = 50.0,
+                 max_retries: int = 5, backoff_s: float = 0.5):
+        self.repository= repository
+        self.batch_size= batch_size
+        self.flush_interval= flush_interval_ms / 1000
+        self.max_retries= max_retries
+        self.backoff= backoff_s
+
+        # Sessions not yet acknowledged by the vector store, including in-flight ones
+        self.pending: Dict[str, SessionMemory] = {}
+        self.queued: Set[str] = set()
+        self.queue: Optional[asyncio.Queue] = None
+        self.worker: Optional[asyncio.Task] = None
+
+        self.written= 0
+        self.failed= 0
+        self.retries= 0
+        self.batches= 0
+
+    async def enqueue(self, session_memory: SessionMemory):
+        # Accept a session for background persistence
+        self.pending[session_memory.session_id] = session_memory
+        self._schedule(session_memory.session_id)
+
+    def apply_rating(self, session_id: str, rating: int) -> bool:
+        # Apply a rating to a session that has not been persisted yet
+        session_memory= self.pending.get(session_id)
+        if session_memory is None:
+            return False
+        session_memory.rating= rating
+        logger.info("Rating %s applied to pending session %s", rating, session_id)
+        return True
+
+    def _schedule(self, session_id: str):
+        self._ensure_worker()
+        if session_id not in self.queued:
+            self.queued.add(session_id)
+            self.queue.put_nowait(session_id)
+
+    def _ensure_worker(self):
+        # Start the writer task lazily on the running loop
+        if self.worker is None or self.worker.done():
+            self.queue= self.queue or asyncio.Queue()
+            self.worker= asyncio.get_running_loop().create_task(self._run())
+
+    async def _collect_batch(self) -> List[str]:
+        # Wait for the first session, then fill the batch until size or flush interval
+        loop= asyncio.get_running_loop()
+        batch= [await self.queue.get()]
+        deadline= loop.time() + self.flush_interval
+        while len(batch) < self.batch_size:
+            timeout= deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self):
+        while True:
+            batch_ids= await self._collect_batch()
+            self.queued.difference_update(batch_ids)
+            memories= [self.pending[session_id] for session_id in batch_ids if session_id in self.pending]
+            written_ratings= {memory.session_id: memory.rating for memory in memories}
+            try:
+                success= await self._write_with_retry(memories)
+                for memory in memories:
+                    if success and memory.rating != written_ratings[memory.session_id]:
+                        # Feedback arrived while the write was in flight; write again
+                        self._schedule(memory.session_id)
+                    else:
+                        self.pending.pop(memory.session_id, None)
+            finally:
+                for _ in batch_ids:
+                    self.queue.task_done()
+
+    async def _write_with_retry(self, memories: List[SessionMemory]) -> bool:
+        # Upsert a batch, retrying failures with jittered exponential backoff
+        if not memories:
+            return True
+        self.batches += 1
+        for attempt in range(self.max_retries + 1):
+            if await self.repository.store_sessions(memories):
+                self.written += len(memories)
+                return True
+            if attempt < self.max_retries:
+                self.retries += 1
+                retries.inc(component="session_writer")
+                delay= self.backoff * (2 ** attempt) * random.uniform(0.5, 1.5)
+                logger.warning("Session batch write failed, retrying in %.2fs (attempt %s)", delay, attempt + 1)
+                await asyncio.sleep(delay)
+        self.failed += len(memories)
+        logger.error("Dropping %s session(s) after %s retries", len(memories), self.max_retries)
+        return False
+
+    async def flush(self):
+        # Wait until every queued session has been written or dropped
+        if self.queue is not None and self.worker is not None and not self.worker.done():
+            await self.queue.join()
+
+    async def stop(self, timeout: float = 30.0):
+        # Flush pending writes and stop the worker on shutdown
+        try:
+            await asyncio.wait_for(self.flush(), timeout)
+        except asyncio.TimeoutError:
+            logger.error("Timed out flushing %s pending session(s) on shutdown", len(self.pending))
+        if self.worker and not self.worker.done():
+            self.worker.cancel()
+        logger.info("Session writer stopped")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "pending": len(self.pending),
+            "queue_depth": self.queue.qsize() if self.queue else 0,
+            "written": self.written,
+            "failed": self.failed,
+            "retries": self.retries,
+            "batches": self.batches
+        }
+
+
+session_writer= SessionWriter(
+    pinecone_service,
+    batch_size= Config.session_write_batch_size,
+    flush_interval_ms= Config.session_write_flush_interval_ms,
+    max_retries= Config.session_write_max_retries,
+    backoff_s= Config.session_write_backoff_s
+)
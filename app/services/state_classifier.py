@@ -0,0 +1,142 @@
+import asyncio
+import json
+import time
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from repository.pinecone_repository import pinecone_service
+from prompts.prompts import STATE_EXAMPLES
+from config.setting import Config
+from config.logging import logger
+
+
+class StateClassifier:
+    # Score user text against per-state embedding centroids
+    def __init__(self, examples: Dict[str, List[str]], temperature: float = 0.05):
+        self.examples= examples
+        self.temperature= temperature
+        self.states: List[str] = list(examples.keys())
+        self.centroids: Optional[np.ndarray] = None
+        self.lock= asyncio.Lock()
+
+        self.local_answers= 0
+        self.fallbacks= 0
+
+    async def _ensure_centroids(self):
+        # Embed the seed examples once and keep one normalized centroid per state
+        if self.centroids is not None:
+            return
+        async with self.lock:
+            if self.centroids is not None:
+                return
+            centroids= []
+            for state in self.states:
+                texts= [state] + self.examples[state]
+                vectors= np.asarray(await asyncio.gather(*[pinecone_service.generate_embeddings(text) for text in texts]), dtype=np.float32)
+                vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+                centroid= vectors.mean(axis=0)
+                centroids.append(centroid / np.linalg.norm(centroid))
+            self.centroids= np.stack(centroids)
+            logger.info("State classifier built %s centroids", len(self.states))
+
+    async def classify(self, text: str) -> Dict[str, Any]:
+        # Return the closest state with a softmax confidence over centroid similarities
+        await self._ensure_centroids()
+        vector= np.asarray(await pinecone_service.generate_embeddings(text), dtype=np.float32)
+        if not vector.size:
+            return {"state": "unknown", "confidence": 0.0}
+        vector /= np.linalg.norm(vector) or 1.0
+        similarities= self.centroids @ vector
+        weights= np.exp((similarities - similarities.max()) / self.temperature)
+        probabilities= weights / weights.sum()
+        best= int(np.argmax(probabilities))
+        return {"state": self.states[best], "confidence": round(float(probabilities[best]), 4)}
+
+    def record(self, used_local: bool):
+        if used_local:
+            self.local_answers += 1
+        else:
+            self.fallbacks += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        total= self.local_answers + self.fallbacks
+        return {
+            "enabled": Config.state_classifier_enabled,
+            "threshold": Config.state_classifier_threshold,
+            "local_answers": self.local_answers,
+            "llm_fallbacks": self.fallbacks,
+            "local_rate": round(self.local_answers / total, 4) if total else 0
+        }
+
+
+def load_examples(path: Optional[str]) -> Dict[str, List[str]]:
+    # Seed examples, extended by an optional JSONL file of {"text", "state"} rows
+    examples= {state: list(texts) for state, texts in STATE_EXAMPLES.items()}
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    row= json.loads(line)
+                    examples.setdefault(row["state"], []).append(row["text"])
+    return examples
+
+
+state_classifier= StateClassifier(
+    load_examples(Config.state_classifier_examples_path),
+    temperature= Config.state_classifier_temperature
+)
+
+
+async def evaluate(sample_path: str, threshold: float, use_llm: bool) -> Dict[str, Any]:
+    # Compare local predictions with the LLM and with labels on a JSONL sample
+    from services.ai_service import ai_service
+
+    rows= []
+    with open(sample_path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                rows.append(json.loads(line))
+
+    results= []
+    for row in rows:
+        start= time.perf_counter()
+        local= await state_classifier.classify(row["text"])
+        local_ms= (time.perf_counter() - start) * 1000
+        llm_state= None
+        if use_llm:
+            try:
+                llm_state= (await ai_service.analyze_user_state(row["text"]))["state"]
+            except ValueError as e:
+                logger.error("LLM analysis failed during evaluation: %s", e)
+        results.append({"label": row.get("state"), "llm": llm_state, "local": local, "local_ms": local_ms})
+
+    def rate(pairs: List[tuple]) -> Optional[float]:
+        return round(sum(a == b for a, b in pairs) / len(pairs), 4) if pairs else None
+
+    confident= [r for r in results if r["local"]["confidence"] >= threshold]
+    latencies= sorted(r["local_ms"] for r in results)
+    return {
+        "samples": len(results),
+        "threshold": threshold,
+        "coverage": round(len(confident) / len(results), 4) if results else 0,
+        "llm_agreement": rate([(r["local"]["state"], r["llm"]) for r in results if r["llm"]]),
+        "llm_agreement_above_threshold": rate([(r["local"]["state"], r["llm"]) for r in confident if r["llm"]]),
+        "label_accuracy": rate([(r["local"]["state"], r["label"]) for r in results if r["label"]]),
+        "label_accuracy_above_threshold": rate([(r["local"]["state"], r["label"]) for r in confident if r["label"]]),
+        "llm_label_accuracy": rate([(r["llm"], r["label"]) for r in results if r["llm"] and r["label"]]),
+        "local_p50_ms": round(latencies[len(latencies) // 2], 3) if latencies else None
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Evaluate the local state classifier against the LLM")
+    parser.add_argument("sample", help="JSONL file with a 'text' field and optional 'state' label")
+    parser.add_argument("--threshold", type=float, default=Config.state_classifier_threshold)
+    parser.add_argument("--no-llm", action="store_true", help="Only compare against labels")
+    args= parser.parse_args()
+
+    report= asyncio.run(evaluate(args.sample, args.threshold, not args.no_llm))
+    print(json.dumps(report, indent=2))
@@ -1,81 +1,126 @@
-from typing import TypedDict, Optional
-from langgraph.graph import StateGraph, END
+import asyncio
+from typing import TypedDict, Optional, Dict, Any, Callable, Awaitable
 from datetime import datetime
 
 from models.schemas import UserInput, Ritual, FeedbackResponse, SessionMemory
 from usecases.ritual_architect import RitualArchitect
 from usecases.ritual_guide import ritual_guide
 from repository.pinecone_repository import pinecone_service
-from config.logging import logger
+from services.session_writer import session_writer
+from services.metrics import stage_latency
+from config.setting import Config
+from config.logging import logger, session_id_var
 
 class WorkflowState(TypedDict):
     session_id: str
     user_input: str
     ritual: Optional[Ritual]
     feedback: Optional[FeedbackResponse]
-    
+
+
+class DirectWorkflowExecutor:
+    # Runs the same nodes as the LangGraph workflow in plain asyncio, without per-step state copies
+    # and channel bookkeeping; the flow is fixed, so there is no graph to interpret
+    def __init__(self, nodes: Dict[str, Callable[[WorkflowState], Awaitable[Dict[str, Any]]]]):
+        self.nodes= nodes
+
+    async def ainvoke(self, state: WorkflowState) -> WorkflowState:
+        state.update(await self.nodes["input"](state))
+        for update in await asyncio.gather(self.nodes["persist"](state), self.nodes["presentation"](state)):
+            state.update(update)
+        if state.get('feedback'):
+            state.update(await self.nodes["feedback_processing"](state))
+        return state
+
+
 class WorkflowService:
     
     def __init__(self):
         self.architect= RitualArchitect()
         self.guide= ritual_guide
-        self.graph= self._create_workflow()
-        logger.info("Workflow Service initialized")
+        self.nodes= {
+            "input": stage_latency.timed(stage="workflow.input")(self._input_node),
+            "persist": stage_latency.timed(stage="workflow.persist")(self._persist_node),
+            "presentation": stage_latency.timed(stage="workflow.presentation")(self._presentation_node),
+            "feedback_processing": stage_latency.timed(stage="workflow.feedback")(self._feedback_node)
+        }
+        self.graph= self._create_executor()
+        logger.info("Workflow Service initialized (%s executor)", Config.workflow_executor)
+    
+    # Nodes return only the keys they change, so the parallel branches never write the same key
+    async def _input_node(self, state: WorkflowState) -> Dict[str, Any]:
+        logger.info("Processing input for session %s", state['session_id'])
+        try:
+            user_input = UserInput(text=state['user_input'], session_id=state['session_id'])
+            ritual = await self.architect.process_input(user_input)
+            return {"ritual": ritual}
+        except Exception as e:
+            logger.error("Input processing error for session %s: %s", state['session_id'], e)
+            raise
+    
+    async def _persist_node(self, state: WorkflowState) -> Dict[str, Any]:
+        try:
+            ritual = state['ritual']
+            session_memory = SessionMemory(
+                session_id=state['session_id'],
+                user_input=state['user_input'],
+                user_state=ritual.user_state,
+                ritual_steps=[step.step_type for step in ritual.steps],
+                steps=ritual.steps,
+                rating=0,  # Initial rating
+                timestamp=datetime.now()
+            )
+            if Config.session_write_behind:
+                await session_writer.enqueue(session_memory)
+            else:
+                await pinecone_service.store_session(session_memory)
+            return {}
+        except Exception as e:
+            logger.error("Persistence error for session %s: %s", state['session_id'], e)
+            raise
+        
+    async def _presentation_node(self, state: WorkflowState) -> Dict[str, Any]:
+        logger.info("Presenting ritual for session %s", state['session_id'])
+        try: 
+            await self.guide.start_session(state['ritual'])
+            return {}
+        except Exception as e:
+            logger.error("Presentation error for session %s: %s", state['session_id'], e)
+            raise
         
-    def _create_workflow(self) -> StateGraph:
+    async def _feedback_node(self, state: WorkflowState) -> Dict[str, Any]:
+        logger.info("Processing feedback for session %s", state['session_id'])
+        try:
+            await self.guide.collect_feedback(state['session_id'], state['feedback'])
+            return {}
+        except Exception as e:
+            logger.error("Feedback error for session %s: %s", state['session_id'], e)
+            raise
+    
+    def _create_executor(self):
+        if Config.workflow_executor == "langgraph":
+            return self._create_workflow()
+        if Config.workflow_executor == "direct":
+            return DirectWorkflowExecutor(self.nodes)
+        raise ValueError(f"Unknown workflow executor: {Config.workflow_executor}")
+        
+    def _create_workflow(self):
+        from langgraph.graph import StateGraph, END
         graph= StateGraph(WorkflowState)
         
-        async def input_node(state: WorkflowState) -> WorkflowState:
-            logger.info(f"Processing input for session {state['session_id']}")
-            try:
-                user_input = UserInput(text=state['user_input'], session_id=state['session_id'])
-                ritual = await self.architect.process_input(user_input)
-                state['ritual'] = ritual
-                
-                session_memory = SessionMemory(
-                    session_id=state['session_id'],
-                    user_input=state['user_input'],
-                    user_state=ritual.user_state,
-                    ritual_steps=[step.step_type for step in ritual.steps],
-                    rating=0,  # Initial rating
-                    timestamp=datetime.now()
-                )
-                await pinecone_service.store_session(session_memory)
-                return state
-            except Exception as e:
-                logger.error(f"Input processing error for session {state['session_id']}: {str(e)}")
-                raise
-            
-        async def presentation_node(state: WorkflowState) -> WorkflowState:
-            logger.info(f"Presenting ritual for session {state['session_id']}")
-            try: 
-                await self.guide.start_session(state['ritual'])
-                return state
-            except Exception as e:
-                logger.error(f"Presentation error for session {state['session_id']}: {str(e)}")
-                raise
-            
-        async def feedback_node(state: WorkflowState) -> WorkflowState:
-            logger.info(f"Processing feedback for session {state['session_id']}")
-            try:
-                if state.get('feedback'):
-                    await self.guide.collect_feedback(state['session_id'], state['feedback'])
-                    return state
-                logger.info(f"No feedback provided for session {state['session_id']}, skipping feedback node")
-                return state
-            except Exception as e:
-                logger.error(f"Feedback error for session {state['session_id']}: {str(e)}")
-                raise
         # Nodes
-        graph.add_node("input", input_node)
-        graph.add_node("presentation", presentation_node)
-        graph.add_node("feedback_processing", feedback_node)
+        for name, node in self.nodes.items():
+            graph.add_node(name, node)
+        graph.add_node("join", lambda state: {})
         
-        # Edges
+        # Edges: input fans out to persistence and presentation, which run concurrently and join
+        # before the optional feedback step
         graph.set_entry_point('input')
+        graph.add_edge("input", "persist")
         graph.add_edge("input", "presentation")
+        graph.add_edge(["persist", "presentation"], "join")
         graph.add_conditional_edges(
-            "presentation",
+            "join",
             lambda state: "feedback_processing" if state.get('feedback') else END,
             {"feedback_processing": "feedback_processing", END: END}
         )
@@ -85,7 +130,8 @@ class WorkflowService:
     
     async def run_workflow(self, user_input: str, feedback: Optional[FeedbackResponse]= None) -> WorkflowState:
         session_id = pinecone_service.generate_session_id()
-        logger.info(f"Starting workflow for session {session_id}")
+        session_id_var.set(session_id)
+        logger.info("Starting workflow for session %s", session_id)
         
         initial_state= WorkflowState(
             session_id=session_id,
@@ -94,7 +140,9 @@ class WorkflowService:
             feedback=feedback
         )
         try:
-            return await self.graph.ainvoke(initial_state)
+            # Total minus the node stages is the graph's own overhead
+            with stage_latency.time(stage="workflow.total"):
+                return await self.graph.ainvoke(initial_state)
         except Exception as e:
-            logger.error(f"Workflow error for session {session_id} : {str(e)}")
+            logger.error("Workflow error for session %s : %s", session_id, e)
             raise   
\ No newline at end of file
@@ -0,0 +1,48 @@
+import asyncio
+import os
+import sys
+import tempfile
+from contextlib import asynccontextmanager
+
+import pytest
+
+# Offline settings, applied before the app modules read Config
+TEST_ENV= {
+    "VECTOR_BACKEND": "memory",
+    "SESSION_STORE_BACKEND": "memory",
+    "LOG_LEVEL": "WARNING",
+    "LOG_FILE": os.path.join(tempfile.gettempdir(), "focusforge-tests.log"),
+    "GEMINI_API_KEY": "",
+    "GROQ_API_KEY": "",
+}
+for key, value in TEST_ENV.items():
+    os.environ[key] = value
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@asynccontextmanager
+async def running_app():
+    # Boot the app in-process with the fake LLM and hashing embeddings, yielding an HTTP client
+    import httpx
+    from benchmarks.fakes import FakeAIService, HashEmbeddingBackend
+    import repository.pinecone_repository as pinecone_repository
+    from services.ai_service import ai_service
+    from services.session_writer import session_writer
+    import main
+
+    ai_service.override(FakeAIService(analysis_ms=0, generation_ms=0))
+    pinecone_repository.create_embedding_backend= lambda *_, **__: HashEmbeddingBackend()
+    async with main.lifespan(main.app):
+        while not main.readiness["ready"]:
+            assert not main.readiness["error"], main.readiness["error"]
+            await asyncio.sleep(0.01)
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://test") as client:
+            yield client
+    # Each test runs on its own event loop; the writer rebuilds its queue on the next one
+    session_writer.queue= None
+    session_writer.worker= None
+
+
+@pytest.fixture
+def app_client():
+    return running_app
@@ -0,0 +1,31 @@
+import asyncio
+import json
+
+
+def test_bulk_created_session_can_be_stepped_and_rated(app_client):
+    async def scenario():
+        from usecases.ritual_guide import ritual_guide
+
+        async with app_client() as client:
+            response= await client.post("/api/v1/rituals/batch", json={"inputs": ["I feel anxious before my exam", {"text": "I cannot start my work", "id": "b"}]})
+            lines= [json.loads(line) for line in response.text.splitlines()]
+            assert lines[-1]["done"] and lines[-1]["stored"] == 2
+            results= [line for line in lines if "session_id" in line]
+            assert all(result["success"] for result in results)
+
+            # Bulk sessions take no room in the active-session store until they are used
+            assert all([await ritual_guide.active_sessions.get(result["session_id"]) is None for result in results])
+
+            for result in results:
+                session_id= result["session_id"]
+                response= await client.get(f"/api/v1/step/{session_id}")
+                assert response.status_code == 200
+                assert response.json()["current_step"]["step_number"] == 1
+                assert (await client.post(f"/api/v1/step/{session_id}/next")).status_code == 200
+
+                response= await client.post(f"/api/v1/feedback/{session_id}", json={"rating": 5})
+                assert response.status_code == 200 and response.json()["success"]
+                # A rated session is not started again
+                assert (await client.get(f"/api/v1/step/{session_id}")).status_code == 404
+
+    asyncio.run(scenario())
@@ -0,0 +1,89 @@
+import asyncio
+from datetime import datetime
+
+from models.schemas import Ritual, RitualStep, SessionMemory
+
+
+def unpersisted_ritual(session_id: str) -> Ritual:
+    # An active session whose storage write never happened, e.g. dropped after max retries
+    step= RitualStep(step_number=1, title="Breathe", content="Inhale for 5 seconds.", step_type="Breathing")
+    return Ritual(session_id=session_id, user_state="Anxiety", steps=[step], created_at=datetime.now())
+
+
+def test_feedback_for_unpersisted_session_fails(app_client):
+    async def scenario():
+        from usecases.ritual_guide import ritual_guide
+        from repository.pinecone_repository import pinecone_service
+
+        async with app_client() as client:
+            await ritual_guide.start_session(unpersisted_ritual("never-stored-1"))
+            await ritual_guide.start_session(unpersisted_ritual("never-stored-2"))
+
+            response= await client.post("/api/v1/feedback/never-stored-1", json={"rating": 5})
+            assert response.status_code == 500
+            assert "not found in storage" in response.json()["detail"]
+
+            response= await client.post("/api/v1/feedback", json={"feedback": [{"session_id": "never-stored-2", "rating": 4}]})
+            body= response.json()
+            assert body["saved"] == 0
+            assert body["results"][0]["error"] == "Session not found in storage"
+            assert await pinecone_service.get_session("never-stored-2") is None
+
+    asyncio.run(scenario())
+
+
+def test_feedback_for_stored_session_saves_rating(app_client):
+    async def scenario():
+        from repository.pinecone_repository import pinecone_service
+        from services.session_writer import session_writer
+
+        async with app_client() as client:
+            session_id= (await client.post("/api/v1/ritual", json={"text": "I feel anxious about work"})).json()["session_id"]
+            await session_writer.flush()
+
+            response= await client.post("/api/v1/feedback", json={"feedback": [{"session_id": session_id, "rating": 4}]})
+            assert response.json()["saved"] == 1
+            assert (await pinecone_service.get_session(session_id))["rating"] == 4
+
+    asyncio.run(scenario())
+
+
+def test_rating_update_does_not_fetch_vectors(app_client, monkeypatch):
+    async def scenario():
+        from repository.pinecone_repository import pinecone_service
+        from services.session_writer import session_writer
+
+        async with app_client() as client:
+            session_id= (await client.post("/api/v1/ritual", json={"text": "I feel stuck on my project"})).json()["session_id"]
+            await session_writer.flush()
+            index= pinecone_service.index.index
+            fetched, listed= [], []
+            monkeypatch.setattr(index, "fetch", lambda ids, **kwargs: fetched.append(ids))
+            list_paginated= index.list_paginated
+            monkeypatch.setattr(index, "list_paginated", lambda **kwargs: listed.append(kwargs) or list_paginated(**kwargs))
+
+            # Known from this process's own write
+            assert await pinecone_service.update_session_ratings({session_id: 2}) == {session_id: "updated"}
+            # Unknown ids are checked by listing ids only
+            assert await pinecone_service.update_session_ratings({"never-written": 2}) == {"never-written": "not_found"}
+            assert fetched == [] and [kwargs["prefix"] for kwargs in listed] == ["never-written"]
+
+    asyncio.run(scenario())
+
+
+def test_rating_for_session_whose_write_failed_is_rejected(app_client, monkeypatch):
+    async def scenario():
+        from repository.pinecone_repository import pinecone_service
+
+        async with app_client():
+            index= pinecone_service.index.index
+            def failing_upsert(*args, **kwargs):
+                raise ConnectionError("index unavailable")
+            monkeypatch.setattr(index, "upsert", failing_upsert)
+            ritual= unpersisted_ritual("write-failed")
+            memory= SessionMemory(session_id="write-failed", user_input="I feel tired", user_state=ritual.user_state,
+                                  ritual_steps=["Breathing"], steps=ritual.steps, rating=0, timestamp=datetime.now())
+            assert not await pinecone_service.store_sessions([memory])
+            assert await pinecone_service.update_session_ratings({"write-failed": 4}) == {"write-failed": "not_found"}
+
+    asyncio.run(scenario())
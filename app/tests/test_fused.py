@@ -0,0 +1,20 @@
+import asyncio
+
+from config.setting import Config
+
+
+def test_fused_mode_creates_rituals_with_one_llm_call(app_client, monkeypatch):
+    monkeypatch.setattr(Config, "ritual_fused_mode", True)
+
+    async def scenario():
+        from services.ai_service import ai_service
+
+        async with app_client() as client:
+            response= await client.post("/api/v1/ritual", json={"text": "I keep doubting my own work"})
+            assert response.status_code == 200
+            assert response.json()["ritual"]["steps"]
+            calls= ai_service.get_stats()["calls"]
+            assert calls["analyze_and_generate"] == 1
+            assert calls["analyze_user_state"] == 0 and calls["generate_ritual_step"] == 0
+
+    asyncio.run(scenario())
@@ -0,0 +1,27 @@
+import asyncio
+
+from services.llm_client import AIMDLimiter
+
+
+def test_limit_grows_only_on_success_at_the_limit():
+    async def scenario():
+        limiter= AIMDLimiter(initial=2, max_limit=8)
+        # One call at a time never needs more than one slot
+        for _ in range(20):
+            await limiter.acquire()
+            await limiter.release(success=True)
+        # Non-overload errors do not grow it either
+        await limiter.acquire()
+        await limiter.acquire()
+        await limiter.release(success=False)
+        await limiter.release(success=False)
+        assert limiter.limit == 2
+
+        await limiter.acquire()
+        await limiter.acquire()
+        await limiter.release(success=True)
+        assert limiter.limit == 2.5
+        await limiter.release(success=True)
+        assert limiter.limit == 2.5
+
+    asyncio.run(scenario())
@@ -0,0 +1,58 @@
+import asyncio
+import json
+import time
+
+from benchmarks.fakes import FakeProvider
+from services.llm_providers import LLMRouter
+
+PARAMS= {"temperature": 0.3, "max_output_tokens": 1000, "output": "array"}
+
+
+def complete(router: LLMRouter):
+    return router.complete("generate_ritual_steps", "Create a ritual", json.loads, **PARAMS)
+
+
+def test_router_ranks_providers_by_observed_latency():
+    async def scenario():
+        router= LLMRouter([FakeProvider("slow", latency_ms=40, sigma=0), FakeProvider("fast", latency_ms=5, sigma=0)], explore_rate=0)
+        # Configured order until every provider has been measured
+        await complete(router)
+        assert [provider.name for provider in router.rank()] == ["slow", "fast"]
+        router.explore_rate= 1.0
+        await complete(router)
+        router.explore_rate= 0
+        assert [provider.name for provider in router.rank()] == ["fast", "slow"]
+        assert router.stats["fast"].requests == 1 and router.stats["slow"].requests == 1
+
+    asyncio.run(scenario())
+
+
+def test_stream_fails_over_before_the_first_chunk():
+    async def scenario():
+        broken, backup= FakeProvider("broken", latency_ms=5, error_rate=1.0), FakeProvider("backup", latency_ms=5)
+        router= LLMRouter([broken, backup], explore_rate=0)
+        text= "".join([chunk async for chunk in router.stream("stream_ritual_steps", "Create a ritual", **PARAMS)])
+
+        assert len(json.loads(text)) == 5
+        assert router.failovers == 1
+        assert router.stats["broken"].errors == 1
+        # The backup's time to first chunk is recorded, not the whole stream
+        assert router.stats["backup"].requests == 1 and router.stats["backup"].ewma_latency_s < 0.005
+
+    asyncio.run(scenario())
+
+
+def test_hedge_fires_after_the_primary_p90():
+    async def scenario():
+        router= LLMRouter([FakeProvider("slow", latency_ms=300, sigma=0), FakeProvider("fast", latency_ms=10, sigma=0)],
+                          hedge=True, hedge_delay_s=5.0, min_samples=5, explore_rate=0)
+        # The primary's recent calls finished within 20 ms, so the hedge goes out long before hedge_delay_s
+        for _ in range(5):
+            router.stats["slow"].record(0.02)
+        start= time.perf_counter()
+        await complete(router)
+
+        assert time.perf_counter() - start < 0.2
+        assert router.hedges == 1 and router.hedge_wins == 1
+
+    asyncio.run(scenario())
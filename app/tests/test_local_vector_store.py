@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from repository.local_vector_store import LocalVectorStore
+
+DIM= 16
+
+
+def exact_top(vectors, metadata, query, top_k, state, min_rating):
+    # Brute-force cosine ranking over the records that pass the filter
+    ids= [id for id in vectors if metadata[id]["user_state"] == state and metadata[id]["rating"] >= min_rating]
+    matrix= np.asarray([vectors[id] for id in ids], dtype=np.float32)
+    scores= matrix @ query / (np.linalg.norm(matrix, axis=1) * np.linalg.norm(query))
+    return [ids[i] for i in np.argsort(-scores)[:top_k]]
+
+
+@pytest.mark.parametrize("quantize", [False, True])
+def test_upsert_update_delete_compact_reopen_and_query(tmp_path, quantize):
+    rng= np.random.default_rng(0)
+    open_store= lambda: LocalVectorStore(str(tmp_path), DIM, quantize=quantize, compact_min_rows=10, compact_ratio=0.3)
+    store= open_store()
+
+    # More rows than the initial file holds, so the memmap has to grow
+    vectors= {f"s{i:04d}": rng.normal(size=DIM).astype(np.float32) for i in range(1500)}
+    metadata= {id: {"user_state": "Anxiety" if i % 2 else "Burnout", "rating": i % 5 + 1} for i, id in enumerate(vectors)}
+    for start in range(0, 1500, 500):
+        batch= list(vectors)[start:start + 500]
+        store.upsert([{"id": id, "values": vectors[id].tolist(), "metadata": metadata[id]} for id in batch])
+
+    store.update(id="s0001", set_metadata={"rating": 1})
+    metadata["s0001"]["rating"] = 1
+    # Overwriting a vector leaves a dead row behind
+    vectors["s0003"] = rng.normal(size=DIM).astype(np.float32)
+    store.upsert([{"id": "s0003", "values": vectors["s0003"].tolist(), "metadata": metadata["s0003"]}])
+
+    deleted= [f"s{i:04d}" for i in range(100, 700)]
+    store.delete(ids=deleted)
+    for id in deleted:
+        del vectors[id], metadata[id]
+    store.compact()
+    stats= store.describe_index_stats()
+    assert stats["total_vector_count"] == 900 and stats["dead_rows"] == 0 and stats["compactions"] >= 1
+
+    def check(store):
+        assert store.fetch(ids=["s0001", "s0100"]).vectors.keys() == {"s0001"}
+        assert store.fetch(ids=["s0001"]).vectors["s0001"]["metadata"]["rating"] == 1
+        np.testing.assert_allclose(store.fetch(ids=["s0003"]).vectors["s0003"]["values"], vectors["s0003"], rtol=1e-6)
+        for _ in range(20):
+            query= rng.normal(size=DIM).astype(np.float32)
+            result= store.query(vector=query.tolist(), top_k=5, filter={"user_state": "Anxiety", "rating": {"$gte": 3}})
+            assert [match["id"] for match in result["matches"]] == exact_top(vectors, metadata, query, 5, "Anxiety", 3)
+        # Filters see the updated metadata: s0001 is an Anxiety session now rated 1
+        result= store.query(vector=vectors["s0001"].tolist(), top_k=1, filter={"user_state": "Anxiety", "rating": {"$gte": 2}})
+        assert result["matches"][0]["id"] != "s0001"
+
+    check(store)
+    store.close()
+    # Everything survives a reopen from disk, including the compacted generation
+    store= open_store()
+    assert store.describe_index_stats()["total_vector_count"] == 900
+    check(store)
+    store.close()
@@ -0,0 +1,14 @@
+import logging
+import queue
+
+from config.logging import DeferredQueueHandler
+
+
+def test_queued_record_keeps_the_message_as_logged():
+    log_queue= queue.SimpleQueue()
+    handler= DeferredQueueHandler(log_queue)
+    steps= ["Breathing"]
+    handler.handle(logging.LogRecord("test", logging.INFO, __file__, 1, "steps: %s", (steps,), None))
+    # The caller mutates its args before the listener thread gets to the record
+    steps.append("Journaling")
+    assert log_queue.get_nowait().getMessage() == "steps: ['Breathing']"
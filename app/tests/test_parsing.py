@@ -0,0 +1,80 @@
+import json
+
+from benchmarks.fakes import FakeProvider
+from services.ai_service import AIMemoryService
+from services.json_stream import JSONArrayStreamParser
+from services.metrics import llm_parse_failures
+from services.output_budget import OutputBudget
+
+STEPS= [{"title": f"Step {i}", "content": "Breathe in {slowly}, then [out].", "step_type": f"Type {i}"} for i in range(4)]
+
+
+def parse_failures() -> float:
+    return sum(llm_parse_failures.values.values())
+
+
+def test_stream_parser_keeps_complete_objects_of_a_truncated_array():
+    text= "```json\n" + json.dumps(STEPS, indent=2)
+    cut= text[:text.rindex('"step_type"')]
+    parser= JSONArrayStreamParser()
+    # Fed in small chunks, as a stream arrives; braces and brackets inside strings are not structure
+    steps= [step for start in range(0, len(cut), 7) for step in parser.feed(cut[start:start + 7])]
+    assert steps == STEPS[:3]
+    assert not parser.closed
+
+    parser= JSONArrayStreamParser()
+    assert parser.feed(text + "\n```") == STEPS and parser.closed
+
+
+def test_fenced_and_prefixed_output_parses():
+    service= AIMemoryService(providers=[FakeProvider("fake")])
+    assert service.parse_response("```json\n" + json.dumps(STEPS) + "\n```") == STEPS
+    assert service.parse_response("json " + json.dumps(STEPS)) == STEPS
+    assert service.parse_response("Sorry, I can't help with that.") is None
+
+
+def test_partially_valid_steps_keep_the_complete_ones():
+    service= AIMemoryService(providers=[FakeProvider("fake")])
+    response= json.dumps(STEPS[:2] + [{"title": "No content"}, "not a step"])
+    assert service.parse_steps(response) == STEPS[:2]
+    assert service.parse_counts["generate_ritual_step"]["ok"] == 1
+
+
+def test_truncated_responses_are_salvaged_without_counting_a_failure():
+    service= AIMemoryService(providers=[FakeProvider("fake")])
+    failures= parse_failures()
+
+    steps= json.dumps(STEPS)
+    assert service.parse_steps(steps[:steps.rindex("{")]) == STEPS[:3]
+
+    fused= json.dumps({"state": "Anxiety", "confidence": 0.8, "steps": STEPS})
+    assert service.parse_fused(fused[:fused.rindex("{") + 5]) == {"state": "Anxiety", "confidence": 0.8, "steps": STEPS[:3]}
+    assert service.parse_counts["generate_ritual_step"]["salvaged"] == 1
+    assert service.parse_counts["analyze_and_generate"]["salvaged"] == 1
+    assert parse_failures() == failures
+
+    # Nothing usable: counted once
+    assert service.parse_fused('{"steps": [') is None
+    assert parse_failures() == failures + 1
+    assert service.parse_counts["analyze_and_generate"]["invalid"] == 1
+
+
+def test_budget_grows_after_a_truncation_and_decays_back():
+    budget= OutputBudget(initial_tokens=1000, max_tokens=4000, min_samples=4)
+    budget.observe(STEPS)
+    sized= budget.tokens()
+    assert sized < 1000
+
+    budget.observe(STEPS[:2], truncated=True)
+    grown= budget.tokens()
+    assert grown > sized and budget.truncations == 1
+    for _ in range(50):
+        budget.observe(STEPS)
+    assert budget.tokens() < grown
+
+    # A truncated response parsed by the service feeds the same signal
+    service= AIMemoryService(providers=[FakeProvider("fake")])
+    before= service.output_budget.scale
+    steps= json.dumps(STEPS)
+    service.parse_steps(steps[:steps.rindex("{")])
+    assert service.output_budget.scale > before
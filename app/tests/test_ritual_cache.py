@@ -0,0 +1,29 @@
+import asyncio
+
+from config.setting import Config
+
+
+def test_cache_does_not_bypass_pool_tracking(app_client, monkeypatch):
+    monkeypatch.setattr(Config, "ritual_cache_enabled", True)
+    monkeypatch.setattr(Config, "ritual_pool_mode", "pool_first")
+
+    async def scenario():
+        from models.schemas import UserInput
+        from services.ai_service import ai_service
+        from services.ritual_pool import ritual_pool
+        from usecases.ritual_architect import RitualArchitect
+
+        async with app_client():
+            text= "I keep putting off my thesis"
+            state= (await ai_service.analyze_user_state(text))["state"]
+            await ritual_pool.refill(state)
+
+            architect= RitualArchitect()
+            session_ids= [f"cached-{i}" for i in range(3)]
+            await asyncio.gather(*[architect.process_input(UserInput(text=text, session_id=session_id)) for session_id in session_ids])
+            await architect.process_input(UserInput(text=text, session_id="cached-3"))
+
+            # Every request is served by the pool itself, so each one's rating reaches the pooled ritual
+            assert all(session_id in ritual_pool.served_sessions for session_id in session_ids + ["cached-3"])
+
+    asyncio.run(scenario())
@@ -0,0 +1,22 @@
+import asyncio
+
+from services.ritual_pool import RitualPool
+
+
+def test_waiters_on_an_empty_pool_share_one_refill():
+    calls= []
+
+    async def generate(user_state):
+        calls.append(user_state)
+        await asyncio.sleep(0.01)
+        return [{"title": f"Step {i}", "content": "Breathe slowly.", "step_type": f"Type {i}"} for i in range(4)]
+
+    async def scenario():
+        pool= RitualPool(generate, target_size=3)
+        served= await asyncio.gather(*[pool.acquire("Anxiety", f"s{i}", wait=True) for i in range(50)])
+        assert all(served)
+        await asyncio.gather(*pool.refilling.values())
+        # One refill to the target size, not one generation per waiting request
+        assert len(calls) == 3 and len(pool.pools["Anxiety"]) == 3
+
+    asyncio.run(scenario())
@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime
+
+from config.setting import Config
+from models.schemas import SessionMemory, RitualStep
+
+
+def rated_session(session_id: str, text: str, rating: int = 5) -> SessionMemory:
+    step= RitualStep(step_number=1, title="Rest", content="Close your eyes for a minute.", step_type="Rest")
+    return SessionMemory(session_id=session_id, user_input=text, user_state="Burnout", ritual_steps=["Rest"],
+                         steps=[step], rating=rating, timestamp=datetime.now())
+
+
+def test_mirror_loads_every_page_and_refreshes_other_replicas_writes(app_client, monkeypatch):
+    monkeypatch.setattr(Config, "session_mirror_page_size", 2)
+    monkeypatch.setattr(Config, "session_mirror_refresh_overlap_s", 0.0)
+
+    async def scenario():
+        from repository.pinecone_repository import pinecone_service, PineconeRespository
+
+        async with app_client():
+            # Another replica with its own mirror over the same index; pinecone_service writes as the first replica
+            monkeypatch.setattr(Config, "session_mirror_enabled", True)
+            replica= PineconeRespository()
+            replica.index= pinecone_service.index
+            text= "my deadlines pile up and I freeze"
+            await pinecone_service.store_sessions([rated_session(f"mirror-{i}", f"{text} {i}", rating=3 + i % 3) for i in range(5)])
+            await replica.load_mirror()
+            assert all(f"mirror-{i}" in replica.mirror for i in range(5))
+
+            await pinecone_service.store_sessions([rated_session("mirror-new", text)])
+            await pinecone_service.update_session_ratings({"mirror-0": 1})
+            assert "mirror-new" not in replica.mirror
+            # The refresh reads only the sessions updated since the load, without another scan
+            listed= replica.index.list_paginated
+            replica.index.list_paginated= None
+            await replica.refresh_mirror()
+            replica.index.list_paginated= listed
+            assert "mirror-new" in replica.mirror and "mirror-0" not in replica.mirror
+            stats= replica.mirror.get_stats()
+            assert stats["loads"] == 1 and stats["refreshes"] == 1 and stats["refreshed_sessions"] == 2
+
+            # The mirror returns what the filtered remote query returns; the hashed test embeddings tie, so
+            # the order among equal scores is left open
+            remote= await pinecone_service.retrieve_similar_sessions(text, {"state": "Burnout"}, top_k=10)
+            mirrored= await replica.retrieve_similar_sessions(text, {"state": "Burnout"}, top_k=10)
+            ranking= lambda sessions: [(round(session["score"], 5), session["session_id"]) for session in sessions]
+            assert sorted(ranking(mirrored)) == sorted(ranking(remote))
+            assert [score for score, _ in ranking(mirrored)] == [score for score, _ in ranking(remote)]
+            await replica.embedding_engine.close()
+
+    asyncio.run(scenario())
+
+
+def test_mirror_refresh_reloads_when_too_many_sessions_changed(app_client, monkeypatch):
+    monkeypatch.setattr(Config, "session_mirror_refresh_max_changes", 3)
+    monkeypatch.setattr(Config, "session_mirror_refresh_overlap_s", 0.0)
+
+    async def scenario():
+        from repository.pinecone_repository import pinecone_service, PineconeRespository
+
+        async with app_client():
+            monkeypatch.setattr(Config, "session_mirror_enabled", True)
+            replica= PineconeRespository()
+            replica.index= pinecone_service.index
+            await replica.load_mirror()
+            await pinecone_service.store_sessions([rated_session(f"burst-{i}", f"I cannot switch off tonight {i}") for i in range(4)])
+
+            # The capped query may have missed some of the changes, so the mirror is rebuilt from a full scan
+            await replica.refresh_mirror()
+            assert all(f"burst-{i}" in replica.mirror for i in range(4))
+            stats= replica.mirror.get_stats()
+            assert stats["loads"] == 2 and stats["refreshes"] == 0
+            await replica.embedding_engine.close()
+
+    asyncio.run(scenario())
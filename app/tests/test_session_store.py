@@ -0,0 +1,52 @@
+import asyncio
+import os
+from datetime import datetime
+
+from models.schemas import Ritual, RitualStep
+
+
+def session(session_id: str):
+    step= RitualStep(step_number=1, title="Breathe", content="Inhale for 5 seconds.", step_type="Breathing")
+    ritual= Ritual(session_id=session_id, user_state="Anxiety", steps=[step], created_at=datetime.now())
+    return {"ritual": ritual, "current_step": 1, "total_steps": 1, "started_at": datetime.now(), "completed_steps": [], "streaming": False}
+
+
+def test_sqlite_reads_refresh_the_ttl_in_batches(tmp_path):
+    from repository.session_store import SQLiteSessionStore
+
+    async def scenario():
+        store= SQLiteSessionStore(path=os.path.join(tmp_path, "sessions.db"), ttl_s=0.5, touch_interval_s=3600)
+        await store.put("idle", session("idle"))
+        await store.put("read", session("read"))
+        written= store.conn.execute("SELECT last_access FROM sessions WHERE id = 'read'").fetchone()[0]
+        await asyncio.sleep(0.3)
+
+        assert await store.get("read") is not None
+        # The read is recorded in memory, not written back on every get
+        assert store.conn.execute("SELECT last_access FROM sessions WHERE id = 'read'").fetchone()[0] == written
+        await asyncio.sleep(0.3)
+
+        # Eviction writes the recorded reads back first, so only the idle session expires
+        stats= await store.get_stats()
+        assert stats["sessions"] == 1 and stats["evictions_ttl"] == 1
+        assert await store.get("idle") is None
+        assert await store.get("read") is not None
+
+    asyncio.run(scenario())
+
+
+def test_count_does_not_walk_or_sweep_the_store(tmp_path):
+    from repository.session_store import SQLiteSessionStore
+
+    async def scenario():
+        store= SQLiteSessionStore(path=os.path.join(tmp_path, "sessions.db"), ttl_s=0.2)
+        for session_id in ("a", "b", "c"):
+            await store.put(session_id, session(session_id))
+        await asyncio.sleep(0.3)
+
+        # The scrape-time count leaves expiry to the eviction pass
+        assert await store.count() == 3
+        assert store.evictions_ttl == 0
+        assert (await store.get_stats())["sessions"] == 0
+
+    asyncio.run(scenario())
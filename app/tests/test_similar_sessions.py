@@ -0,0 +1,28 @@
+import asyncio
+from datetime import datetime
+
+from models.schemas import SessionMemory, RitualStep
+
+
+def rated_session(session_id: str, text: str, user_state: str, rating: int = 5) -> SessionMemory:
+    step= RitualStep(step_number=1, title="Breathe", content="Inhale for 5 seconds.", step_type="Breathing")
+    return SessionMemory(session_id=session_id, user_input=text, user_state=user_state, ritual_steps=["Breathing"],
+                         steps=[step], rating=rating, timestamp=datetime.now())
+
+
+def test_similar_sessions_are_limited_to_the_user_state(app_client):
+    async def scenario():
+        from repository.pinecone_repository import pinecone_service
+
+        async with app_client():
+            text= "I cannot focus on anything at work today"
+            # Closer to the query but in another state, so it must not take the only top_k slot
+            await pinecone_service.store_sessions([
+                rated_session("other-state", text, "Anxiety"),
+                rated_session("same-state", "focus is hard for me", "Procrastination"),
+                rated_session("low-rated", text, "Procrastination", rating=1)
+            ])
+            sessions= await pinecone_service.retrieve_similar_sessions(text, {"state": "Procrastination"}, top_k=1)
+            assert [session["session_id"] for session in sessions] == ["same-state"]
+
+    asyncio.run(scenario())
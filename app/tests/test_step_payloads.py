@@ -0,0 +1,27 @@
+import asyncio
+import os
+from datetime import datetime
+
+from models.schemas import Ritual, RitualStep
+
+
+def test_step_payloads_are_built_once_per_session(monkeypatch, tmp_path):
+    import usecases.ritual_guide as ritual_guide_module
+    from repository.session_store import SQLiteSessionStore
+
+    builds= []
+    build_step_payloads= ritual_guide_module.build_step_payloads
+    monkeypatch.setattr(ritual_guide_module, "build_step_payloads", lambda *args: builds.append(args[0]) or build_step_payloads(*args))
+
+    async def scenario():
+        # The sqlite store deserializes a fresh session on every get
+        guide= ritual_guide_module.RitualGuide(SQLiteSessionStore(path=os.path.join(tmp_path, "sessions.db")))
+        steps= [RitualStep(step_number=i, title=f"Step {i}", content="Breathe slowly.", step_type="Breathing") for i in (1, 2, 3)]
+        await guide.start_session(Ritual(session_id="payloads-1", user_state="Anxiety", steps=steps, created_at=datetime.now()))
+        for _ in range(10):
+            assert await guide.get_current_step_payload("payloads-1")
+        await guide.next_step_payload("payloads-1")
+        assert b'"step_number":2' in await guide.get_current_step_payload("payloads-1")
+
+    asyncio.run(scenario())
+    assert builds == ["payloads-1"]
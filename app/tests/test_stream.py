@@ -0,0 +1,34 @@
+import asyncio
+import json
+
+
+def events(chunks):
+    return [(chunk.split("\n")[0][len("event: "):], json.loads(chunk.split("\n")[1][len("data: "):])) for chunk in chunks]
+
+
+def test_stream_settles_the_session_on_completion_and_on_disconnect(app_client):
+    async def scenario():
+        from routes.api_endpoints import controller
+        from repository.pinecone_repository import pinecone_service
+        from services.session_writer import session_writer
+        from usecases.ritual_guide import ritual_guide
+
+        async with app_client():
+            stream= controller.stream_user_input("I feel anxious about my talk")
+            chunks= [chunk async for chunk in stream]
+            (_, session), *_, (last, done)= events(chunks)
+            assert last == "done"
+            assert not (await ritual_guide.active_sessions.get(session["session_id"]))["streaming"]
+            await session_writer.flush()
+            assert await pinecone_service.get_session(session["session_id"]) is not None
+
+            # The client goes away after the first step
+            stream= controller.stream_user_input("I feel anxious about my talk")
+            session= events([await stream.__anext__()])[0][1]
+            assert events([await stream.__anext__()])[0][0] == "step"
+            await stream.aclose()
+            assert await ritual_guide.active_sessions.get(session["session_id"]) is None
+            await session_writer.flush()
+            assert await pinecone_service.get_session(session["session_id"]) is None
+
+    asyncio.run(scenario())
@@ -0,0 +1,251 @@
+import asyncio
+import json
+import sys
+from datetime import datetime
+from typing import Dict, Any, AsyncIterable, AsyncIterator, Iterable, List, Optional, Tuple, Union
+
+from models.schemas import UserInput, Ritual, SessionMemory
+from usecases.ritual_architect import RitualArchitect
+from repository.pinecone_repository import pinecone_service
+from config.setting import Config
+from config.logging import logger
+
+# Longest accepted JSONL input line; longer lines are reported as errors instead of buffered
+MAX_LINE_BYTES= 64 * 1024
+
+BulkInput= Union[str, Dict[str, Any]]
+
+
+async def iter_jsonl(chunks: AsyncIterable[bytes]) -> AsyncIterator[BulkInput]:
+    # Parse a JSON Lines byte stream one line at a time; bad lines come through as {"error": ...}
+    buffer= b""
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer= buffer.split(b"\n")
+        if len(buffer) > MAX_LINE_BYTES:
+            buffer= b""
+            yield {"error": f"Input line longer than {MAX_LINE_BYTES} bytes"}
+        for line in lines:
+            if line.strip():
+                yield parse_line(line)
+    if buffer.strip():
+        yield parse_line(buffer)
+
+
+def parse_line(line: Union[str, bytes]) -> BulkInput:
+    if len(line) > MAX_LINE_BYTES:
+        return {"error": f"Input line longer than {MAX_LINE_BYTES} bytes"}
+    try:
+        return json.loads(line)
+    except ValueError as e:
+        return {"error": f"Invalid JSON line: {e}"}
+
+
+async def iter_items(items: Iterable[BulkInput]) -> AsyncIterator[BulkInput]:
+    for item in items:
+        yield item
+
+
+class BulkRitualBuilder:
+    # Build rituals for a stream of inputs: a fixed number of workers run analysis + generation,
+    # finished sessions are persisted in multi-record upserts (whose embeddings the embedding engine
+    # encodes in one batch), and results are yielded as their batch is written. Every queue is bounded,
+    # so memory does not grow with the size of the input. Sessions are stored marked as bulk but not
+    # started; the ritual guide starts one from storage when it is first stepped through or rated.
+    def __init__(self, architect: Optional[RitualArchitect] = None, repository= pinecone_service,
+                 concurrency: int = 8, write_batch_size: int = 32, flush_interval_ms: float = 200.0):
+        self.architect= architect or RitualArchitect()
+        self.repository= repository
+        self.concurrency= concurrency
+        self.write_batch_size= write_batch_size
+        self.flush_interval= flush_interval_ms / 1000
+
+    async def build(self, inputs: AsyncIterable[BulkInput]) -> AsyncIterator[Dict[str, Any]]:
+        # Yield one result per input in completion order; "index" is the input's position
+        work: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        writes: asyncio.Queue = asyncio.Queue(maxsize=self.write_batch_size * 2)
+        results: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+
+        async def produce():
+            index= 0
+            async for item in inputs:
+                await work.put((index, item))
+                index += 1
+
+        async def generate():
+            while (task := await work.get()) is not None:
+                index, item= task
+                result= await self._build_one(index, item)
+                if result.get("success"):
+                    await writes.put(result)
+                else:
+                    await results.put(result)
+
+        async def produce_and_generate():
+            workers= [asyncio.ensure_future(generate()) for _ in range(self.concurrency)]
+            error= None
+            try:
+                await produce()
+                for _ in workers:
+                    await work.put(None)
+                await asyncio.gather(*workers)
+            except Exception as e:
+                error= e
+            finally:
+                for worker in workers:
+                    worker.cancel()
+            # Ends the writer, which stores what it holds and then closes the result stream
+            await writes.put(None)
+            if error is not None:
+                raise error
+
+        async def write():
+            done= False
+            while not done:
+                batch, done= await self._collect_batch(writes)
+                if batch:
+                    await self._store(batch)
+                    for result in batch:
+                        result.pop("_memory")
+                        await results.put(result)
+            await results.put(None)
+
+        tasks= [asyncio.ensure_future(produce_and_generate()), asyncio.ensure_future(write())]
+        try:
+            while (result := await results.get()) is not None:
+                yield result
+            # Surface a failure in the input stream itself once the finished results are out
+            for task in tasks:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def _build_one(self, index: int, item: BulkInput) -> Dict[str, Any]:
+        # Inputs are plain strings or {"text": ..., "id": ...}; the optional id is echoed back
+        result: Dict[str, Any] = {"index": index, "success": False}
+        if not isinstance(item, (str, dict)):
+            return {**result, "error": "Input must be a string or an object with text"}
+        text, reference= (item, None) if isinstance(item, str) else (item.get("text"), item.get("id"))
+        if reference is not None:
+            result["id"] = reference
+        if isinstance(item, dict) and "error" in item and text is None:
+            return {**result, "error": item["error"]}
+        if not isinstance(text, str) or not text.strip():
+            return {**result, "error": "Input has no text"}
+
+        session_id= self.repository.generate_session_id()
+        try:
+            ritual= await self.architect.process_input(UserInput(text=text, session_id=session_id))
+        except Exception as e:
+            logger.error("Bulk ritual %s failed: %s", index, e)
+            return {**result, "session_id": session_id, "error": str(e)}
+        return {
+            **result,
+            "success": True,
+            "session_id": session_id,
+            "ritual": ritual.model_dump(mode="json"),
+            "_memory": self._session_memory(text, ritual)
+        }
+
+    def _session_memory(self, text: str, ritual: Ritual) -> SessionMemory:
+        return SessionMemory(
+            session_id=ritual.session_id,
+            user_input=text,
+            user_state=ritual.user_state,
+            ritual_steps=[step.step_type for step in ritual.steps],
+            steps=ritual.steps,
+            rating=0,
+            timestamp=datetime.now(),
+            bulk=True
+        )
+
+    async def _collect_batch(self, writes: asyncio.Queue) -> Tuple[List[Dict[str, Any]], bool]:
+        # Wait for the first result, then fill the batch until size, flush interval or the end marker
+        loop= asyncio.get_running_loop()
+        first= await writes.get()
+        if first is None:
+            return [], True
+        batch= [first]
+        deadline= loop.time() + self.flush_interval
+        while len(batch) < self.write_batch_size:
+            timeout= deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                result= await asyncio.wait_for(writes.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if result is None:
+                return batch, True
+            batch.append(result)
+        return batch, False
+
+    async def _store(self, batch: List[Dict[str, Any]]):
+        stored= await self.repository.store_sessions([result["_memory"] for result in batch])
+        for result in batch:
+            result["stored"] = stored
+        if not stored:
+            logger.error("Failed to store %s bulk ritual session(s)", len(batch))
+
+
+async def summarize(results: AsyncIterator[Dict[str, Any]], counts: Dict[str, int]) -> AsyncIterator[Dict[str, Any]]:
+    # Pass results through while counting them for a closing summary
+    async for result in results:
+        counts["total"] += 1
+        counts["succeeded"] += result["success"]
+        counts["stored"] += bool(result.get("stored"))
+        yield result
+
+
+def create_bulk_ritual_builder(concurrency: Optional[int] = None) -> BulkRitualBuilder:
+    return BulkRitualBuilder(
+        concurrency= concurrency or Config.bulk_ritual_concurrency,
+        write_batch_size= Config.bulk_ritual_write_batch_size,
+        flush_interval_ms= Config.bulk_ritual_flush_interval_ms
+    )
+
+
+async def run_cli(args) -> Dict[str, int]:
+    # Read JSONL (one {"text": ..., "id": ...} or plain JSON string per line) and write one result per line
+    async def read_lines() -> AsyncIterator[BulkInput]:
+        # Reads happen off the loop so a slow pipe does not stall the workers
+        source= sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+        try:
+            while line := await asyncio.to_thread(source.readline):
+                if line.strip():
+                    yield parse_line(line)
+        finally:
+            if source is not sys.stdin:
+                source.close()
+
+    counts= {"total": 0, "succeeded": 0, "stored": 0}
+    builder= create_bulk_ritual_builder(args.concurrency)
+    output= sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    try:
+        async for result in summarize(builder.build(read_lines()), counts):
+            output.write(json.dumps(result) + "\n")
+            if args.progress_every and counts["total"] % args.progress_every == 0:
+                print(f"{counts['total']} processed, {counts['succeeded']} succeeded", file=sys.stderr)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+    return counts
+
+
+def main():
+    import argparse
+
+    parser= argparse.ArgumentParser(description="Create rituals for a JSONL file of user inputs")
+    parser.add_argument("--input", default="-", help="JSONL input file, or - for stdin")
+    parser.add_argument("--output", default="-", help="JSONL output file, or - for stdout")
+    parser.add_argument("--concurrency", type=int, default=None, help="Parallel analysis + generation calls (default BULK_RITUAL_CONCURRENCY)")
+    parser.add_argument("--progress-every", type=int, default=100)
+    args= parser.parse_args()
+
+    counts= asyncio.run(run_cli(args))
+    print(json.dumps(counts), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
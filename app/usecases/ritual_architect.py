@@ -1,21 +1,23 @@
+import time
 from datetime import datetime
+from typing import List, Dict, Any, AsyncIterator, Awaitable, Callable, Optional, Tuple
 
 from models.schemas import UserInput, Ritual, RitualStep
 from services.ai_service import ai_service
+from services.ritual_pool import ritual_pool
+from services.state_classifier import state_classifier
+from services.ritual_reuse import ritual_reuse
+from services.ritual_cache import ritual_cache
+from services.metrics import registry
+from config.setting import Config
 from config.logging import logger
 
+fused_requests= registry.counter(
+    "focusforge_fused_requests_total", "Fused analysis + generation attempts, by outcome (fused/fallback)")
+
 class RitualArchitect:
     async def process_input(self, user_input: UserInput) -> Ritual:
-        # Analyze user input to determine emotional state
-        user_state = await ai_service.analyze_user_state(user_input.text)
-        logger.info(f"User state for session {user_input.session_id}: {user_state}")
-        
-        # Generate ritual steps tailored to the user state
-        try:
-            ritual_steps = await ai_service.generate_ritual_step(user_state['state'])
-        except Exception as e:
-            logger.error(f"Error generating ritual steps: {str(e)}")
-            raise ValueError(f"Failed to generate ritual steps: {str(e)}")
+        user_state, ritual_steps = await self._analyze_and_generate(user_input)
 
         # Convert generated steps to RitualStep objects
         steps = [
@@ -35,5 +37,97 @@ class RitualArchitect:
             steps=steps,
             created_at=datetime.now()
         )
-        logger.info(f"Generated ritual for session {ritual.session_id} with {len(steps)} steps")
-        return ritual
\ No newline at end of file
+        logger.info("Generated ritual for session %s with %s steps", ritual.session_id, len(steps))
+        return ritual
+    
+    async def _analyze_and_generate(self, user_input: UserInput) -> Tuple[Dict[str, Any], List[Dict[str, str]]]:
+        # Analyze user input to determine emotional state
+        user_state = await self._local_state(user_input.text)
+        if user_state is None and self._can_fuse():
+            # One LLM call for state and steps; any bad response falls back to the two-call path
+            try:
+                user_state, ritual_steps = await self._cached(
+                    "fused", user_input.text, lambda: ai_service.analyze_and_generate(user_input.text)
+                )
+                fused_requests.inc(outcome="fused")
+                logger.info("User state for session %s: %s", user_input.session_id, user_state)
+                return user_state, ritual_steps
+            except ValueError as e:
+                fused_requests.inc(outcome="fallback")
+                logger.warning("Fused call failed for session %s, using two calls: %s", user_input.session_id, e)
+        if user_state is None:
+            user_state = await self._cached("state", user_input.text, lambda: ai_service.analyze_user_state(user_input.text))
+        logger.info("User state for session %s: %s", user_input.session_id, user_state)
+        
+        # Generate ritual steps tailored to the user state
+        try:
+            ritual_steps = await self._get_ritual_steps(user_input, user_state)
+        except Exception as e:
+            logger.error("Error generating ritual steps: %s", e)
+            raise ValueError(f"Failed to generate ritual steps: {str(e)}")
+        return user_state, ritual_steps
+    
+    async def analyze_state(self, text: str) -> Dict[str, Any]:
+        # Use the local classifier when confident, otherwise ask the LLM
+        return await self._local_state(text) or await ai_service.analyze_user_state(text)
+    
+    async def _local_state(self, text: str) -> Optional[Dict[str, Any]]:
+        # Local classifier result if enabled and confident, otherwise None
+        if Config.state_classifier_enabled:
+            result = await state_classifier.classify(text)
+            if result['confidence'] >= Config.state_classifier_threshold:
+                state_classifier.record(used_local=True)
+                return result
+            state_classifier.record(used_local=False)
+            logger.info("Local state confidence %s below threshold, falling back to LLM", result['confidence'])
+        return None
+    
+    def _can_fuse(self) -> bool:
+        # Reuse and the pool need the state before deciding whether to generate, so they keep two calls
+        return Config.ritual_fused_mode and Config.ritual_pool_mode == "generate" and not Config.ritual_reuse_enabled
+    
+    async def _get_ritual_steps(self, user_input: UserInput, user_state: Dict[str, Any]) -> List[Dict[str, str]]:
+        # Reuse a similar rated ritual, serve from the pool or call the LLM, depending on config
+        state = user_state['state']
+        session_id = user_input.session_id
+        if Config.ritual_reuse_enabled:
+            reused_steps = await ritual_reuse.find(user_input.text, user_state)
+            if reused_steps:
+                return reused_steps
+        
+        mode = Config.ritual_pool_mode
+        if mode in ("pool_first", "pool_only"):
+            pooled_steps = await ritual_pool.acquire(state, session_id, wait=mode == "pool_only")
+            if pooled_steps:
+                logger.info("Serving pooled ritual for session %s (%s)", session_id, state)
+                return pooled_steps
+            if mode == "pool_only":
+                raise ValueError(f"No pooled ritual available for state: {state}")
+        
+        async def generate() -> List[Dict[str, str]]:
+            start = time.perf_counter()
+            ritual_steps = await ai_service.generate_ritual_step(state)
+            ritual_reuse.record_generation((time.perf_counter() - start) * 1000)
+            return ritual_steps
+        return await self._cached(f"generate:{state}", user_input.text, generate)
+    
+    async def _cached(self, kind: str, text: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+        # Identical inputs share one cached or in-flight LLM call. Only LLM results are cached: pool and
+        # reuse decisions run per request, so every pooled ritual is tracked and evictions apply at once
+        if Config.ritual_cache_enabled:
+            return await ritual_cache.get_or_compute(text, compute, kind=kind)
+        return await compute()
+    
+    async def stream_steps(self, user_state: str) -> AsyncIterator[RitualStep]:
+        # Yield numbered ritual steps as the LLM streams them, skipping repeated step types
+        seen_types = set()
+        async for step_content in ai_service.stream_ritual_steps(user_state):
+            if step_content["step_type"] in seen_types:
+                continue
+            seen_types.add(step_content["step_type"])
+            yield RitualStep(
+                step_number=len(seen_types),
+                title=step_content["title"],
+                content=step_content["content"],
+                step_type=step_content["step_type"]
+            )
\ No newline at end of file
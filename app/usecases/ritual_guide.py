@@ -1,132 +1,273 @@
-from typing import Dict, Any, Optional
+import asyncio
+import json
+from collections import OrderedDict
+from typing import Dict, Any, Optional, List, Tuple
 from datetime import datetime
 
 from models.schemas import Ritual, RitualStep, FeedbackResponse
 from repository.pinecone_repository import pinecone_service
-from config.logging import logger
+from services.session_writer import session_writer
+from services.ritual_pool import ritual_pool
+from repository.session_store import SessionStore, create_session_store
+from usecases.step_payloads import build_step_payloads, encode_payload
+from services.lazy import LazyService
+from config.setting import Config
+from config.logging import logger, HOT
+
+# Feedback error by rating update status; a session that was never persisted cannot take a rating
+FEEDBACK_ERRORS= {
+    "not_found": "Session not found in storage",
+    "failed": "Failed to save feedback"
+}
 
 class RitualGuide:
-    def __init__(self):
-        # Initialize with an empty sessions dictionary
-        self.active_sessions= {}
+    def __init__(self, store: SessionStore, payload_cache_size: int = 10000):
+        # Initialize with the active session store
+        self.active_sessions= store
+        # Step payloads by session, tagged with the step count they were built for. The sqlite and redis
+        # stores return a fresh copy of the session on every get, so payloads are kept here instead
+        self.payloads: "OrderedDict[str, Tuple[int, Dict[str, Any]]]" = OrderedDict()
+        self.payload_cache_size= payload_cache_size
         logger.info('Ritual Guide agent initialized')
         
-    async def start_session(self, ritual: Ritual) -> Dict[str, Any]:
-        # Start a new ritual session
+    async def _get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
+        # Active session, or an unrated bulk-created one started from storage on first use. Bulk
+        # creation does not start its sessions, so a large batch cannot push live ones out of the store
+        session= await self.active_sessions.get(session_id)
+        if session is not None:
+            return session
+        metadata= await pinecone_service.get_session(session_id)
+        if not metadata or not metadata.get('bulk') or metadata.get('rating'):
+            return None
+        ritual= Ritual(
+            session_id= session_id,
+            user_state= metadata['user_state'],
+            steps= [RitualStep(**step) for step in json.loads(metadata['ritual'])],
+            created_at= datetime.fromisoformat(metadata['timestamp'])
+        )
+        if not (await self.start_session(ritual))["success"]:
+            return None
+        logger.info("Started bulk-created session %s from storage", session_id)
+        return await self.active_sessions.get(session_id)
+    
+    async def start_session(self, ritual: Ritual, streaming: bool = False) -> Dict[str, Any]:
+        # Start a new ritual session; streaming sessions receive further steps via add_step
         session_id= ritual.session_id
-        logger.info(f"Starting ritual session {session_id}")
+        logger.info("Starting ritual session %s", session_id)
         
         try:
-            self.active_sessions[session_id] = {
+            session= {
                 "ritual": ritual,
                 "current_step": 1,
                 "total_steps": len(ritual.steps),
                 "started_at": datetime.now(),
-                "completed_steps": []
+                "completed_steps": [],
+                "streaming": streaming
             }
-            first_step= await self._get_current_step(session_id)
+            if not streaming:
+                self._get_payloads(session_id, session)
+            await self.active_sessions.put(session_id, session)
+            first_step= await self._get_current_step(session)
             return{
                 "success": True,
                 "session_id": session_id,
                 "total_steps": len(ritual.steps),
                 "current_step": first_step,
-                "progress": await self._get_progress(session_id),
+                "progress": await self._get_progress(session),
                 "messsage":f"Let's begin your {ritual.user_state} ritual!"
             }
         except Exception as e:
-            logger.error(f"Error starting session {session_id}: {str(e)}")
+            logger.error("Error starting session %s: %s", session_id, e)
             return {"success": False , "error": str(e)}
         
     async def get_current_step(self, session_id: str) -> Dict[str, Any]:
         # Retrieve the current step for a session
-        if session_id not in self.active_sessions:
-            logger.error(f"Session {session_id} not found")
+        session= await self._get_session(session_id)
+        if session is None:
+            logger.error("Session %s not found", session_id)
             return {"success": False, "error": "Session not found"}
         
         try:
-            current_step= await self._get_current_step(session_id)
-            progress= await self._get_progress(session_id)
+            current_step= await self._get_current_step(session)
+            progress= await self._get_progress(session)
             return {
                 "success": True,
                 "session_id": session_id,
                 "current_step": current_step,
                 "progress": progress,
-                "is_complete": await self._is_session_complete(session_id)
+                "is_complete": await self._is_session_complete(session)
             }
         except Exception as e:
-            logger.error(f"Error getting steps for {session_id} : {str(e)}")
+            logger.error("Error getting steps for %s : %s", session_id, e)
             return {"success": False, "error": "Session not found"}
         
     async def next_step(self, session_id: str) -> Dict[str, Any]:
         # Advance to the next step in the session
-        if session_id not in self.active_sessions:
+        session= await self._get_session(session_id)
+        if session is None:
             return {"success": False, "error": "Session not found"}
         
         try:
-            session= self.active_sessions[session_id]
-            session['completed_steps'].append(session['current_step'])
-            session["current_step"] += 1
-            logger.info(f"Session {session_id}: moved to step {session['current_step']}")
-            if await self._is_session_complete(session_id):
-                return {
-                    "success": True,
-                    "session_id": session_id,
-                    "ritual_complete": True,
-                    "message": "Ritual completed! How did it go?",
-                    "progress": await self._get_progress(session_id)
-                }
-            next_step = await self._get_current_step(session_id)
+            await self._advance(session_id, session)
+            return await self._next_step_response(session_id, session)
+        except Exception as e:
+            logger.error("Error moving to next step for %s: %s", session_id, e)
+            return {"success": False, "error": str(e)}
+        
+    async def get_current_step_payload(self, session_id: str) -> Optional[bytes]:
+        # Pre-serialized current step response, or None if the session is unknown
+        session= await self._get_session(session_id)
+        if session is None:
+            return None
+        payloads= self._get_payloads(session_id, session)
+        index= session['current_step'] - 1
+        if payloads and index < len(payloads['current']):
+            return payloads['current'][index]
+        return encode_payload(await self.get_current_step(session_id))
+    
+    async def next_step_payload(self, session_id: str) -> Optional[bytes]:
+        # Advance and return the pre-serialized response, or None if the session is unknown
+        session= await self._get_session(session_id)
+        if session is None:
+            return None
+        await self._advance(session_id, session)
+        payloads= self._get_payloads(session_id, session)
+        index= session['current_step'] - 1
+        if payloads and index < len(payloads['next']):
+            return payloads['next'][index]
+        return encode_payload(await self._next_step_response(session_id, session))
+    
+    async def _advance(self, session_id: str, session: Dict[str, Any]):
+        # Mark the current step complete and move to the next one
+        session['completed_steps'].append(session['current_step'])
+        session["current_step"] += 1
+        await self.active_sessions.put(session_id, session)
+        logger.info("Session %s: moved to step %s", session_id, session['current_step'], extra=HOT)
+    
+    async def _next_step_response(self, session_id: str, session: Dict[str, Any]) -> Dict[str, Any]:
+        if await self._is_session_complete(session):
             return {
                 "success": True,
                 "session_id": session_id,
-                "current_step": next_step,
-                "progress": await self._get_progress(session_id),
-                "ritual_complete": False
+                "ritual_complete": True,
+                "message": "Ritual completed! How did it go?",
+                "progress": await self._get_progress(session)
             }
-        except Exception as e:
-            logger.error(f"Error moving to next step for {session_id}: {str(e)}")
-            return {"success": False, "error": str(e)}
+        next_step = await self._get_current_step(session)
+        return {
+            "success": True,
+            "session_id": session_id,
+            "current_step": next_step,
+            "progress": await self._get_progress(session),
+            "ritual_complete": False
+        }
+    
+    def _get_payloads(self, session_id: str, session: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        # Cached payloads of a finished ritual; built on first use in this process or when the step count changed
+        if session.get('streaming'):
+            return None
+        entry= self.payloads.get(session_id)
+        if entry is not None and entry[0] == session['total_steps']:
+            self.payloads.move_to_end(session_id)
+            return entry[1]
+        payloads= build_step_payloads(session_id, session['ritual'])
+        self.payloads[session_id] = (session['total_steps'], payloads)
+        self.payloads.move_to_end(session_id)
+        while len(self.payloads) > self.payload_cache_size:
+            self.payloads.popitem(last=False)
+        return payloads
         
     async def collect_feedback(self, session_id: str, feedback:FeedbackResponse) -> Dict[str, Any]:
         # Collect and store feedback for a session
-        logger.info(f"Collecting feedback for session {session_id}")
+        logger.info("Collecting feedback for session %s", session_id)
         try:
-            if session_id not in self.active_sessions:
+            if await self._get_session(session_id) is None:
                 return {"success": False, "error": "Session not found in active sessions"}
             
-            session = await pinecone_service.get_session(session_id)
-            if not session:
-                logger.error(f"Session {session_id} not found in Pinecone")
-                return {"success": False, "error": "Session not found in storage"}
-            
-            save_success = await pinecone_service.update_session_rating(session_id, feedback.rating)
-            if save_success:
+            # Sessions still in the write-behind queue take the rating before they are written
+            status = "updated" if session_writer.apply_rating(session_id, feedback.rating) else None
+            if status is None:
+                status = (await pinecone_service.update_session_ratings({session_id: feedback.rating}))[session_id]
+            if status == "updated":
+                ritual_pool.record_feedback(session_id, feedback.rating)
                 await self._cleanup_session(session_id)
-                logger.info(f"Feedback saved for session {session_id}: rating {feedback.rating}")
+                logger.info("Feedback saved for session %s: rating %s", session_id, feedback.rating)
                 return {
                     "success": True,
                     "session_id": session_id,
                     "message": "Thank you for your feedback!",
                     "rating": feedback.rating
                 }
-            logger.error(f"Failed to save feedback for {session_id}")
-            return {"success": False, "error": "Failed to save feedback"}
+            logger.error("Failed to save feedback for %s", session_id)
+            return {"success": False, "error": FEEDBACK_ERRORS[status]}
         except Exception as e:
-            logger.error(f"Error collecting feedback for {session_id}: {str(e)}")
+            logger.error("Error collecting feedback for %s: %s", session_id, e)
             return {"success": False, "error": str(e)}
             
-    async def _get_current_step(self, session_id: str) -> Optional[RitualStep]:
-        # Helper method to get the current step
-        session = self.active_sessions[session_id]
+    async def collect_feedback_bulk(self, ratings: Dict[str, int]) -> List[Dict[str, Any]]:
+        # Collect many ratings at once: pending sessions take theirs in memory, the rest are written in batches
+        logger.info("Collecting feedback for %s sessions", len(ratings))
+        sessions = await asyncio.gather(*[self._get_session(session_id) for session_id in ratings])
+        results: Dict[str, Dict[str, Any]] = {}
+        stored: Dict[str, int] = {}
+        for (session_id, rating), session in zip(ratings.items(), sessions):
+            if session is None:
+                results[session_id] = {"session_id": session_id, "success": False, "error": "Session not found in active sessions"}
+            elif session_writer.apply_rating(session_id, rating):
+                results[session_id] = {"session_id": session_id, "success": True, "rating": rating}
+            else:
+                stored[session_id] = rating
+        
+        batch = list(stored.items())
+        for start in range(0, len(batch), Config.feedback_batch_size):
+            saved = await pinecone_service.update_session_ratings(dict(batch[start:start + Config.feedback_batch_size]))
+            for session_id, status in saved.items():
+                results[session_id] = (
+                    {"session_id": session_id, "success": True, "rating": stored[session_id]} if status == "updated"
+                    else {"session_id": session_id, "success": False, "error": FEEDBACK_ERRORS[status]}
+                )
+        
+        saved_ids = [session_id for session_id, result in results.items() if result["success"]]
+        for session_id in saved_ids:
+            ritual_pool.record_feedback(session_id, ratings[session_id])
+        await asyncio.gather(*[self._cleanup_session(session_id) for session_id in saved_ids])
+        logger.info("Bulk feedback saved for %s of %s sessions", len(saved_ids), len(ratings))
+        return [results[session_id] for session_id in ratings]
+    
+    async def add_step(self, session_id: str, step: RitualStep):
+        # Append a step that arrived after the session started
+        session= await self.active_sessions.get(session_id)
+        if session is None:
+            return
+        session['ritual'].steps.append(step)
+        session['total_steps'] = len(session['ritual'].steps)
+        await self.active_sessions.put(session_id, session)
+    
+    async def finish_streaming(self, session_id: str):
+        # Mark that no further steps will be added to the session
+        session= await self.active_sessions.get(session_id)
+        if session is not None:
+            session['streaming'] = False
+            self._get_payloads(session_id, session)
+            await self.active_sessions.put(session_id, session)
+            
+    async def discard_session(self, session_id: str):
+        # Drop a session that will not be completed, e.g. an interrupted stream
+        await self._cleanup_session(session_id)
+    
+    async def _get_current_step(self, session: Dict[str, Any]) -> Optional[RitualStep]:
+        # Helper method to get the current step; steps are numbered from 1 so index directly
         current_step_num = session["current_step"]
-        for step in session['ritual'].steps:
+        steps = session['ritual'].steps
+        if 0 < current_step_num <= len(steps) and steps[current_step_num - 1].step_number == current_step_num:
+            return steps[current_step_num - 1]
+        for step in steps:
             if step.step_number == current_step_num:
                 return step
         return None
     
-    async def _get_progress(self, session_id: str) -> dict:
+    async def _get_progress(self, session: Dict[str, Any]) -> dict:
         # Calculate session progress
-        session = self.active_sessions[session_id]
         completed= len(session['completed_steps'])
         total= session['total_steps']
         return{
@@ -136,16 +277,21 @@ class RitualGuide:
             "current_step_number": session['current_step']
         }
     
-    async def _is_session_complete(self, session_id: str) -> bool:
+    async def _is_session_complete(self, session: Dict[str, Any]) -> bool:
         # Check if the session is complete
-        session= self.active_sessions[session_id]
-        return session['current_step'] > session['total_steps']
+        return not session.get('streaming') and session['current_step'] > session['total_steps']
     
     async def _cleanup_session(self, session_id: str):
         # Remove session from active sessions
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-            logger.info("Session {session_id} Cleaned up")
+        await self.active_sessions.delete(session_id)
+        self.payloads.pop(session_id, None)
+        logger.info("Session %s Cleaned up", session_id)
             
             
-ritual_guide = RitualGuide()
\ No newline at end of file
+ritual_guide = LazyService(lambda: RitualGuide(create_session_store(
+    Config.session_store_backend,
+    ttl_s= Config.session_store_ttl_s,
+    max_size= Config.session_store_max_size,
+    path= Config.session_store_path,
+    url= Config.session_store_url
+), payload_cache_size= Config.session_store_max_size))
\ No newline at end of file
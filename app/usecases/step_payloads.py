@@ -0,0 +1,69 @@
+import json
+from datetime import datetime
+from typing import Dict, Any, List, Optional
+
+from pydantic import BaseModel
+
+from models.schemas import Ritual
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, BaseModel):
+        return value.model_dump(mode="json")
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def encode_payload(response: Dict[str, Any]) -> bytes:
+    # Serialize a step response dict to compact JSON bytes
+    return json.dumps(response, default=_json_default, separators=(",", ":")).encode("utf-8")
+
+
+def progress_at(position: int, total: int) -> Dict[str, int]:
+    # Progress when the session is at a given step position
+    completed= position - 1
+    return {
+        "completed_steps": completed,
+        "total_steps": total,
+        "percentage": int((completed / total) * 100) if total > 0 else 0,
+        "current_step_number": position
+    }
+
+
+def build_step_payloads(session_id: str, ritual: Ritual) -> Dict[str, List[Optional[bytes]]]:
+    # Pre-serialize the GET and next-step responses for every position 1..total+1
+    steps= [step.model_dump(mode="json") for step in ritual.steps]
+    total= len(steps)
+    current_payloads= []
+    next_payloads= []
+    for position in range(1, total + 2):
+        step= steps[position - 1] if position <= total else None
+        progress= progress_at(position, total)
+        current_payloads.append(encode_payload({
+            "success": True,
+            "session_id": session_id,
+            "current_step": step,
+            "progress": progress,
+            "is_complete": position > total
+        }))
+        if position == 1:
+            # Position 1 is never reached by advancing
+            next_payloads.append(None)
+        elif step is None:
+            next_payloads.append(encode_payload({
+                "success": True,
+                "session_id": session_id,
+                "ritual_complete": True,
+                "message": "Ritual completed! How did it go?",
+                "progress": progress
+            }))
+        else:
+            next_payloads.append(encode_payload({
+                "success": True,
+                "session_id": session_id,
+                "current_step": step,
+                "progress": progress,
+                "ritual_complete": False
+            }))
+    return {"current": current_payloads, "next": next_payloads}